@@ -0,0 +1,146 @@
+import logging
+import os
+
+from config.configs import AppConfig, DataboxTarget
+from fetch.circuit_breaker import CircuitBreakers
+from fetch.hedging import Hedging
+from fetch.incremental import IncrementalFetch
+from fetch.limiter import Limiters
+from fetch.response_cache import ResponseCache
+from fetch.transport import Transport
+from push.databox_client import DataboxClient, DEFAULT_TARGET
+from push.delta import DeltaTracker
+from push.push_queue import PushQueue
+from push.targets import PushTarget
+from response.derived import DerivedEngine
+from response.parse_pool import ParsePool
+from response.response_init import ResponseUnit
+from response.series_snapshot import load_series, store_series
+from telemetry.metrics import MetricsRegistry
+from telemetry.profiling import Profiler
+
+logger = logging.getLogger(__name__)
+
+
+class AppContext:
+    """
+    Everything owned by the application for its whole lifetime and shared between cycles: HTTP transport,
+    metrics registry, parse pool, endpoint limiters, circuit breakers, hedging latencies, stored history of
+    incrementally fetched sources, response cache, derived metrics engine, latest data of every source (persisted
+    in series snapshot), databox push targets with their clients, delta trackers and push queues and profiler
+    """
+
+    def __init__(self, app_config: AppConfig) -> None:
+        self.app_config = app_config
+        self.metrics = MetricsRegistry() if app_config.metrics_enabled else None
+        self.metrics_server = None
+        self.transport = Transport(app_config, self.metrics)
+        # SiStat limiters by host, adapted concurrency and Retry-After pauses are kept between cycles
+        self.limiters = Limiters(app_config.fetch_limit)
+        self.circuit_breakers = CircuitBreakers(app_config.fetch_circuit_failure_threshold,
+                                                app_config.fetch_circuit_reset) \
+            if app_config.fetch_circuit_failure_threshold > 0 else None
+        self.hedging = Hedging(app_config.fetch_hedge_percentile, app_config.fetch_hedge_min_delay,
+                               app_config.fetch_hedge_window, app_config.fetch_hedge_min_samples) \
+            if app_config.fetch_hedge_enabled else None
+        self.incremental = IncrementalFetch(app_config.fetch_incremental_overlap, app_config.fetch_backfill_cycles) \
+            if app_config.fetch_incremental else None
+        # default account (databox_config.username) and additional target accounts
+        self.targets = [self._create_target(None)] + [self._create_target(target)
+                                                      for target in app_config.databox_targets]
+        self.response_cache = ResponseCache(app_config.request_cache_ttl, app_config.request_cache_max_entries) \
+            if app_config.request_cache_enabled else None
+        self.parse_pool = ParsePool(app_config.fetch_parse_workers, app_config.fetch_parse_offload_min_bytes) \
+            if app_config.fetch_parse_workers > 0 else None
+        self.derived_engine = DerivedEngine(app_config.derived_metrics, self.metrics)
+        # last non-empty response of every source, derived metrics of sources scheduled separately are joined on it
+        self.latest_units: dict[str, ResponseUnit] = dict()
+        # latest units as stored in series snapshot, with their pushed state
+        self.stored_units: dict[str, tuple[ResponseUnit, bool]] = dict()
+        self.profiler = Profiler(app_config.profiling_directory, app_config.profiling_cprofile,
+                                 app_config.profiling_sampling_interval, app_config.profiling_tracemalloc,
+                                 app_config.profiling_slow_callback, app_config.profiling_top_allocations) \
+            if app_config.profiling_cycles > 0 or app_config.profiling_signal_cycles > 0 else None
+        if self.profiler is not None and app_config.profiling_cycles > 0:
+            self.profiler.request(app_config.profiling_cycles)
+
+    def _create_target(self, target: DataboxTarget | None) -> PushTarget:
+        app_config = self.app_config
+        delta_tracker = DeltaTracker(app_config.databox_full_resync_cycles) if app_config.databox_delta_push else None
+
+        def create_client() -> DataboxClient:
+            return DataboxClient(app_config, self.transport.session, self.metrics, target)
+
+        if target is None:
+            return PushTarget(DEFAULT_TARGET, dict(), create_client, delta_tracker)
+        return PushTarget(target.name, target.metric_keys, create_client, delta_tracker)
+
+    async def __aenter__(self) -> "AppContext":
+        if self.app_config.series_snapshot_enabled:
+            self.restore_series()
+        await self.transport.open()
+        if self.app_config.push_queue_enabled:
+            for target in self.targets:
+                # queue of the default account stays in push_queue.directory, others in its subdirectories
+                directory = self.app_config.push_queue_directory if target.name == DEFAULT_TARGET \
+                    else os.path.join(self.app_config.push_queue_directory, target.name)
+                target.push_queue = PushQueue(directory, self.app_config.push_queue_capacity,
+                                              self.app_config.push_queue_flush_every,
+                                              self.app_config.push_queue_segment_max_bytes,
+                                              self.app_config.push_queue_fsync)
+        if self.metrics is not None and self.app_config.metrics_endpoint_enabled:
+            # aiohttp server is imported only when endpoint is enabled
+            from telemetry.server import MetricsServer
+            self.metrics_server = MetricsServer(self.metrics, self.app_config.metrics_host,
+                                                self.app_config.metrics_port)
+            await self.metrics_server.start()
+        return self
+
+    def restore_series(self) -> None:
+        """
+        Continue from series snapshot of the previous run: derived metrics are calculated as soon as any input is
+        fetched, incremental fetch asks only for new periods and data points that were pushed (to every target) are not
+        pushed again
+        """
+        response_units, pushed = load_series(self.app_config.series_snapshot_file)
+        for name, response_unit in response_units.items():
+            self.latest_units[name] = response_unit
+            self.stored_units[name] = (response_unit, name in pushed)
+            if self.incremental is not None:
+                self.incremental.restore(name, response_unit)
+            for target in self.targets:
+                if target.delta_tracker is not None and name in pushed:
+                    target.delta_tracker.commit(response_unit)
+
+    def store_series(self) -> None:
+        """
+        Store latest units into series snapshot, when any of them changed or was pushed since last store
+        """
+        delta_trackers = [target.delta_tracker for target in self.targets]
+        stored_units = dict()
+        for name, response_unit in self.latest_units.items():
+            stored_unit, pushed = self.stored_units.get(name, (None, False))
+            if stored_unit is not response_unit or not pushed:
+                pushed = None not in delta_trackers and \
+                    not any(delta_tracker.changed(response_unit) for delta_tracker in delta_trackers)
+            stored_units[name] = (response_unit, pushed)
+        if stored_units.keys() != self.stored_units.keys() or \
+                any(response_unit is not self.stored_units[name][0] or pushed != self.stored_units[name][1]
+                    for name, (response_unit, pushed) in stored_units.items()):
+            store_series(self.app_config.series_snapshot_file,
+                         {name: response_unit for name, (response_unit, _) in stored_units.items()},
+                         {name for name, (_, pushed) in stored_units.items() if pushed})
+            self.stored_units = stored_units
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+            self.metrics_server = None
+        for target in self.targets:
+            target.close()
+        await self.transport.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
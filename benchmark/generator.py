@@ -0,0 +1,58 @@
+import json
+import math
+import random
+
+
+def _periods(count: int, monthly: bool) -> list[str]:
+    if monthly:
+        return [f"{1990 + idx // 12}M{idx % 12 + 1:02d}" for idx in range(count)]
+    return [str(1900 + idx) for idx in range(count)]
+
+
+def generate_dataset(series_sizes: list[int], periods: int, monthly: bool = False, missing_ratio: float = 0.0,
+                     seed: int = 0) -> dict:
+    """
+    Synthetic json-stat2 dataset, shaped as SiStat PX table response: one dimension per entry of `series_sizes`
+    and time dimension last (changes fastest)
+    :param series_sizes: number of categories of every non-time dimension
+    :param periods: number of time periods (years from 1900 or months from 1990M01)
+    :param monthly: monthly (MESEC) or yearly (LETO) time dimension
+    :param missing_ratio: share of missing (null) values
+    :param seed: random seed, same seed gives same dataset
+    :return: json-stat2 dataset
+    """
+    rnd = random.Random(seed)
+    time_dimension = "MESEC" if monthly else "LETO"
+    ids = [f"DIM{pos}" for pos in range(len(series_sizes))] + [time_dimension]
+    sizes = list(series_sizes) + [periods]
+    dimension = {f"DIM{pos}": {"label": f"Dimension {pos}",
+                               "category": {"index": {str(idx): idx for idx in range(size)},
+                                            "label": {str(idx): f"Category {pos}.{idx}" for idx in range(size)}}}
+                 for pos, size in enumerate(series_sizes)}
+    time_codes = _periods(periods, monthly)
+    dimension[time_dimension] = {"label": time_dimension,
+                                 "category": {"index": {code: idx for idx, code in enumerate(time_codes)},
+                                              "label": {code: code for code in time_codes}}}
+    values = [None if missing_ratio and rnd.random() < missing_ratio else round(rnd.uniform(0, 10000), 1)
+              for _ in range(math.prod(sizes))]
+    return {"version": "2.0", "class": "dataset", "label": "Synthetic dataset", "source": "Benchmark",
+            "updated": "2024-01-01T00:00:00Z", "id": ids, "size": sizes, "dimension": dimension,
+            "role": {"time": [time_dimension]}, "value": values}
+
+
+def generate_cells(cells: int, monthly: bool = False, seed: int = 0) -> dict:
+    """
+    Synthetic json-stat2 dataset with about given number of cells, split into two non-time dimensions
+    :param cells: number of values
+    :param monthly: monthly or yearly time dimension
+    :param seed: random seed
+    :return: json-stat2 dataset
+    """
+    periods = max(1, min(cells, 240 if monthly else 100))
+    series = max(1, cells // periods)
+    first = max(1, int(math.sqrt(series)))
+    return generate_dataset([first, max(1, series // first)], periods, monthly, seed=seed)
+
+
+def encode(dataset: dict) -> bytes:
+    return json.dumps(dataset, ensure_ascii=False).encode()
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections.abc import Callable
+
+from app_context import AppContext
+from benchmark.generator import encode, generate_cells
+from benchmark.stubs import DataboxStub, SiStatStub, StubBehaviour
+from config.configs import AppConfig, RequestPost, get_local_config
+from databox_main import one_time_send
+from response.json_stat import decode
+from response.response_init import ResponseInit
+
+logger = logging.getLogger(__name__)
+
+
+def measure(function: Callable[[], object], repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summary(timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+    return (f"min {ordered[0] * 1000:9.2f} ms, median {statistics.median(ordered) * 1000:9.2f} ms, "
+            f"p95 {p95 * 1000:9.2f} ms")
+
+
+def micro_benchmarks(cells_list: list[int], repeat: int) -> None:
+    """
+    Parser micro-benchmarks: json.loads, json-stat2 decode, parse() and push payload encoding
+    :param cells_list: dataset sizes in number of cells
+    :param repeat: repetitions of every measurement
+    :return: N/A
+    """
+    for cells in cells_list:
+        body = encode(generate_cells(cells, monthly=True))
+        raw_response = json.loads(body)
+        response_unit = ResponseInit(raw_response, "bench", "bench", 200, "MESEC").parse()
+        stages = {
+            "json.loads": lambda: json.loads(body),
+            "decode": lambda: decode(raw_response, "MESEC"),
+            "parse": lambda: ResponseInit(raw_response, "bench", "bench", 200, "MESEC").parse(),
+            "payload": lambda: ResponseInit(raw_response, "bench", "bench", 200, "MESEC").parse().payload(),
+        }
+        print(f"cells: {cells}, response bytes: {len(body)}, data points: {len(response_unit)}")
+        for stage, function in stages.items():
+            timings = measure(function, repeat)
+            print(f"  {stage:<10} {summary(timings)}, {cells / min(timings):,.0f} cells/s")
+
+
+def benchmark_config(sistat: SiStatStub, databox: DataboxStub, tables: list[str], unlimited: bool = False,
+                     parse_workers: int = 0) -> AppConfig:
+    app_config = get_local_config()
+    app_config.fetch_parse_workers = parse_workers
+    if unlimited:
+        # measure the pipeline, not configured request rates
+        app_config.fetch_limit.rate_per_sec = 0
+        app_config.databox_limit.rate_per_sec = 0
+    app_config.requests = [RequestPost(table, sistat.table_url(table), {}, table, "MESEC", "N") for table in tables]
+    app_config.derived_metrics = []
+    app_config.databox_configuration.host = databox.url("")
+    app_config.push_queue_enabled = False
+    app_config.series_snapshot_enabled = False
+    app_config.request_cache_enabled = False
+    app_config.databox_delta_push = False
+    app_config.metrics_endpoint_enabled = False
+    return app_config
+
+
+async def end_to_end(sources: int, cells: int, iterations: int,
+                     sistat_behaviour: StubBehaviour, databox_behaviour: StubBehaviour,
+                     unlimited: bool = False, parse_workers: int = 0) -> None:
+    """
+    End-to-end `one_time_send` against local SiStat and databox stubs
+    :param sources: number of source tables
+    :param cells: cells of every table
+    :param iterations: number of `one_time_send` runs
+    :param sistat_behaviour: latency, errors and throttling of SiStat stub
+    :param databox_behaviour: latency, errors and throttling of databox stub
+    :param unlimited: disable configured request rate limits
+    :param parse_workers: parse responses in worker processes
+    :return: N/A
+    """
+    tables = {f"T{idx}": encode(generate_cells(cells, monthly=True, seed=idx)) for idx in range(sources)}
+    async with SiStatStub(tables, sistat_behaviour) as sistat, DataboxStub(databox_behaviour) as databox:
+        app_config = benchmark_config(sistat, databox, list(tables), unlimited, parse_workers)
+        timings = []
+        async with AppContext(app_config) as app_context:
+            for _ in range(iterations):
+                start = time.perf_counter()
+                await one_time_send(app_context)
+                timings.append(time.perf_counter() - start)
+        total = sum(timings)
+        print(f"end-to-end: sources: {sources}, cells per source: {cells}, iterations: {iterations}")
+        print(f"  one_time_send {summary(timings)}")
+        print(f"  SiStat requests: {sistat.counters.requests}, errors: {sistat.counters.errors}, "
+              f"throttled: {sistat.counters.throttled}, MB: {sistat.counters.bytes / 1e6:.2f}")
+        print(f"  databox pushes: {databox.counters.requests}, errors: {databox.counters.errors}, "
+              f"throttled: {databox.counters.throttled}, data points: {databox.counters.points}, "
+              f"{databox.counters.points / total:,.0f} points/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks with local SiStat and databox stubs")
+    parser.add_argument("--cells", type=int, nargs="+", default=[100, 10_000, 1_000_000],
+                        help="dataset sizes of parser micro-benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of micro-benchmarks")
+    parser.add_argument("--sources", type=int, default=4, help="number of source tables (end-to-end)")
+    parser.add_argument("--source-cells", type=int, default=10_000, help="cells of every table (end-to-end)")
+    parser.add_argument("--iterations", type=int, default=10, help="number of one_time_send runs")
+    parser.add_argument("--latency", type=float, default=0.05, help="SiStat stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of SiStat 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of SiStat 429 responses")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After of 429 responses")
+    parser.add_argument("--databox-latency", type=float, default=0.02, help="databox stub latency in seconds")
+    parser.add_argument("--databox-error-rate", type=float, default=0.0, help="share of databox 500 responses")
+    parser.add_argument("--databox-throttle-rate", type=float, default=0.0, help="share of databox 429 responses")
+    parser.add_argument("--unlimited", action="store_true", help="disable configured request rate limits")
+    parser.add_argument("--parse-workers", type=int, default=0, help="parse responses in worker processes")
+    parser.add_argument("--skip-micro", action="store_true", help="skip parser micro-benchmarks")
+    parser.add_argument("--skip-end-to-end", action="store_true", help="skip end-to-end benchmark")
+    args = parser.parse_args()
+    if not args.skip_micro:
+        micro_benchmarks(args.cells, args.repeat)
+    if not args.skip_end_to_end:
+        asyncio.run(end_to_end(args.sources, args.source_cells, args.iterations,
+                               StubBehaviour(args.latency, args.error_rate, args.throttle_rate, args.retry_after),
+                               StubBehaviour(args.databox_latency, args.databox_error_rate,
+                                             args.databox_throttle_rate, args.retry_after),
+                               args.unlimited, args.parse_workers))
+
+
+if __name__ == "__main__":
+    # application logs only on warnings, benchmark results are printed
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import logging
+import random
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StubBehaviour:
+    latency_sec: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after_sec: float = 0.0
+
+
+@dataclass
+class StubCounters:
+    requests: int = 0
+    errors: int = 0
+    throttled: int = 0
+    bytes: int = 0
+    points: int = 0
+
+
+class Stub(ABC):
+    """
+    Local aiohttp server imitating remote API with configurable latency, error rate (500) and throttling
+    (429 with `Retry-After`)
+    """
+
+    def __init__(self, behaviour: StubBehaviour | None = None, seed: int = 0) -> None:
+        self.behaviour = behaviour or StubBehaviour()
+        self.random = random.Random(seed)
+        self.counters = StubCounters()
+        self.server: TestServer | None = None
+
+    @abstractmethod
+    def routes(self, app: web.Application) -> None:
+        pass
+
+    async def start(self) -> "Stub":
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.routes(app)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return self
+
+    async def close(self) -> None:
+        if self.server is not None:
+            await self.server.close()
+            self.server = None
+
+    async def __aenter__(self) -> "Stub":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    def url(self, path: str) -> str:
+        return str(self.server.make_url(path))
+
+    async def misbehave(self) -> web.Response | None:
+        """
+        Apply latency, errors and throttling
+        :return: error response, None when request should be served
+        """
+        self.counters.requests += 1
+        if self.behaviour.latency_sec > 0:
+            await asyncio.sleep(self.behaviour.latency_sec)
+        if self.random.random() < self.behaviour.throttle_rate:
+            self.counters.throttled += 1
+            return web.Response(status=429, headers={"Retry-After": f"{self.behaviour.retry_after_sec:g}"})
+        if self.random.random() < self.behaviour.error_rate:
+            self.counters.errors += 1
+            return web.Response(status=500)
+        return None
+
+
+class SiStatStub(Stub):
+    """
+    SiStat PX `Data/{table}.px` endpoint, returns pre-encoded json-stat2 dataset of the table
+    """
+
+    def __init__(self, tables: dict[str, bytes], behaviour: StubBehaviour | None = None, seed: int = 0) -> None:
+        super().__init__(behaviour, seed)
+        self.tables = tables
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/SiStatData/api/v1/sl/Data/{table}", self.handle_data)
+
+    def table_url(self, table: str) -> str:
+        return self.url(f"/SiStatData/api/v1/sl/Data/{table}.px")
+
+    async def handle_data(self, request: web.Request) -> web.Response:
+        await request.read()
+        error_response = await self.misbehave()
+        if error_response is not None:
+            return error_response
+        body = self.tables[request.match_info["table"].removesuffix(".px")]
+        self.counters.bytes += len(body)
+        return web.Response(body=body, content_type="application/json")
+
+
+class DataboxStub(Stub):
+    """
+    Databox push API `/data` endpoint, counts received data points and bytes
+    """
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/data", self.handle_data)
+
+    async def handle_data(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        error_response = await self.misbehave()
+        if error_response is not None:
+            return error_response
+        self.counters.bytes += len(body)
+        self.counters.points += len(json.loads(body))
+        return web.json_response({"status": "OK"})
@@ -1,32 +1,38 @@
 import logging
 import os
+import pickle
+import stat
 import sys
-from dataclasses import dataclass
-from enum import Enum
-
-import databox
-import yaml
-
-from util.helper import from_str_to_enum
+from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
 # config folder for local config
 CONFIG_FOLDER = "config"
-
-
-class RequestType(Enum):
-    AVERAGE_PAY = 1
-    BIRTH_RATE = 2
-    DEATH_RATE = 3
-    BIRTH_DEATH_RATIO = 4
+# validated config is cached next to config file, bump when snapshot format changes
+SNAPSHOT_SUFFIX = ".snapshot"
+SNAPSHOT_VERSION = 1
 
 
 @dataclass
 class RequestPost:
+    name: str
     url: str
     data: dict
     metric_key: str
-    type: RequestType
+    time_dimension: str | None = None
+    unit: str | None = None
+    interval_sec: int | None = None
+    cron: str | None = None
+
+
+@dataclass
+class DerivedMetric:
+    name: str
+    metric_key: str
+    formula: str
+    inputs: list[str]
+    unit: str | None = None
+    window: int = 1
 
 
 @dataclass
@@ -36,41 +42,246 @@ class RequestTimeout:
     request_databox_total: int
 
 
+@dataclass
+class EndpointLimit:
+    rate_per_sec: float
+    burst: float
+    initial_concurrency: int
+    max_concurrency: int
+    latency_target_sec: float
+
+
+@dataclass
+class RetryPolicy:
+    retries: int
+    backoff_base_sec: float
+    backoff_max_sec: float
+    deadline_sec: float
+
+
+@dataclass
+class DataboxTarget:
+    name: str
+    username: str
+    # databox_config.host when not set
+    host: str | None = None
+    # metric key of this account by metric key of the source
+    metric_keys: dict[str, str] = field(default_factory=dict)
+
+
 @dataclass
 class AppConfig:
     requests: dict
     request_timeouts: dict
     databox_config: dict
     periodic: dict
+    request_cache: dict = field(default_factory=dict)
+    push_queue: dict = field(default_factory=dict)
+    transport: dict = field(default_factory=dict)
+    fetch: dict = field(default_factory=dict)
+    metrics: dict = field(default_factory=dict)
+    logging: dict = field(default_factory=dict)
+    ingest: dict = field(default_factory=dict)
+    series_snapshot: dict = field(default_factory=dict)
+    profiling: dict = field(default_factory=dict)
 
     def __post_init__(self):
-        average_pay_main = RequestType.AVERAGE_PAY.name.lower()
-        birth_rate_main = RequestType.BIRTH_RATE.name.lower()
-        death_rate_main = RequestType.DEATH_RATE.name.lower()
-        average_pay = RequestPost(self.requests[average_pay_main]["url"],
-                                  self.requests[average_pay_main]["data"],
-                                  self.requests[average_pay_main]["metric_key"],
-                                  from_str_to_enum(RequestType, average_pay_main))
-        birth_rate = RequestPost(self.requests[birth_rate_main]["url"],
-                                 self.requests[birth_rate_main]["data"],
-                                 self.requests[birth_rate_main]["metric_key"],
-                                 from_str_to_enum(RequestType, birth_rate_main))
-        death_rate = RequestPost(self.requests[death_rate_main]["url"],
-                                 self.requests[death_rate_main]["data"],
-                                 self.requests[death_rate_main]["metric_key"],
-                                 from_str_to_enum(RequestType, death_rate_main))
-        self.birth_death_ratio_metric_key: str = self.requests["birth_death_ratio"]["metric_key"]
+        # every request with url is a source, others are derived from sources
+        sources = [RequestPost(name,
+                               request["url"],
+                               request["data"],
+                               request["metric_key"],
+                               request.get("time_dimension"),
+                               request.get("unit"),
+                               request.get("interval_sec"),
+                               request.get("cron"))
+                   for name, request in self.requests.items() if "url" in request]
+        self.derived_metrics: list[DerivedMetric] = [DerivedMetric(name,
+                                                                   request["metric_key"],
+                                                                   request["formula"],
+                                                                   list(request["inputs"]),
+                                                                   request.get("unit"),
+                                                                   int(request.get("window", 1)))
+                                                     for name, request in self.requests.items()
+                                                     if "url" not in request]
         self.request_timeout = RequestTimeout(int(self.request_timeouts["connect_sec"]),
                                               int(self.request_timeouts["request_sec"]),
                                               int(self.request_timeouts["request_databox_total"]))
-        self.databox_configuration = databox.Configuration(
-            host=self.databox_config["host"],
-            username=self.databox_config["username"],
-            password="")
+        self._databox_configuration = None
         self.databox_push_parallel = bool(self.databox_config["push_parallel"])
+        self.databox_max_concurrency = int(self.databox_config.get("max_concurrency", 4))
+        self.databox_batch_max_points = int(self.databox_config.get("batch_max_points", 1000))
+        self.databox_batch_max_bytes = int(self.databox_config.get("batch_max_bytes", 256 * 1024))
+        self.databox_batch_retries = int(self.databox_config.get("batch_retries", 2))
+        self.databox_delta_push = bool(self.databox_config.get("delta_push", False))
+        self.databox_full_resync_cycles = int(self.databox_config.get("full_resync_cycles", 0))
+        # accounts besides the default one (databox_config.username), every metric is pushed to all of them
+        self.databox_targets = [DataboxTarget(str(target["name"]),
+                                              str(target["username"]),
+                                              target.get("host"),
+                                              dict(target.get("metric_keys") or {}))
+                                for target in self.databox_config.get("targets") or []]
         self.periodic_enabled = bool(self.periodic["enabled"])
         self.periodic_time = int(self.periodic["time_sec"])
-        self.requests: list[RequestPost] = [average_pay, birth_rate, death_rate]
+        self.periodic_jitter = float(self.periodic.get("jitter_sec", 0))
+        self.periodic_per_source = bool(self.periodic.get("per_source", False))
+        self.request_cache_enabled = bool(self.request_cache.get("enabled", False))
+        self.request_cache_ttl = int(self.request_cache.get("ttl_sec", 0))
+        self.request_cache_max_entries = int(self.request_cache.get("max_entries", 256))
+        self.push_queue_enabled = bool(self.push_queue.get("enabled", False))
+        self.push_queue_directory = str(self.push_queue.get("directory", "push_queue"))
+        self.push_queue_capacity = int(self.push_queue.get("capacity", 10000))
+        self.push_queue_batch_size = int(self.push_queue.get("batch_size", 100))
+        self.push_queue_flush_every = int(self.push_queue.get("flush_every", 250))
+        self.push_queue_flush_interval = int(self.push_queue.get("periodic_flush_interval_sec", 10))
+        self.push_queue_segment_max_bytes = int(self.push_queue.get("segment_max_bytes", 1024 * 1024))
+        self.push_queue_fsync = bool(self.push_queue.get("fsync", False))
+        self.transport_limit = int(self.transport.get("limit", 100))
+        self.transport_limit_per_host = int(self.transport.get("limit_per_host", 10))
+        self.transport_keepalive_timeout = int(self.transport.get("keepalive_timeout_sec", 60))
+        self.transport_dns_cache_ttl = int(self.transport.get("dns_cache_ttl_sec", 300))
+        self.transport_compression = bool(self.transport.get("compression", True))
+        self.fetch_max_concurrency = int(self.fetch.get("max_concurrency", 8))
+        self.fetch_limit = EndpointLimit(float(self.fetch.get("rate_per_sec", 0)),
+                                         float(self.fetch.get("burst", 1)),
+                                         int(self.fetch.get("initial_concurrency", self.fetch_max_concurrency)),
+                                         self.fetch_max_concurrency,
+                                         float(self.fetch.get("latency_target_sec",
+                                                              self.request_timeout.request_timeout)))
+        self.fetch_retry = RetryPolicy(int(self.fetch.get("retries", 0)),
+                                       float(self.fetch.get("backoff_base_sec", 0.5)),
+                                       float(self.fetch.get("backoff_max_sec", 10)),
+                                       float(self.fetch.get("cycle_deadline_sec", 60)))
+        self.fetch_streaming = bool(self.fetch.get("streaming", False))
+        self.fetch_parse_workers = int(self.fetch.get("parse_workers", 0))
+        self.fetch_parse_offload_min_bytes = int(self.fetch.get("parse_offload_min_bytes", 1024 * 1024))
+        self.fetch_hedge_enabled = bool(self.fetch.get("hedge_enabled", False))
+        self.fetch_hedge_percentile = float(self.fetch.get("hedge_percentile", 95))
+        self.fetch_hedge_min_delay = float(self.fetch.get("hedge_min_delay_sec", 1))
+        self.fetch_hedge_window = int(self.fetch.get("hedge_window", 50))
+        self.fetch_hedge_min_samples = int(self.fetch.get("hedge_min_samples", 5))
+        self.fetch_circuit_failure_threshold = int(self.fetch.get("circuit_failure_threshold", 0))
+        self.fetch_circuit_reset = float(self.fetch.get("circuit_reset_sec", 60))
+        self.fetch_incremental = bool(self.fetch.get("incremental", False))
+        self.fetch_incremental_overlap = int(self.fetch.get("incremental_overlap", 2))
+        self.fetch_backfill_cycles = int(self.fetch.get("backfill_cycles", 0))
+        self.databox_limit = EndpointLimit(float(self.databox_config.get("rate_per_sec", 0)),
+                                           float(self.databox_config.get("burst", 1)),
+                                           int(self.databox_config.get("initial_concurrency",
+                                                                       self.databox_max_concurrency)),
+                                           self.databox_max_concurrency,
+                                           float(self.databox_config.get("latency_target_sec",
+                                                                         self.request_timeout.request_databox_total)))
+        self.databox_retry = RetryPolicy(self.databox_batch_retries,
+                                         float(self.databox_config.get("backoff_base_sec", 0.5)),
+                                         float(self.databox_config.get("backoff_max_sec", 10)),
+                                         float(self.databox_config.get("cycle_deadline_sec", 60)))
+        self.metrics_enabled = bool(self.metrics.get("enabled", False))
+        self.metrics_endpoint_enabled = bool(self.metrics.get("endpoint_enabled", False))
+        self.metrics_host = str(self.metrics.get("host", "127.0.0.1"))
+        self.metrics_port = int(self.metrics.get("port", 9464))
+        self.series_snapshot_enabled = bool(self.series_snapshot.get("enabled", False))
+        self.series_snapshot_file = str(self.series_snapshot.get("file", "series.snapshot"))
+        self.ingest_enabled = bool(self.ingest.get("enabled", False))
+        self.ingest_adapter = str(self.ingest.get("adapter", "webhook"))
+        self.ingest_host = str(self.ingest.get("host", "127.0.0.1"))
+        self.ingest_port = int(self.ingest.get("port", 8080))
+        self.ingest_path = str(self.ingest.get("path", "/events"))
+        self.ingest_batch_max_points = int(self.ingest.get("batch_max_points", 500))
+        self.ingest_batch_window = float(self.ingest.get("batch_window_ms", 50)) / 1000
+        self.ingest_max_pending = int(self.ingest.get("max_pending", 10000))
+        self.profiling_cycles = int(self.profiling.get("cycles", 0))
+        self.profiling_signal_cycles = int(self.profiling.get("signal_cycles", 0))
+        self.profiling_directory = str(self.profiling.get("directory", "profiles"))
+        self.profiling_cprofile = bool(self.profiling.get("cprofile", True))
+        self.profiling_sampling_interval = float(self.profiling.get("sampling_interval_ms", 5)) / 1000
+        self.profiling_tracemalloc = bool(self.profiling.get("tracemalloc", True))
+        self.profiling_top_allocations = int(self.profiling.get("top_allocations", 25))
+        self.profiling_slow_callback = float(self.profiling.get("slow_callback_ms", 100)) / 1000
+        self.logging_level = str(self.logging.get("level", "INFO")).upper()
+        self.logging_file = str(self.logging.get("file", "app.log"))
+        self.logging_queue = bool(self.logging.get("queue", False))
+        self.logging_max_message_length = int(self.logging.get("max_message_length", 0))
+        self.logging_sampling = {name: float(rate) for name, rate in (self.logging.get("sampling") or {}).items()}
+        self.logging_rate_limits = {name: float(rate)
+                                    for name, rate in (self.logging.get("rate_limits") or {}).items()}
+        self.requests: list[RequestPost] = sources
+
+    @property
+    def databox_configuration(self):
+        """
+        databox SDK configuration, SDK is imported only when databox is used
+        :return: databox.Configuration
+        """
+        if self._databox_configuration is None:
+            import databox
+            self._databox_configuration = databox.Configuration(
+                host=self.databox_config["host"],
+                username=self.databox_config["username"],
+                password="")
+        return self._databox_configuration
+
+    def databox_target_configuration(self, target: DataboxTarget):
+        """
+        databox SDK configuration of additional target account
+        :param target: databox account
+        :return: databox.Configuration
+        """
+        import databox
+        return databox.Configuration(host=target.host or self.databox_configuration.host,
+                                     username=target.username,
+                                     password="")
+
+
+def _snapshot_key(config_path: str) -> tuple:
+    # snapshot is valid for the same config file and the same config code
+    config_stat = os.stat(config_path)
+    code_stat = os.stat(__file__)
+    return SNAPSHOT_VERSION, sys.version_info[:2], config_stat.st_mtime_ns, config_stat.st_size, code_stat.st_mtime_ns
+
+
+def load_snapshot(config_path: str) -> AppConfig | None:
+    """
+    Load validated config snapshot, snapshot is invalid when config file (or config code) changed.
+    Unpickling can run code, so snapshot owned by another user or writable by group or others is not loaded
+    :param config_path: config file path
+    :return: config or None when there is no valid snapshot
+    """
+    snapshot_path = config_path + SNAPSHOT_SUFFIX
+    try:
+        with open(snapshot_path, "rb") as snapshot_file:
+            snapshot_stat = os.fstat(snapshot_file.fileno())
+            if snapshot_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH) or \
+                    (hasattr(os, "getuid") and snapshot_stat.st_uid != os.getuid()):
+                logger.warning(f"Config snapshot {snapshot_path} ignored, it is not private to this user")
+                return None
+            key, app_config = pickle.load(snapshot_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    return app_config if key == _snapshot_key(config_path) else None
+
+
+def store_snapshot(config_path: str, app_config: AppConfig) -> None:
+    """
+    Store validated config snapshot atomically and readable only by this user (0600), failure
+    (e.g. read-only file system) is not an error
+    :param config_path: config file path
+    :param app_config: validated config
+    """
+    snapshot_path = config_path + SNAPSHOT_SUFFIX
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        # mode of already existing file is not changed by os.open
+        if hasattr(os, "fchmod"):
+            os.fchmod(descriptor, 0o600)
+        with os.fdopen(descriptor, "wb") as snapshot_file:
+            pickle.dump((_snapshot_key(config_path), app_config), snapshot_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, snapshot_path)
+    except OSError as e:
+        logger.warning(f"Config snapshot not stored: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
 
 def get_local_config() -> AppConfig:
@@ -80,8 +291,15 @@ def get_local_config() -> AppConfig:
         local_config_path = os.path.join(head, CONFIG_FOLDER, f"{CONFIG_FOLDER}.yml")
     else:
         local_config_path = os.path.join(os.getcwd(), CONFIG_FOLDER, f"{CONFIG_FOLDER}.yml")
+    # validated config from snapshot, YAML is parsed only when config file changed
+    local_config = load_snapshot(local_config_path)
+    if local_config is not None:
+        return local_config
+    import yaml
     # try to open local config file
     with open(local_config_path, "r") as yml_file:
-        local_config_data = yaml.load(yml_file, Loader=yaml.FullLoader)
+        local_config_data = yaml.load(yml_file, Loader=yaml.CSafeLoader if hasattr(yaml, "CSafeLoader")
+                                      else yaml.SafeLoader)
         local_config = AppConfig(**local_config_data)
+    store_snapshot(local_config_path, local_config)
     return local_config
@@ -1,221 +1,644 @@
 import asyncio
 import json
 import logging
+import signal
 import time
+from collections.abc import Awaitable
+from contextlib import nullcontext
+from typing import TYPE_CHECKING
 
 import aiohttp
-import databox
 from aiohttp import ClientSession
-from databox import PushData, ApiException
 
-from config.configs import get_local_config, RequestPost, RequestTimeout, RequestType, AppConfig
-from response.average_pay import AveragePay
-from response.birth_rate import BirthRate
-from response.death_rate import DeathRate
+from app_context import AppContext
+from config.configs import get_local_config, RequestPost, RequestTimeout, AppConfig
+from fetch.circuit_breaker import CircuitBreakers, CircuitState
+from fetch.hedging import Hedging, LatencyWindow
+from fetch.incremental import IncrementalFetch
+from fetch.limiter import EndpointLimiter, Limiters, NO_RESPONSE_STATUS, backoff_delay, is_retryable
+from fetch.response_cache import ResponseCache
+from push.batching import PushBatch, create_batches
+from push.databox_client import DataboxClient
+from push.push_queue import PushQueue
+from push.targets import PushTarget, TargetStatus
+from response.json_stat_stream import read_json_stat
+from response.parse_pool import ParsePool
+from response.registry import create_response, time_dimension_of
 from response.response_init import ResponseUnit
-from util.helper import assert_true
+from scheduling.cron import CronExpression
+from scheduling.scheduler import Schedule, Scheduler
+from telemetry.logs import log_type, setup_logging
+from telemetry.metrics import MetricsRegistry
+from telemetry.profiling import track_allocations
+from telemetry.trace import FETCH_RECEIVED_BYTES, FETCH_STAGE_SECONDS
 
+if TYPE_CHECKING:
+    from ingest.sources import MemoryBroker
 
-async def push_data_to_databox(metrics: ResponseUnit, app_config: AppConfig) -> int:
+logger = logging.getLogger(__name__)
+# schedule name when all sources are polled together
+ALL_SOURCES = "all"
+# metric names (histograms in seconds and counters)
+PUSH_SECONDS = "push_seconds"
+PUSH_BYTES = "push_bytes_total"
+PUSH_POINTS = "push_points_total"
+FETCH_POINTS = "fetch_points_total"
+CYCLE_SECONDS = "cycle_seconds"
+
+
+async def push_data_to_databox(batch: PushBatch, databox_client: DataboxClient,
+                               status: TargetStatus | None = None) -> int:
     """
-    Push individual data to databox
-    :param metrics: metrics data
-    :param app_config: application config
+    Push one batch of data to databox
+    :param batch: batch of data points from one or more metrics
+    :param databox_client: databox client of the target account
+    :param status: push status of the target account
     :return: response status
     """
-    with databox.ApiClient(app_config.databox_configuration, "Accept",
-                           "application/vnd.databox.v2+json", ) as api_client:
-        response_status = 200
-        api_instance = databox.DefaultApi(api_client)
-        logger.info(f"Databox push, metric name: {metrics.databox_units[0].key}, "
-                    f"data type: {metrics.data_type}, metric length: {len(metrics.databox_units)}")
-        try:
-            api_instance.data_post(push_data=metrics.databox_units,
-                                   _request_timeout=app_config.request_timeout.request_databox_total)
-            return response_status
-        except ApiException as api_err:
-            # Handle exceptions that occur during the API call, such as invalid data or authentication issues
-            logger.error(f"API Exception occurred: {api_err}")
-            return 400
-        except Exception as e:
-            # Handle any other unexpected exceptions
-            logger.error(f"An unexpected error occurred: {e}")
-            return 500
+    batch.attempts += 1
+    logger.info("Databox push to %s, metric names: %s, batch length: %d, batch bytes: %d, attempt: %d",
+                databox_client.name, batch.metric_keys(), len(batch), batch.size_bytes, batch.attempts,
+                extra=log_type("push"))
+    start = time.perf_counter()
+    try:
+        batch.status = await databox_client.data_post(batch.payload())
+    except (aiohttp.ClientError, asyncio.TimeoutError) as api_err:
+        # Handle exceptions that occur during the API call, such as connection issues or timeouts
+        logger.error(f"API Exception occurred: {api_err!r}")
+        batch.status = NO_RESPONSE_STATUS
+    except Exception as e:
+        # Handle any other unexpected exceptions
+        logger.error(f"An unexpected error occurred: {e}")
+        batch.status = 500
+    if status is not None:
+        status.record(batch.status, len(batch))
+    metrics = databox_client.metrics
+    if metrics is not None:
+        labels = {"target": databox_client.name, "status": str(batch.status)}
+        metrics.observe(PUSH_SECONDS, time.perf_counter() - start, **labels)
+        metrics.increment(PUSH_BYTES, batch.size_bytes, **labels)
+        metrics.increment(PUSH_POINTS, len(batch), **labels)
+    return batch.status
 
 
 async def push_to_databox(all_metrics: list[ResponseUnit],
-                          app_config: AppConfig) -> list[int]:
+                          databox_client: DataboxClient,
+                          app_config: AppConfig,
+                          metric_keys: dict[str, str] | None = None,
+                          status: TargetStatus | None = None) -> list[PushBatch]:
     """
-    Push data to databox in parallel on in serial - depends of configuration
+    Push data to databox in parallel on in serial - depends of configuration.
+    Data points of all metrics are merged into batches capped by `databox_config.batch_max_points` and
+    `databox_config.batch_max_bytes`. Parallel pushes share one client and overlap up to its concurrency window.
+    Only batches that failed with retryable status are pushed again, up to `databox_config.batch_retries`, with
+    exponential backoff and only while retry can finish before `databox_config.cycle_deadline_sec`
     :param all_metrics: all metrics
+    :param databox_client: databox client of the target account
     :param app_config: application config
-    :return: response statuses from all tasks
+    :param metric_keys: metric key of the target account by metric key of the source
+    :param status: push status of the target account
+    :return: pushed batches with response statuses
     """
-    if app_config.databox_push_parallel:
-        tasks = []
-        for metric in all_metrics:
-            tasks.append(asyncio.create_task(push_data_to_databox(metric, app_config)))
-        response_statuses: list[int] = await asyncio.gather(*tasks)
-    else:
-        response_statuses: list[int] = []
-        for metric in all_metrics:
-            response_status = await push_data_to_databox(metric, app_config)
-            response_statuses.append(response_status)
+    retry_policy = app_config.databox_retry
+    deadline = time.monotonic() + retry_policy.deadline_sec
+    with track_allocations("push_payload"):
+        batches = create_batches(all_metrics, app_config.databox_batch_max_points,
+                                 app_config.databox_batch_max_bytes, metric_keys)
+    pending = batches
+    for attempt in range(1 + retry_policy.retries):
+        if attempt > 0:
+            delay = backoff_delay(attempt, retry_policy, databox_client.limiter.retry_after())
+            if time.monotonic() + delay + app_config.request_timeout.request_databox_total > deadline:
+                logger.warning(f"Databox push retry to {databox_client.name} skipped, cycle deadline would be "
+                               f"exceeded, failed batches: {len(pending)}")
+                break
+            await asyncio.sleep(delay)
+        if app_config.databox_push_parallel:
+            tasks = []
+            for batch in pending:
+                tasks.append(asyncio.create_task(push_data_to_databox(batch, databox_client, status)))
+            await asyncio.gather(*tasks)
+        else:
+            for batch in pending:
+                await push_data_to_databox(batch, databox_client, status)
+        # client errors (400, 401, 422) fail again, only overload, server errors and timeouts are retried
+        pending = [batch for batch in pending if not batch.succeeded and is_retryable(batch.status)]
+        if not pending:
+            break
 
-    return response_statuses
+    return batches
+
+
+async def drain_push_queue(push_queue: PushQueue, databox_client: DataboxClient, app_config: AppConfig,
+                           status: TargetStatus | None = None) -> None:
+    """
+    Push all queued data points in batches. Batch is acknowledged only after successful push, on first failed
+    batch draining stops and data stays queued for next flush
+    :param push_queue: durable push queue of the target account
+    :param databox_client: databox client of the target account
+    :param app_config: application config
+    :param status: push status of the target account
+    :return: N/A
+    """
+    push_queue.flushed()
+    while True:
+        items, position = push_queue.read(app_config.push_queue_batch_size, app_config.databox_batch_max_bytes)
+        if not items:
+            return
+        batch = PushBatch(items=items, size_bytes=sum(len(item) + 2 for item in items) + 2)
+        await push_data_to_databox(batch, databox_client, status)
+        if not batch.succeeded:
+            logger.warning(f"Push queue flush to {databox_client.name} failed, status: {batch.status}, "
+                           f"pending data points: {len(push_queue)}")
+            return
+        await push_queue.acknowledge(position, len(items))
+
+
+async def flush_push_queue(app_context: AppContext, target: PushTarget) -> None:
+    """
+    Background push queue flusher of one target account. Flushes every `push_queue.flush_every` inserted data points
+    or every `push_queue.periodic_flush_interval_sec`
+    :param app_context: application context
+    :param target: databox target account
+    :return: N/A
+    """
+    push_queue = target.push_queue
+    app_config = app_context.app_config
+    while True:
+        try:
+            await asyncio.wait_for(push_queue.flush_requested.wait(), app_config.push_queue_flush_interval)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await drain_push_queue(push_queue, target.client, app_config, target.status)
+        except Exception as e:
+            logger.error(f"Push queue flush error ({target.name})! {e}")
 
 
 async def make_post_request(request_post: RequestPost,
                             request_timeout: RequestTimeout,
-                            session: ClientSession) -> ResponseUnit:
+                            session: ClientSession,
+                            response_cache: ResponseCache | None = None,
+                            limiter: EndpointLimiter | None = None,
+                            latency_window: LatencyWindow | None = None,
+                            metrics: MetricsRegistry | None = None,
+                            parse_pool: ParsePool | None = None,
+                            streaming: bool = False) -> ResponseUnit:
     """
     Makes a single POST request with timeouts.
     :param request_post: request data
     :param request_timeout: request timeouts
     :param session: client session
+    :param response_cache: reuse already parsed response when data didn't change
+    :param limiter: rate and concurrency limiter of the endpoint
+    :param latency_window: recent latencies of the URL, used for hedging
+    :param metrics: metrics registry for stage timings (body, json_loads, parse) and point counts
+    :param parse_pool: decode and parse large responses in worker processes
+    :param streaming: parse json-stat2 response while it is read, in chunks
     :return: response unit with all the data
     """
+    response_status = NO_RESPONSE_STATUS
+    request_start = time.monotonic()
     try:
-        response_status = -1
-        headers = {"Content-Type": "application/json"}
-        logger.info(f"Making POST request to {request_post.url}, type {request_post.type.name} "
-                    f"with data: {request_post.data}")
-        async with session.post(request_post.url, json=request_post.data,
-                                headers=headers,
-                                timeout=aiohttp.ClientTimeout(connect=request_timeout.connection_timeout,
-                                                              total=request_timeout.request_timeout)) as response:
-            response_data = await response.text()
-            response_dict = json.loads(response_data)
+        cache_key = ResponseCache.cache_key(request_post.url, request_post.data)
+        cache_entry = response_cache.get(cache_key) if response_cache is not None else None
+        if cache_entry is not None and response_cache.is_fresh(cache_entry):
+            logger.info("Response cache hit for type %s", request_post.name, extra=log_type("response"))
+            return cache_entry.response_unit
+        headers = {"Content-Type": "application/json", **ResponseCache.conditional_headers(cache_entry)}
+        logger.info("Making POST request to %s, type %s with data: %s", request_post.url, request_post.name,
+                    request_post.data, extra=log_type("request"))
+        async with limiter.slot() if limiter is not None else nullcontext(), \
+                session.post(request_post.url, json=request_post.data,
+                             headers=headers, trace_request_ctx={"source": request_post.name},
+                             timeout=aiohttp.ClientTimeout(connect=request_timeout.connection_timeout,
+                                                           total=request_timeout.request_timeout)) as response:
             response_status = response.status
-            if request_post.type is RequestType.BIRTH_RATE:
-                data_point = BirthRate(response_dict, request_post.type, request_post.metric_key, response_status)
-            elif request_post.type is RequestType.DEATH_RATE:
-                data_point = DeathRate(response_dict, request_post.type, request_post.metric_key, response_status)
-            elif request_post.type is RequestType.AVERAGE_PAY:
-                data_point = AveragePay(response_dict, request_post.type, request_post.metric_key, response_status)
+            if limiter is not None:
+                limiter.record(response_status, time.monotonic() - request_start, response.headers)
+            if streaming and response_status == 200:
+                # json-stat2 is parsed while it is read, whole response text is never held in memory
+                stage_start = time.perf_counter()
+                cached_updated = cache_entry.updated if cache_entry is not None else None
+                # unchanged dataset is recognised by its `updated` field, before values are decoded
+                raw_response = await read_json_stat(
+                    response.content, cached_updated=cached_updated,
+                    on_chunk=None if metrics is None else
+                    lambda size: metrics.increment(FETCH_RECEIVED_BYTES, size, source=request_post.name))
+                updated = raw_response.get("updated") if raw_response is not None else cached_updated
+                body_end = time.perf_counter()
+                if response_cache is not None and response_cache.revalidated(cache_entry, response_status, updated):
+                    logger.info("Response not modified for type %s, updated: %s", request_post.name, updated,
+                                extra=log_type("response"))
+                    if latency_window is not None:
+                        latency_window.add(time.monotonic() - request_start)
+                    return cache_entry.response_unit
+                with track_allocations("parse"):
+                    parse = create_response(raw_response, request_post, response_status).parse()
+                if metrics is not None:
+                    metrics.observe(FETCH_STAGE_SECONDS, body_end - stage_start,
+                                    source=request_post.name, stage="stream_body")
+                    metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - body_end,
+                                    source=request_post.name, stage="parse")
             else:
-                logger.error(f"Wrong request type. Available: {request_post.type}")
-                raise ValueError("Wrong request type")
-            parse = data_point.parse()
-            logging.info(f"Response data for type {request_post.type.name}, size: {len(parse.databox_units)}")
+                stage_start = time.perf_counter()
+                response_data = await response.text() if response_status != 304 else ""
+                if metrics is not None:
+                    metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - stage_start,
+                                    source=request_post.name, stage="body")
+                updated = ResponseCache.find_updated(response_data)
+                if response_cache is not None and response_cache.revalidated(cache_entry, response_status, updated):
+                    logger.info("Response not modified for type %s, updated: %s", request_post.name, updated,
+                                extra=log_type("response"))
+                    if latency_window is not None:
+                        latency_window.add(time.monotonic() - request_start)
+                    return cache_entry.response_unit
+                stage_start = time.perf_counter()
+                if parse_pool is not None and parse_pool.offloads(response_data):
+                    parse = await parse_pool.parse(response_data, request_post, response_status)
+                    if metrics is not None:
+                        metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - stage_start,
+                                        source=request_post.name, stage="offloaded_parse")
+                else:
+                    response_dict = json.loads(response_data)
+                    json_loads_end = time.perf_counter()
+                    with track_allocations("parse"):
+                        parse = create_response(response_dict, request_post, response_status).parse()
+                    if metrics is not None:
+                        metrics.observe(FETCH_STAGE_SECONDS, json_loads_end - stage_start,
+                                        source=request_post.name, stage="json_loads")
+                        metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - json_loads_end,
+                                        source=request_post.name, stage="parse")
+            if metrics is not None:
+                metrics.increment(FETCH_POINTS, len(parse), source=request_post.name)
+            logger.info("Response data for type %s, size: %d", request_post.name, len(parse),
+                        extra=log_type("response"))
+            if response_cache is not None and response_status == 200:
+                response_cache.put(cache_key, parse, response.headers, updated)
+            # hedge delay covers the whole request, body read and parse included
+            if latency_window is not None and response_status < 400:
+                latency_window.add(time.monotonic() - request_start)
             return parse
     except aiohttp.ClientError as e:
         logger.error(f"Error making request to {request_post}: {e}")
-        return ResponseUnit([], [], request_post.type, response_status)
+        if limiter is not None and response_status == NO_RESPONSE_STATUS:
+            limiter.record(response_status, time.monotonic() - request_start)
+        return ResponseUnit.empty(request_post.name, response_status, request_post.metric_key)
     except asyncio.TimeoutError:
         logger.error(f"Timeout occurred for request to {request_post.url}")
-        return ResponseUnit([], [], request_post.type, response_status)
+        if limiter is not None and response_status == NO_RESPONSE_STATUS:
+            limiter.record(response_status, time.monotonic() - request_start)
+        return ResponseUnit.empty(request_post.name, response_status, request_post.metric_key)
     except Exception as e:
         logger.error(f"An unexpected error occurred ({request_post}): {e}")
-        return ResponseUnit([], [], request_post.type, response_status)
+        return ResponseUnit.empty(request_post.name, response_status, request_post.metric_key)
 
 
-async def get_all_metrics(app_config: AppConfig) -> list[ResponseUnit]:
+async def get_all_metrics(app_config: AppConfig,
+                          session: ClientSession,
+                          response_cache: ResponseCache | None = None,
+                          request_posts: list[RequestPost] | None = None,
+                          limiters: Limiters | None = None,
+                          deadline: float | None = None,
+                          circuit_breakers: CircuitBreakers | None = None,
+                          hedging: Hedging | None = None,
+                          metrics: MetricsRegistry | None = None,
+                          parse_pool: ParsePool | None = None,
+                          incremental: IncrementalFetch | None = None) -> list[ResponseUnit]:
     """
-    Get all the data in parallel
+    Get all the data in parallel, at most `fetch.max_concurrency` sources at once. Requests to one host are limited
+    by its rate limiter and adaptive concurrency window. Requests that failed with 429/5xx or timeout are repeated
+    with exponential backoff (or after `Retry-After`) up to `fetch.retries`, while retry can finish before deadline.
+    Slow requests are hedged, URL with open circuit is skipped and its last cached response is used instead.
+    With incremental fetch only newest periods are requested and merged into stored history of the source
     :param app_config: application config
+    :param session: shared client session
+    :param response_cache: response cache shared between cycles
+    :param request_posts: sources to get, all configured sources when not set
+    :param limiters: endpoint limiters shared between cycles
+    :param deadline: monotonic time when cycle should be finished
+    :param circuit_breakers: circuit breakers by URL shared between cycles
+    :param hedging: hedged requests with latencies by URL shared between cycles
+    :param metrics: metrics registry
+    :param parse_pool: decode and parse large responses in worker processes
+    :param incremental: stored history of sources shared between cycles
     :return:
     """
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        request_timeout = app_config.request_timeout
-        for request_post in app_config.requests:
-            tasks.append(asyncio.create_task(make_post_request(request_post, request_timeout, session)))
-        results: list[ResponseUnit] = await asyncio.gather(*tasks)
+    semaphore = asyncio.Semaphore(app_config.fetch_max_concurrency)
+    request_timeout = app_config.request_timeout
+    retry_policy = app_config.fetch_retry
 
-    return results
+    def last_good(request_post: RequestPost) -> ResponseUnit:
+        stored_unit = incremental.latest(request_post.name) if incremental is not None else None
+        if stored_unit is not None:
+            logger.warning(f"Circuit of {request_post.name} open, using stored history")
+            return stored_unit
+        cache_key = ResponseCache.cache_key(request_post.url, request_post.data)
+        cache_entry = response_cache.get(cache_key) if response_cache is not None else None
+        if cache_entry is not None:
+            logger.warning(f"Circuit of {request_post.name} open, using last cached response")
+            return cache_entry.response_unit
+        logger.warning(f"Circuit of {request_post.name} open, no cached response")
+        return ResponseUnit.empty(request_post.name, NO_RESPONSE_STATUS, request_post.metric_key)
 
+    async def bounded_request(request_post: RequestPost) -> ResponseUnit:
+        response_unit = await retried_request(request_post)
+        if incremental is not None and response_unit is not incremental.latest(request_post.name):
+            return incremental.merge(request_post, response_unit)
+        return response_unit
 
-async def find_data_unit(response_units: list[ResponseUnit], request_type: RequestType) -> ResponseUnit:
-    """
-    Find data unit by RequestType
-    :param response_units: response unit
-    :param request_type: request type
-    :return: response unit
-    """
-    for response_unit in response_units:
-        if response_unit.data_type is request_type:
-            return response_unit
-    logger.error(f"Can' find match data for type: {request_type} in {[unit.data_type for unit in response_units]}")
-    raise ValueError("Can' find match data")
+    async def retried_request(request_post: RequestPost) -> ResponseUnit:
+        query_post = incremental.query(request_post, time_dimension_of(request_post)) \
+            if incremental is not None else request_post
+        limiter = limiters.get(request_post.url) if limiters is not None else None
+        breaker = circuit_breakers.get(request_post.url) if circuit_breakers is not None else None
+        latency_window = hedging.window(request_post.url) if hedging is not None else None
+
+        def request() -> Awaitable[ResponseUnit]:
+            return make_post_request(query_post, request_timeout, session, response_cache, limiter, latency_window,
+                                     metrics, parse_pool, app_config.fetch_streaming)
 
+        def is_success(response_unit: ResponseUnit) -> bool:
+            return 200 <= response_unit.response_status < 300 or response_unit.response_status == 304
 
-async def get_birth_death_ratio(response_units: list[ResponseUnit],
-                                app_config: AppConfig) -> list[PushData]:
+        attempt = 0
+        while True:
+            if breaker is not None and not breaker.allow():
+                return last_good(request_post)
+            async with semaphore:
+                if hedging is not None:
+                    response_unit = await hedging.run(request_post.url, request, is_success)
+                else:
+                    response_unit = await request()
+            attempt += 1
+            failed = is_retryable(response_unit.response_status) or response_unit.response_status >= 500
+            if breaker is not None:
+                if failed:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            if not is_retryable(response_unit.response_status) or attempt > retry_policy.retries:
+                if failed and breaker is not None and breaker.state == CircuitState.OPEN:
+                    return last_good(request_post)
+                return response_unit
+            delay = backoff_delay(attempt, retry_policy, limiter.retry_after() if limiter is not None else None)
+            if deadline is not None and time.monotonic() + delay + request_timeout.request_timeout > deadline:
+                logger.warning(f"Retry of {request_post.name} skipped, cycle deadline would be exceeded")
+                return response_unit
+            logger.info(f"Retry {attempt} of {request_post.name} in {delay:.2f} seconds, "
+                        f"status: {response_unit.response_status}")
+            await asyncio.sleep(delay)
+
+    tasks = []
+    for request_post in app_config.requests if request_posts is None else request_posts:
+        tasks.append(asyncio.create_task(bounded_request(request_post)))
+    results: list[ResponseUnit] = await asyncio.gather(*tasks)
+
+    return results
+
+
+def create_schedules(app_config: AppConfig) -> list[Schedule]:
     """
-    Get birt death ratio. This means birth - death per year
-    :param response_units: response unit
+    Create schedules from configuration. With `periodic.per_source` every source has its own schedule
+    (`interval_sec`, `cron` or `periodic.time_sec`), otherwise all sources are scheduled together
     :param app_config: application config
-    :return: databox push data
+    :return: schedules named by source
     """
-    birth_rates = await find_data_unit(response_units, RequestType.BIRTH_RATE)
-    death_rates = await find_data_unit(response_units, RequestType.DEATH_RATE)
-    assert_true(len(birth_rates.data_units), len(death_rates.data_units))
-    death_rate_units = death_rates.data_units
-    databox_units: list[PushData] = list()
-    for idx, birth_rate in enumerate(birth_rates.data_units):
-        death_rate = death_rate_units[idx]
-        assert_true(birth_rate.date, death_rate.date)
-        databox_units.append(
-            PushData(key=app_config.birth_death_ratio_metric_key, value=(birth_rate.value - death_rate.value),
-                     unit="Rt", var_date=birth_rate.date))
-    return databox_units
+    if not app_config.periodic_per_source:
+        return [Schedule(ALL_SOURCES, app_config.periodic_time, jitter=app_config.periodic_jitter)]
+    schedules = []
+    for request_post in app_config.requests:
+        if request_post.cron:
+            schedules.append(Schedule(request_post.name, cron=CronExpression(request_post.cron),
+                                      jitter=app_config.periodic_jitter))
+        else:
+            schedules.append(Schedule(request_post.name, request_post.interval_sec or app_config.periodic_time,
+                                      jitter=app_config.periodic_jitter))
+    return schedules
 
 
-async def periodically_send(app_config: AppConfig) -> None:
+async def periodically_send(app_context: AppContext) -> None:
     """
-    Periodically get data and send to databox push. Periodic time is defined in configuration
-    :param app_config: application config
+    Periodically get data and send to databox push. Every schedule runs on its own, so slow source doesn't delay
+    the others. Intervals are aligned to monotonic clock and don't drift with execution time
+    :param app_context: application context
     :return: N/A
     """
+    app_config = app_context.app_config
+    delta_trackers = [target.delta_tracker for target in app_context.targets if target.delta_tracker is not None]
+    incremental = app_context.incremental
+
+    def resync() -> None:
+        for delta_tracker in delta_trackers:
+            delta_tracker.resync()
+        if incremental is not None:
+            incremental.backfill()
+
+    if (delta_trackers or incremental is not None) and hasattr(signal, "SIGHUP"):
+        # full backfill and resync on demand: kill -HUP <pid>
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, resync)
+    flushers = start_flushers(app_context)
+    request_posts = {request_post.name: [request_post] for request_post in app_config.requests}
+    request_posts[ALL_SOURCES] = app_config.requests
+
+    async def run(name: str) -> None:
+        await send(app_context, request_posts[name])
+
     try:
-        while True:
-            await one_time_send(app_config)
-            logger.info(f"Wait to retrieve and push data, every {app_config.periodic_time} seconds!")
-            await asyncio.sleep(app_config.periodic_time)
+        await Scheduler(create_schedules(app_config), run).run_forever()
     except BaseException as e:
         logger.error(f"Application error (periodic)! {e}")
+    finally:
+        for flusher in flushers:
+            flusher.cancel()
 
 
-async def one_time_send(app_config: AppConfig) -> None:
+def start_flushers(app_context: AppContext) -> list[asyncio.Task]:
     """
-    Get data and send to databox push. This will get and push data only once
-    :param app_config: application config
+    Start background push queue flusher of every target account
+    :param app_context: application context
+    :return: flusher tasks
+    """
+    return [asyncio.create_task(flush_push_queue(app_context, target))
+            for target in app_context.targets if target.push_queue is not None]
+
+
+async def one_time_send(app_context: AppContext) -> None:
+    """
+    Get data of all sources and send to databox push. This will get and push data only once.
+    :param app_context: application context
     :return: N/A
     """
-    start_time = int(time.time_ns())
-    try:
-        all_metrics = await get_all_metrics(app_config)
-        birth_death_ratio = await get_birth_death_ratio(all_metrics, app_config)
-        all_metrics.append(ResponseUnit([], birth_death_ratio, RequestType.BIRTH_DEATH_RATIO, 200))
-        response_statuses = await push_to_databox(all_metrics, app_config)
+    await send(app_context, app_context.app_config.requests)
+
+
+async def send(app_context: AppContext, request_posts: list[RequestPost]) -> None:
+    """
+    Get data of given sources and send to databox push, together with derived metrics that depend on them.
+    Derived metrics are calculated from latest data of all sources
+    :param app_context: application context
+    :param request_posts: sources to get
+    :return: N/A
+    """
+    app_config = app_context.app_config
+    sources = ",".join(request_post.name for request_post in request_posts)
+    profiler = app_context.profiler
+    with profiler.cycle(sources) if profiler is not None else nullcontext():
+        start_time = int(time.time_ns())
+        try:
+            all_metrics = await get_all_metrics(app_config, app_context.transport.session,
+                                                app_context.response_cache, request_posts, app_context.limiters,
+                                                time.monotonic() + app_config.fetch_retry.deadline_sec,
+                                                app_context.circuit_breakers, app_context.hedging,
+                                                app_context.metrics, app_context.parse_pool, app_context.incremental)
+            for metric in all_metrics:
+                if metric:
+                    app_context.latest_units[metric.data_type] = metric
+            derived_engine = app_context.derived_engine
+            dependents = derived_engine.dependents({request_post.name for request_post in request_posts})
+            with track_allocations("derived"):
+                derived_units = derived_engine.evaluate(list(app_context.latest_units.values()))
+            all_metrics.extend(derived_unit for derived_unit in derived_units if derived_unit.data_type in dependents)
+            for target in app_context.targets:
+                if target.delta_tracker is not None:
+                    target.delta_tracker.next_cycle(metric.metric_key for metric in all_metrics)
+            await forward(app_context, all_metrics)
+            if app_config.series_snapshot_enabled:
+                app_context.store_series()
+        except BaseException as e:
+            logger.error(f"Application error (one time)! {e}")
+        execution_time = (int(time.time_ns()) - start_time) / 1_000_000
+        if app_context.metrics is not None:
+            app_context.metrics.observe(CYCLE_SECONDS, execution_time / 1000, sources=sources)
+        logger.info("Total execution time of %s: %.2f ms", [request_post.name for request_post in request_posts],
+                    execution_time, extra=log_type("cycle"))
+
+
+async def forward(app_context: AppContext, all_metrics: list[ResponseUnit]) -> None:
+    """
+    Push metrics to every target account at once. Data points are encoded once and shared by all targets,
+    failure of one target doesn't affect the others
+    :param app_context: application context
+    :param all_metrics: metrics to push
+    :return: N/A
+    """
+    targets = app_context.targets
+    if len(targets) > 1:
+        # delta subsets of every target are sliced from data points encoded here, not encoded again per target
+        for metric in all_metrics:
+            metric.encoded_items()
+    results = await asyncio.gather(*[forward_to_target(app_context, target, all_metrics) for target in targets],
+                                   return_exceptions=True)
+    for target, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Push to {target.name} failed! {result!r}")
+
+
+async def forward_to_target(app_context: AppContext, target: PushTarget, all_metrics: list[ResponseUnit]) -> None:
+    """
+    Push metrics to one target account, or queue them for background flush with push queue. With delta tracker
+    only data points that changed since last successful push to this target are pushed
+    :param app_context: application context
+    :param target: databox target account
+    :param all_metrics: metrics to push
+    :return: N/A
+    """
+    app_config = app_context.app_config
+    delta_tracker = target.delta_tracker
+    push_queue = target.push_queue
+    if delta_tracker is not None:
+        all_metrics = [delta_tracker.changed(metric) for metric in all_metrics]
+    if push_queue is not None:
+        for metric in all_metrics:
+            with track_allocations("push_payload"):
+                items = metric.encoded_items(target.metric_keys.get(metric.metric_key))
+            # queued data points are durable, they are pushed by the flusher
+            if await push_queue.append(items) and delta_tracker is not None:
+                delta_tracker.commit(metric)
+            logger.info("Metric(%s) queued for %s: %r", metric.data_type, target.name, metric,
+                        extra=log_type("metric"))
+        logger.info("Push queue of %s pending data points: %d", target.name, len(push_queue), extra=log_type("push"))
+    elif not any(all_metrics):
+        logger.info("Nothing new to push to %s", target.name, extra=log_type("push"))
+    else:
+        batches = await push_to_databox(all_metrics, target.client, app_config, target.metric_keys, target.status)
+        if delta_tracker is not None:
+            for batch in batches:
+                if batch.succeeded:
+                    for batch_slice in batch.slices:
+                        delta_tracker.commit(batch_slice.to_response_unit())
         for metric in all_metrics:
-            logger.info(f"Metric({metric.data_type.name}) stored: {metric}")
-        logger.info(f"Databox responses: {response_statuses}")
+            logger.info("Metric(%s) stored to %s: %r", metric.data_type, target.name, metric,
+                        extra=log_type("metric"))
+        logger.info("Databox responses of %s: %s", target.name, [batch.status for batch in batches],
+                    extra=log_type("push"))
 
+
+async def ingest_events(app_context: AppContext, broker: "MemoryBroker | None" = None) -> None:
+    """
+    Event-driven mode: listen for pushed data points (webhook or pub/sub adapter) and forward them in micro-batches
+    of `ingest.batch_max_points` or `ingest.batch_window_ms`, through the same push path as polled sources
+    :param app_context: application context
+    :param broker: in-process broker of memory adapter
+    :return: N/A
+    """
+    # aiohttp server is imported only in ingest mode
+    from ingest.batcher import MicroBatcher
+    from ingest.events import DataPoint, to_response_units
+    from ingest.sources import create_event_source
+    app_config = app_context.app_config
+    profiler = app_context.profiler
+    # invalid adapter configuration fails before any background task is started
+    event_source = create_event_source(app_config, broker)
+    flushers = start_flushers(app_context)
+
+    async def forward_batch(points: list[DataPoint]) -> None:
+        logger.info("Ingested data points: %d", len(points), extra=log_type("push"))
+        with profiler.cycle("ingest") if profiler is not None else nullcontext():
+            await forward(app_context, to_response_units(points))
+
+    batcher = MicroBatcher(forward_batch, app_config.ingest_batch_max_points, app_config.ingest_batch_window,
+                           app_config.ingest_max_pending, app_context.metrics)
+    batcher_task = asyncio.create_task(batcher.run())
+    try:
+        await event_source.start(batcher.add)
+        await asyncio.Event().wait()
     except BaseException as e:
-        logger.error(f"Application error (one time)! {e}")
-    logger.info(f"Total execution time: {(int(time.time_ns()) - start_time) / 1_000_000:.2f} ms")
+        logger.error(f"Application error (ingest)! {e!r}")
+    finally:
+        await event_source.stop()
+        # data points already accepted are forwarded before exit
+        batcher.stop()
+        await batcher_task
+        for flusher in flushers:
+            flusher.cancel()
 
 
-async def main() -> None:
-    app_config = get_local_config()
-    if app_config.periodic_enabled:
-        await periodically_send(app_config)
-    else:
-        await one_time_send(app_config)
+async def main(app_config: AppConfig) -> None:
+    async with AppContext(app_config) as app_context:
+        if app_context.profiler is not None and app_config.profiling_signal_cycles > 0 and hasattr(signal, "SIGUSR1"):
+            # profile next cycles on demand: kill -USR1 <pid>
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, app_context.profiler.request,
+                                                          app_config.profiling_signal_cycles)
+        if app_config.ingest_enabled:
+            await ingest_events(app_context)
+        elif app_config.periodic_enabled:
+            await periodically_send(app_context)
+        else:
+            await one_time_send(app_context)
+            # flush once, data points that were not pushed stay queued for next run
+            await asyncio.gather(*[drain_push_queue(target.push_queue, target.client, app_config, target.status)
+                                   for target in app_context.targets
+                                   if target.push_queue is not None and len(target.push_queue) > 0])
 
 
 if __name__ == "__main__":
-    # logging config
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(threadName)s - %(message)s",
-        handlers=[
-            logging.FileHandler("app.log"),
-            logging.StreamHandler()
-        ]
-    )
-    logger = logging.getLogger(__name__)
-    # run main
-    asyncio.run(main())
+    local_config = get_local_config()
+    # logging config, records are written by background listener thread
+    log_listener = setup_logging(local_config)
+    try:
+        # run main
+        asyncio.run(main(local_config))
+    finally:
+        if log_listener is not None:
+            log_listener.stop()
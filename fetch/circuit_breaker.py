@@ -0,0 +1,71 @@
+import logging
+import time
+from collections.abc import Callable
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one URL. After `failure_threshold` consecutive failures circuit opens and requests are skipped.
+    After `reset_timeout` one probe request is let through (half-open), its success closes the circuit,
+    its failure opens it again
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self) -> bool:
+        """
+        :return: true if request can be made
+        """
+        if self.state == CircuitState.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            logger.info(f"Circuit of {self.name} half-open, probe request allowed")
+            self.state = CircuitState.HALF_OPEN
+            return True
+        return self.state == CircuitState.CLOSED
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"Circuit of {self.name} closed")
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == CircuitState.HALF_OPEN or \
+                (self.state == CircuitState.CLOSED and self.failures >= self.failure_threshold):
+            logger.warning(f"Circuit of {self.name} opened after {self.failures} failures")
+            self.state = CircuitState.OPEN
+            self.opened_at = self.clock()
+
+
+class CircuitBreakers:
+    """
+    Circuit breakers by URL, created on first use
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: dict[str, CircuitBreaker] = dict()
+
+    def get(self, url: str) -> CircuitBreaker:
+        breaker = self.breakers.get(url)
+        if breaker is None:
+            breaker = self.breakers[url] = CircuitBreaker(url, self.failure_threshold, self.reset_timeout)
+        return breaker
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import math
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """
+    Latencies of last requests to one URL
+    """
+
+    def __init__(self, size: int) -> None:
+        self.latencies: deque[float] = deque(maxlen=size)
+
+    def add(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def percentile(self, percentile: float) -> float | None:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(percentile / 100 * len(ordered)) - 1)]
+
+
+class Hedging:
+    """
+    Hedged requests. When request takes longer than given percentile of recent latencies of its URL, second
+    request is sent and result of whichever succeeds first is used, the other one is cancelled
+    """
+
+    def __init__(self, percentile: float, min_delay: float, window_size: int, min_samples: int) -> None:
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.windows: dict[str, LatencyWindow] = dict()
+
+    def window(self, url: str) -> LatencyWindow:
+        window = self.windows.get(url)
+        if window is None:
+            window = self.windows[url] = LatencyWindow(self.window_size)
+        return window
+
+    def delay(self, url: str) -> float | None:
+        """
+        :param url: request URL
+        :return: time after which hedged request is sent, None when there is not enough latency samples
+        """
+        window = self.window(url)
+        if len(window.latencies) < self.min_samples:
+            return None
+        return max(self.min_delay, window.percentile(self.percentile))
+
+    async def run(self, url: str, request: Callable[[], Awaitable[T]],
+                  succeeded: Callable[[T], bool] = lambda result: True) -> T:
+        """
+        Run request, hedge it when it is slow. Failed attempt doesn't win the race, the other attempt keeps running
+        until it succeeds or fails too
+        :param url: request URL
+        :param request: creates request coroutine, called for every attempt
+        :param succeeded: checks result of an attempt
+        :return: result of first successful attempt, first failed result when all attempts failed
+        """
+        delay = self.delay(url)
+        attempts = [asyncio.ensure_future(request())]
+        pending = set(attempts)
+        hedged = delay is None
+        failed: list[T] = list()
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=None if hedged else delay,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    logger.info(f"Request to {url} slower than {delay:.2f} seconds, sending hedged request")
+                    hedged = True
+                    attempts.append(asyncio.ensure_future(request()))
+                    pending.add(attempts[-1])
+                    continue
+                for attempt in done:
+                    result = attempt.result()
+                    if succeeded(result):
+                        return result
+                    failed.append(result)
+                if not hedged:
+                    # failed before hedge delay, retry policy decides what to do
+                    break
+            return failed[0]
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
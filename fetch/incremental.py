@@ -0,0 +1,199 @@
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+
+from config.configs import RequestPost
+from response.response_init import ResponseUnit
+from util.helper import EPOCH
+
+logger = logging.getLogger(__name__)
+
+
+def _month_index(epoch: int) -> int:
+    """
+    Months since year 0 of the first day of period (seconds since epoch)
+    """
+    period_start = EPOCH + timedelta(seconds=epoch)
+    return period_start.year * 12 + period_start.month - 1
+
+
+@dataclass
+class StoredSeries:
+    """
+    Merged full history of one source. Series of response unit are contiguous and sorted by date,
+    `offsets` hold start of every series (and end of the last one)
+    """
+    response_unit: ResponseUnit
+    offsets: list[int]
+    series_keys: list[tuple]
+    # last stored period (seconds since epoch) and period length in months
+    last_date: int
+    period_months: int
+    fetches: int = 0
+
+    @classmethod
+    def create(cls, response_unit: ResponseUnit) -> "StoredSeries":
+        series = response_unit.series
+        offsets = [bisect_left(series, series_idx) for series_idx in range(len(response_unit.attributes))]
+        offsets.append(len(series))
+        dates = response_unit.dates
+        series_ends = [end for start, end in zip(offsets, offsets[1:]) if end > start]
+        last_date = max(dates[end - 1] for end in series_ends)
+        # period length from the newest periods of the longest series: 12 (year), 3 (quarter) or 1 (month)
+        start, end = max(zip(offsets, offsets[1:]), key=lambda bounds: bounds[1] - bounds[0])
+        months = [_month_index(epoch) for epoch in dates[max(start, end - 13):end]]
+        gaps = [later - earlier for earlier, later in zip(months, months[1:]) if later > earlier]
+        series_keys = [tuple(sorted(attributes.items())) for attributes in response_unit.attributes]
+        return cls(response_unit, offsets, series_keys, last_date, min(gaps) if gaps else 0)
+
+    def span(self, series_idx: int) -> tuple[int, int]:
+        return self.offsets[series_idx], self.offsets[series_idx + 1]
+
+
+class IncrementalFetch:
+    """
+    Query pushdown of PX tables. First fetch of a source asks for the full history (backfill), later fetches
+    rewrite the query with `top` selection on the time dimension, so only periods published since the last stored
+    period (plus `overlap` already stored periods, which catches revised values) are requested.
+    Partial response is merged into the stored history, response size and parse cost scale with new data.
+    Newest period codes are not known before they are published (and PX rejects unknown `item` values), so
+    the number of requested periods is counted from the calendar
+    """
+
+    def __init__(self, overlap: int = 2, backfill_cycles: int = 0, today: Callable[[], date] = date.today) -> None:
+        """
+        :param overlap: number of already stored periods requested again
+        :param backfill_cycles: full fetch of a source every N fetches, 0 - only on first fetch and on demand
+        :param today: current date
+        """
+        self.overlap = overlap
+        self.backfill_cycles = backfill_cycles
+        self.today = today
+        self.stored: dict[str, StoredSeries] = dict()
+
+    def backfill(self, name: str | None = None) -> None:
+        """
+        Forget stored history, next fetch asks for full history
+        :param name: source name, all sources when not set
+        """
+        if name is None:
+            logger.info(f"Full backfill requested for {len(self.stored)} sources")
+            self.stored.clear()
+        else:
+            self.stored.pop(name, None)
+
+    def restore(self, name: str, response_unit: ResponseUnit) -> None:
+        """
+        Continue from already known history (e.g. series snapshot), next fetch asks only for new periods
+        :param name: source name
+        :param response_unit: full history of the source
+        """
+        if response_unit:
+            self.stored[name] = StoredSeries.create(response_unit)
+
+    def latest(self, name: str) -> ResponseUnit | None:
+        stored = self.stored.get(name)
+        return stored.response_unit if stored is not None else None
+
+    def query(self, request_post: RequestPost, time_dimension: str | None) -> RequestPost:
+        """
+        Request for new periods only, or the original request when full history is needed
+        :param request_post: source config
+        :param time_dimension: json-stat2 time dimension id of the source
+        :return: request with `top` selection on time dimension
+        """
+        stored = self.stored.get(request_post.name)
+        if stored is None or time_dimension is None or stored.period_months == 0:
+            return request_post
+        if self.backfill_cycles > 0 and stored.fetches >= self.backfill_cycles:
+            logger.info(f"Periodic full backfill of {request_post.name}")
+            self.backfill(request_post.name)
+            return request_post
+        query = request_post.data.get("query", [])
+        if any(selection.get("code") == time_dimension for selection in query):
+            # time dimension filtered in config, query is not rewritten
+            return request_post
+        today = self.today()
+        elapsed = (today.year * 12 + today.month - 1 - _month_index(stored.last_date)) // stored.period_months
+        top = max(elapsed, 0) + max(self.overlap, 1)
+        selection = {"code": time_dimension, "selection": {"filter": "top", "values": [str(top)]}}
+        return replace(request_post, data={**request_post.data, "query": [*query, selection]})
+
+    def merge(self, request_post: RequestPost, response_unit: ResponseUnit) -> ResponseUnit:
+        """
+        Merge response into stored history. Stored data points from the first period of partial response on
+        are replaced with the response
+        :param request_post: source config (original, not rewritten request)
+        :param response_unit: full or partial response
+        :return: merged full history, stored unit when response didn't change anything
+        """
+        name = request_post.name
+        stored = self.stored.get(name)
+        if response_unit.response_status >= 400 or not response_unit:
+            if stored is not None and 400 <= response_unit.response_status < 500 \
+                    and response_unit.response_status != 429:
+                # rewritten query was rejected, ask for full history next time
+                logger.warning(f"Incremental query of {name} failed, status: {response_unit.response_status}, "
+                               f"next fetch is full backfill")
+                self.backfill(name)
+            return response_unit
+        if stored is None:
+            self.stored[name] = StoredSeries.create(response_unit)
+            return response_unit
+        stored.fetches += 1
+        cut = min(response_unit.dates)
+        stored_unit = stored.response_unit
+        series_index = {series_key: series_idx for series_idx, series_key in enumerate(stored.series_keys)}
+        new_series = [series_index.get(tuple(sorted(attributes.items())))
+                      for attributes in response_unit.attributes]
+        new_spans = StoredSeries.create(response_unit).offsets
+        if None not in new_series:
+            # unchanged when stored tail of every series equals the response
+            unchanged = True
+            for series_idx, stored_idx in enumerate(new_series):
+                start, end = stored.span(stored_idx)
+                tail = bisect_left(stored_unit.dates, cut, start, end)
+                new_start, new_end = new_spans[series_idx], new_spans[series_idx + 1]
+                if stored_unit.dates[tail:end] != response_unit.dates[new_start:new_end] or \
+                        stored_unit.values[tail:end] != response_unit.values[new_start:new_end]:
+                    unchanged = False
+                    break
+            if unchanged and len(new_series) == len(stored.series_keys):
+                return stored_unit
+        dates = array("q")
+        values = array("d")
+        series = array("I")
+        attributes = list(stored_unit.attributes)
+        new_by_stored = {stored_idx: series_idx for series_idx, stored_idx in enumerate(new_series)
+                         if stored_idx is not None}
+        for stored_idx in range(len(stored.series_keys)):
+            start, end = stored.span(stored_idx)
+            tail = bisect_left(stored_unit.dates, cut, start, end)
+            dates.extend(stored_unit.dates[start:tail])
+            values.extend(stored_unit.values[start:tail])
+            length = tail - start
+            series_idx = new_by_stored.get(stored_idx)
+            if series_idx is not None:
+                new_start, new_end = new_spans[series_idx], new_spans[series_idx + 1]
+                dates.extend(response_unit.dates[new_start:new_end])
+                values.extend(response_unit.values[new_start:new_end])
+                length += new_end - new_start
+            series.extend(array("I", [stored_idx]) * length)
+        for series_idx, stored_idx in enumerate(new_series):
+            if stored_idx is None:
+                # series that appeared in partial response only
+                new_start, new_end = new_spans[series_idx], new_spans[series_idx + 1]
+                dates.extend(response_unit.dates[new_start:new_end])
+                values.extend(response_unit.values[new_start:new_end])
+                series.extend(array("I", [len(attributes)]) * (new_end - new_start))
+                attributes.append(response_unit.attributes[series_idx])
+        merged = ResponseUnit(stored_unit.metric_key, stored_unit.unit, dates, values, stored_unit.data_type,
+                              response_unit.response_status, series, attributes)
+        fetches = stored.fetches
+        self.stored[name] = StoredSeries.create(merged)
+        self.stored[name].fetches = fetches
+        logger.info(f"Merged {len(response_unit)} data points of {name}, total: {len(merged)}")
+        return merged
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Callable, Mapping
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from config.configs import EndpointLimit, RetryPolicy
+
+logger = logging.getLogger(__name__)
+# statuses that mean endpoint is overloaded, request can be repeated
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+# response status for connection errors and timeouts
+NO_RESPONSE_STATUS = -1
+
+
+def is_retryable(status: int) -> bool:
+    return status in RETRYABLE_STATUSES or status == NO_RESPONSE_STATUS
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Parse `Retry-After` header
+    :param value: delay in seconds or HTTP date
+    :return: delay in seconds, None when not set or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, retry_policy: RetryPolicy, retry_after: float | None = None) -> float:
+    """
+    Exponential backoff with full jitter, never shorter than `Retry-After`
+    :param attempt: number of failed attempts (1 - first retry)
+    :param retry_policy: retry policy
+    :param retry_after: delay requested by endpoint
+    :return: delay in seconds
+    """
+    delay = random.uniform(0, min(retry_policy.backoff_max_sec, retry_policy.backoff_base_sec * 2 ** (attempt - 1)))
+    return max(delay, retry_after or 0.0)
+
+
+class TokenBucket:
+    """
+    Requests per second limit. Bucket is refilled with `rate` tokens per second up to `burst`, every request takes
+    one token. Endpoint can pause the bucket with `Retry-After`
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self.paused_until = 0.0
+
+    def pause(self, delay: float) -> None:
+        self.paused_until = max(self.paused_until, self.clock() + delay)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """
+        Take a token when available. `Retry-After` pause is honoured without rate limit (rate 0) too
+        :return: 0 when token was taken, otherwise time to wait before trying again
+        """
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self) -> None:
+        while (delay := self.wait_time()) > 0:
+            await asyncio.sleep(delay)
+
+
+class AimdWindow:
+    """
+    Adaptive concurrency window (additive increase, multiplicative decrease). Window grows by about one request
+    per window of healthy responses and is halved on overload (`RETRYABLE_STATUSES`, timeouts, connection errors or
+    latency above target).
+    Window is decreased at most once per `latency_target` so one burst of failures doesn't collapse it
+    """
+
+    def __init__(self, initial: int, maximum: int, latency_target: float, minimum: int = 1,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.limit = float(min(max(initial, minimum), self.maximum))
+        self.latency_target = latency_target
+        self.clock = clock
+        self.in_flight = 0
+        self.decreased_at: float | None = None
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def record(self, overloaded: bool, latency: float) -> None:
+        if overloaded or latency > self.latency_target:
+            now = self.clock()
+            if self.decreased_at is None or now - self.decreased_at >= self.latency_target:
+                self.limit = max(float(self.minimum), self.limit / 2)
+                self.decreased_at = now
+                logger.warning(f"Concurrency window decreased to {int(self.limit)}")
+        else:
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+
+class EndpointLimiter:
+    """
+    Limiter of one endpoint (host): token bucket for request rate and AIMD window for concurrency
+    """
+
+    def __init__(self, name: str, endpoint_limit: EndpointLimit, clock: Callable[[], float] = time.monotonic) -> None:
+        self.name = name
+        self.clock = clock
+        self.bucket = TokenBucket(endpoint_limit.rate_per_sec, endpoint_limit.burst, clock)
+        self.window = AimdWindow(endpoint_limit.initial_concurrency, endpoint_limit.max_concurrency,
+                                 endpoint_limit.latency_target_sec, clock=clock)
+
+    def retry_after(self) -> float:
+        """
+        :return: remaining time endpoint asked us to wait with `Retry-After`
+        """
+        return max(0.0, self.bucket.paused_until - self.clock())
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Wait for request rate and concurrency window, release concurrency slot on exit
+        """
+        await self.window.acquire()
+        try:
+            await self.bucket.acquire()
+            yield
+        finally:
+            await self.window.release()
+
+    def record(self, status: int, latency: float, headers: Mapping | None = None) -> float | None:
+        """
+        Record response of endpoint, adapt concurrency window and honour `Retry-After`
+        :param status: response status, -1 for timeout or connection error
+        :param latency: request time in seconds
+        :param headers: response headers
+        :return: delay requested by endpoint
+        """
+        retry_after = parse_retry_after(headers.get("Retry-After")) if headers is not None else None
+        if retry_after is not None and status in RETRYABLE_STATUSES:
+            logger.warning(f"Endpoint {self.name} asks to retry after {retry_after:.2f} seconds")
+            self.bucket.pause(retry_after)
+        self.window.record(is_retryable(status), latency)
+        return retry_after
+
+
+class Limiters:
+    """
+    Endpoint limiters by host, created on first use
+    """
+
+    def __init__(self, endpoint_limit: EndpointLimit) -> None:
+        self.endpoint_limit = endpoint_limit
+        self.limiters: dict[str, EndpointLimiter] = dict()
+
+    def get(self, url: str) -> EndpointLimiter:
+        host = urlsplit(url).netloc
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            limiter = self.limiters[host] = EndpointLimiter(host, self.endpoint_limit)
+        return limiter
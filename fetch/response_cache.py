@@ -0,0 +1,93 @@
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from response.response_init import ResponseUnit
+
+logger = logging.getLogger(__name__)
+# json-stat2 dataset "updated" field, found without decoding whole response
+UPDATED_PATTERN = re.compile(r'"updated"\s*:\s*"([^"]*)"')
+
+
+@dataclass
+class CacheEntry:
+    response_unit: ResponseUnit
+    etag: str | None
+    last_modified: str | None
+    updated: str | None
+    stored_at: float
+
+
+class ResponseCache:
+    """
+    Fetch cache keyed on URL and query body. Stores already parsed response unit with its validators:
+    ETag/Last-Modified when server provides them, otherwise json-stat2 dataset `updated` field.
+    Entries younger than TTL are served without request, cache is bounded by number of entries (LRU eviction).
+    """
+
+    def __init__(self, ttl_sec: int, max_entries: int) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()
+
+    @classmethod
+    def cache_key(cls, url: str, data: dict) -> str:
+        return f"{url}|{json.dumps(data, sort_keys=True, ensure_ascii=False)}"
+
+    @classmethod
+    def find_updated(cls, response_data: str) -> str | None:
+        match = UPDATED_PATTERN.search(response_data)
+        return match.group(1) if match else None
+
+    def get(self, key: str) -> CacheEntry | None:
+        cache_entry = self.entries.get(key)
+        if cache_entry is not None:
+            self.entries.move_to_end(key)
+        return cache_entry
+
+    def is_fresh(self, cache_entry: CacheEntry) -> bool:
+        return time.monotonic() - cache_entry.stored_at < self.ttl_sec
+
+    @classmethod
+    def conditional_headers(cls, cache_entry: CacheEntry | None) -> dict:
+        """
+        HTTP validators for conditional request
+        :param cache_entry: cached entry
+        :return: request headers
+        """
+        headers = dict()
+        if cache_entry is None:
+            return headers
+        if cache_entry.etag:
+            headers["If-None-Match"] = cache_entry.etag
+        if cache_entry.last_modified:
+            headers["If-Modified-Since"] = cache_entry.last_modified
+        return headers
+
+    def revalidated(self, cache_entry: CacheEntry | None, response_status: int, updated: str | None) -> bool:
+        """
+        Check if cached response is still valid: server returned `304 Not Modified` or dataset `updated` didn't change.
+        Valid entry is refreshed for another TTL period
+        :param cache_entry: cached entry
+        :param response_status: response status
+        :param updated: dataset updated field from new response
+        :return: true if cached response unit can be reused
+        """
+        if cache_entry is None:
+            return False
+        if response_status == 304 or (updated is not None and updated == cache_entry.updated):
+            cache_entry.stored_at = time.monotonic()
+            return True
+        return False
+
+    def put(self, key: str, response_unit: ResponseUnit, headers: Mapping[str, str], updated: str | None) -> None:
+        self.entries[key] = CacheEntry(response_unit, headers.get("ETag"), headers.get("Last-Modified"), updated,
+                                       time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            evicted_key, _ = self.entries.popitem(last=False)
+            logger.info(f"Response cache full, evicted: {evicted_key}")
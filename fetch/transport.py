@@ -0,0 +1,50 @@
+import logging
+
+import aiohttp
+
+from config.configs import AppConfig
+from telemetry.metrics import MetricsRegistry
+from telemetry.trace import create_trace_config
+
+logger = logging.getLogger(__name__)
+
+
+class Transport:
+    """
+    Long-lived HTTP transport owned by the application. One connection pool (keep-alive, DNS cache,
+    compressed responses) is shared by SiStat fetchers and databox pusher for the whole application lifetime,
+    so TCP and TLS handshakes are done only when connection is opened for the first time.
+    With metrics registry DNS, connect and time to first byte of every request are recorded
+    """
+
+    def __init__(self, app_config: AppConfig, metrics: MetricsRegistry | None = None) -> None:
+        self.app_config = app_config
+        self.metrics = metrics
+        self.session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> "Transport":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        app_config = self.app_config
+        connector = aiohttp.TCPConnector(limit=app_config.transport_limit,
+                                         limit_per_host=app_config.transport_limit_per_host,
+                                         keepalive_timeout=app_config.transport_keepalive_timeout,
+                                         use_dns_cache=True,
+                                         ttl_dns_cache=app_config.transport_dns_cache_ttl)
+        headers = {"Accept-Encoding": "gzip, deflate"} if app_config.transport_compression else None
+        trace_configs = [create_trace_config(self.metrics)] if self.metrics is not None else None
+        self.session = aiohttp.ClientSession(connector=connector, headers=headers, auto_decompress=True,
+                                             trace_configs=trace_configs)
+        logger.info(f"Transport opened, limit: {app_config.transport_limit}, "
+                    f"limit per host: {app_config.transport_limit_per_host}")
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+            logger.info("Transport closed")
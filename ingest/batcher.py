@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from ingest.events import DataPoint
+from telemetry.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+# time from arrival of the oldest data point of a batch until the batch is forwarded
+INGEST_LATENCY_SECONDS = "ingest_latency_seconds"
+INGEST_POINTS = "ingest_points_total"
+
+
+class MicroBatcher:
+    """
+    Collects pushed data points and forwards them in micro-batches: as soon as batch has `max_points` data points
+    or its oldest data point waited `window` seconds. Batches are forwarded one at a time, data points that arrive
+    meanwhile form the next batch. At most `max_pending` data points wait, new ones are rejected when full
+    """
+
+    def __init__(self, forward: Callable[[list[DataPoint]], Awaitable[None]], max_points: int, window: float,
+                 max_pending: int, metrics: MetricsRegistry | None = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.forward = forward
+        self.max_points = max_points
+        self.window = window
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self.clock = clock
+        self.pending: list[DataPoint] = list()
+        # arrival time of oldest pending data point
+        self.oldest_at: float | None = None
+        self.changed = asyncio.Event()
+        self.stopped = False
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def add(self, points: list[DataPoint]) -> bool:
+        """
+        Add data points to the next batch
+        :param points: data points of one event
+        :return: false if batcher is full and data points were rejected
+        :raise ValueError: event has more data points than can ever wait, it would be rejected forever
+        """
+        if len(points) > self.max_pending:
+            raise ValueError(f"Event has {len(points)} data points, at most {self.max_pending} can be accepted")
+        if len(self.pending) + len(points) > self.max_pending:
+            logger.warning(f"Ingest batcher full, rejected data points: {len(points)}")
+            return False
+        if not self.pending:
+            self.oldest_at = self.clock()
+        self.pending.extend(points)
+        self.changed.set()
+        return True
+
+    def _take(self) -> tuple[list[DataPoint], float]:
+        batch = self.pending[:self.max_points]
+        del self.pending[:self.max_points]
+        oldest_at = self.oldest_at
+        # remaining data points waited at least since now, they go out with the next batch
+        self.oldest_at = self.clock() if self.pending else None
+        return batch, oldest_at
+
+    def stop(self) -> None:
+        """
+        Stop waiting for more data points, pending ones are forwarded before `run` returns
+        """
+        self.stopped = True
+        self.changed.set()
+
+    async def run(self) -> None:
+        """
+        Forward batches until stopped
+        """
+        while not self.stopped:
+            self.changed.clear()
+            if not self.pending:
+                await self.changed.wait()
+                continue
+            remaining = self.oldest_at + self.window - self.clock()
+            if len(self.pending) < self.max_points and remaining > 0:
+                try:
+                    await asyncio.wait_for(self.changed.wait(), remaining)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            await self._forward(*self._take())
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Forward all pending data points
+        """
+        while self.pending:
+            await self._forward(*self._take())
+
+    async def _forward(self, batch: list[DataPoint], oldest_at: float) -> None:
+        try:
+            await self.forward(batch)
+        except Exception as e:
+            logger.error(f"Ingest batch forward error! {e}")
+        if self.metrics is not None:
+            self.metrics.observe(INGEST_LATENCY_SECONDS, self.clock() - oldest_at)
+            self.metrics.increment(INGEST_POINTS, len(batch))
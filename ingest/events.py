@@ -0,0 +1,114 @@
+import json
+import math
+from array import array
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from response.response_init import ResponseUnit
+from util.helper import EPOCH
+
+
+@dataclass
+class DataPoint:
+    key: str
+    value: float
+    date: int
+    unit: str | None = None
+    attributes: dict[str, str] = field(default_factory=dict)
+
+
+def _parse_date(date: str | None) -> int:
+    """
+    ISO 8601 date to seconds since epoch (UTC), current time when not set
+    """
+    if date is None:
+        moment = datetime.now(timezone.utc)
+    elif isinstance(date, str):
+        moment = datetime.fromisoformat(date)
+    else:
+        raise ValueError(f"Data point date must be an ISO 8601 string: {date!r}")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((moment - EPOCH).total_seconds())
+
+
+def _parse_attributes(key: str, attributes: dict | list | None) -> dict[str, str]:
+    if not attributes:
+        return dict()
+    if isinstance(attributes, list):
+        # databox push format, list of key/value objects
+        if not all(isinstance(attribute, dict) and "key" in attribute and "value" in attribute
+                   for attribute in attributes):
+            raise ValueError(f"Data point {key} attributes must be key/value objects: {attributes!r}")
+        attributes = {str(attribute["key"]): attribute["value"] for attribute in attributes}
+    if not isinstance(attributes, dict):
+        raise ValueError(f"Data point {key} attributes must be an object or a list: {attributes!r}")
+    return {str(name): str(attribute) for name, attribute in attributes.items()}
+
+
+def _parse_point(item: dict) -> DataPoint:
+    """
+    Validate one data point, every malformed field is a ValueError, so only this event is rejected
+    """
+    if not isinstance(item, dict) or not isinstance(item.get("key"), str):
+        raise ValueError(f"Data point must be an object with key: {item!r}")
+    key = item["key"]
+    value = item.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Data point {key} value must be a number: {value!r}")
+    try:
+        value = float(value)
+    except OverflowError:
+        value = math.inf
+    if not math.isfinite(value):
+        raise ValueError(f"Data point {key} value must be finite: {item.get('value')!r}")
+    unit = item.get("unit")
+    if unit is not None and not isinstance(unit, str):
+        raise ValueError(f"Data point {key} unit must be a string: {unit!r}")
+    return DataPoint(key, value, _parse_date(item.get("date")), unit,
+                     _parse_attributes(key, item.get("attributes")))
+
+
+def parse_points(message: bytes | str) -> list[DataPoint]:
+    """
+    Decode pushed event: one data point or an array of data points in databox push format
+    (`key`, `value`, optional `date`, `unit` and `attributes`)
+    :param message: JSON message
+    :return: data points
+    """
+    try:
+        items = json.loads(message)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Event is not valid JSON: {e}") from e
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        raise ValueError("Event must be a data point or an array of data points")
+    return [_parse_point(item) for item in items]
+
+
+def to_response_units(points: list[DataPoint]) -> list[ResponseUnit]:
+    """
+    Group data points by metric key and unit into columnar response units, series by attributes
+    :param points: data points in arrival order
+    :return: response unit of every metric
+    """
+    grouped: dict[tuple[str, str | None], list[DataPoint]] = dict()
+    for point in points:
+        grouped.setdefault((point.key, point.unit), []).append(point)
+    response_units = []
+    for (key, unit), metric_points in grouped.items():
+        series_index: dict[tuple, int] = dict()
+        attributes: list[dict[str, str]] = list()
+        series = array("I")
+        for point in metric_points:
+            series_key = tuple(sorted(point.attributes.items()))
+            series_idx = series_index.get(series_key)
+            if series_idx is None:
+                series_idx = series_index[series_key] = len(attributes)
+                attributes.append(point.attributes)
+            series.append(series_idx)
+        response_units.append(ResponseUnit(key, unit, array("q", [point.date for point in metric_points]),
+                                           array("d", [point.value for point in metric_points]), key, 200,
+                                           series, attributes))
+    return response_units
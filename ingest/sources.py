@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable
+
+from aiohttp import WSMsgType, web
+
+from config.configs import AppConfig
+from ingest.events import DataPoint, parse_points
+
+logger = logging.getLogger(__name__)
+# accepts data points of one event, false when they can't be queued now, ValueError when they never can be
+Accept = Callable[[list[DataPoint]], bool]
+
+
+class EventSource(ABC):
+    """
+    Source of pushed data points
+    """
+
+    @abstractmethod
+    async def start(self, accept: Accept) -> None:
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        pass
+
+
+class WebhookSource(EventSource):
+    """
+    Local HTTP endpoint: data points are POSTed to `path` (202 when accepted, 503 when batcher is full,
+    413 when event is larger than batcher can hold)
+    or sent as WebSocket messages on `path`/ws
+    """
+
+    def __init__(self, host: str, port: int, path: str) -> None:
+        self.host = host
+        self.port = port
+        self.path = path
+        self.runner: web.AppRunner | None = None
+        self.accept: Accept | None = None
+
+    async def handle_post(self, request: web.Request) -> web.Response:
+        try:
+            points = parse_points(await request.read())
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        try:
+            accepted = self.accept(points)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=413)
+        if not accepted:
+            return web.json_response({"error": "Ingest queue full"}, status=503, headers={"Retry-After": "1"})
+        return web.json_response({"accepted": len(points)}, status=202)
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        async for message in websocket:
+            if message.type not in (WSMsgType.TEXT, WSMsgType.BINARY):
+                continue
+            try:
+                points = parse_points(message.data)
+                while not self.accept(points):
+                    # batcher is full, stop reading the socket until it has room
+                    await asyncio.sleep(0.05)
+            except ValueError as e:
+                await websocket.send_str(json.dumps({"error": str(e)}))
+        return websocket
+
+    async def start(self, accept: Accept) -> None:
+        self.accept = accept
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_post)
+        app.router.add_get(f"{self.path.rstrip('/')}/ws", self.handle_websocket)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        # actual port when port 0 was configured
+        self.port = self.runner.addresses[0][1]
+        logger.info(f"Ingest webhook started on http://{self.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+class PubSubSource(EventSource):
+    """
+    Pub/sub adapter, messages are read from subscription (e.g. redis pub/sub channel, message broker consumer)
+    wrapped into an async iterator of JSON messages
+    """
+
+    def __init__(self, subscribe: Callable[[], AsyncIterator[bytes | str]]) -> None:
+        self.subscribe = subscribe
+        self.task: asyncio.Task | None = None
+
+    async def consume(self, accept: Accept) -> None:
+        async for message in self.subscribe():
+            try:
+                points = parse_points(message)
+                while not accept(points):
+                    await asyncio.sleep(0.05)
+            except ValueError as e:
+                logger.error(f"Invalid ingest message skipped: {e}")
+
+    async def start(self, accept: Accept) -> None:
+        self.task = asyncio.create_task(self.consume(accept))
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+class MemoryBroker:
+    """
+    In-process pub/sub stand-in, every subscriber gets every published message
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: list[asyncio.Queue] = list()
+
+    def publish(self, message: bytes | str) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait(message)
+
+    async def subscribe(self) -> AsyncIterator[bytes | str]:
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers.remove(queue)
+
+
+def create_event_source(app_config: AppConfig, broker: MemoryBroker | None = None) -> EventSource:
+    """
+    Create event source from `ingest.adapter`
+    :param app_config: application config
+    :param broker: in-process broker used by memory adapter, required by it
+    :return: event source
+    """
+    if app_config.ingest_adapter == "webhook":
+        return WebhookSource(app_config.ingest_host, app_config.ingest_port, app_config.ingest_path)
+    if app_config.ingest_adapter == "memory":
+        if broker is None:
+            # nothing could publish to a private broker, data points would never arrive
+            raise ValueError("Ingest adapter memory needs in-process broker, use webhook adapter")
+        return PubSubSource(broker.subscribe)
+    raise ValueError(f"Unknown ingest adapter: {app_config.ingest_adapter}")
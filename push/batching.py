@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+
+from response.response_init import ResponseUnit
+
+
+@dataclass
+class BatchSlice:
+    response_unit: ResponseUnit
+    start: int
+    end: int
+
+    def to_response_unit(self) -> ResponseUnit:
+        if self.start == 0 and self.end == len(self.response_unit):
+            return self.response_unit
+        return self.response_unit.take(range(self.start, self.end))
+
+
+@dataclass
+class PushBatch:
+    """
+    One databox push request, data points of one or more metrics. Status and attempts are tracked per batch,
+    so failed batch can be pushed again without other batches
+    """
+    slices: list[BatchSlice] = field(default_factory=list)
+    items: list[bytes] = field(default_factory=list)
+    size_bytes: int = 2
+    status: int | None = None
+    attempts: int = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+    def payload(self) -> bytes:
+        return b"[" + b", ".join(self.items) + b"]"
+
+    def metric_keys(self) -> list[str]:
+        return list(dict.fromkeys(batch_slice.response_unit.metric_key for batch_slice in self.slices))
+
+
+def create_batches(response_units: list[ResponseUnit], max_points: int, max_bytes: int,
+                   metric_keys: dict[str, str] | None = None) -> list[PushBatch]:
+    """
+    Merge data points from all response units into batches capped by number of data points and payload size.
+    Data point bigger than `max_bytes` is pushed in its own batch
+    :param response_units: response units
+    :param max_points: max data points per batch
+    :param max_bytes: max payload bytes per batch
+    :param metric_keys: metric key of target databox account by metric key of response unit
+    :return: batches
+    """
+    batches: list[PushBatch] = list()
+    batch = PushBatch()
+    for response_unit in response_units:
+        start = 0
+        metric_key = metric_keys.get(response_unit.metric_key) if metric_keys else None
+        for idx, item in enumerate(response_unit.encoded_items(metric_key)):
+            # 2 bytes for separator ", "
+            item_size = len(item) + 2
+            if len(batch) > 0 and (len(batch) >= max_points or batch.size_bytes + item_size > max_bytes):
+                if idx > start:
+                    batch.slices.append(BatchSlice(response_unit, start, idx))
+                batches.append(batch)
+                batch = PushBatch()
+                start = idx
+            batch.items.append(item)
+            batch.size_bytes += item_size
+        if len(response_unit) > start:
+            batch.slices.append(BatchSlice(response_unit, start, len(response_unit)))
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
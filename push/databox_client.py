@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from config.configs import AppConfig, DataboxTarget
+from fetch.limiter import EndpointLimiter, NO_RESPONSE_STATUS
+from telemetry.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+# same accept header as used with databox.ApiClient
+DATABOX_ACCEPT = "application/vnd.databox.v2+json"
+# name of the account from databox_config.username
+DEFAULT_TARGET = "default"
+
+
+class DataboxClient:
+    """
+    Async databox push client. Sends the same request as `databox.DefaultApi.data_post` (endpoint, headers, basic auth
+    from `databox.Configuration`), but on shared aiohttp session, so pushes don't block the event loop and overlap.
+    Pushes are limited by request rate and adaptive concurrency window (up to `databox_config.max_concurrency`),
+    which shrinks when databox is overloaded. Every target account has its own client and limiter.
+    """
+
+    def __init__(self, app_config: AppConfig, session: aiohttp.ClientSession,
+                 metrics: MetricsRegistry | None = None, target: DataboxTarget | None = None) -> None:
+        configuration = app_config.databox_configuration if target is None \
+            else app_config.databox_target_configuration(target)
+        self.name = target.name if target is not None else DEFAULT_TARGET
+        self.url = f"{configuration.host.rstrip('/')}/data"
+        self.headers = {"Accept": DATABOX_ACCEPT,
+                        "Content-Type": "application/json",
+                        "Authorization": configuration.get_basic_auth_token()}
+        self.timeout = aiohttp.ClientTimeout(total=app_config.request_timeout.request_databox_total)
+        self.limiter = EndpointLimiter(f"databox {self.name}", app_config.databox_limit)
+        self.session = session
+        self.metrics = metrics
+
+    async def data_post(self, payload: bytes) -> int:
+        """
+        Push data to databox
+        :param payload: JSON encoded databox push data
+        :return: response status
+        """
+        async with self.limiter.slot():
+            request_start = time.monotonic()
+            try:
+                async with self.session.post(self.url, data=payload, headers=self.headers,
+                                             timeout=self.timeout) as response:
+                    self.limiter.record(response.status, time.monotonic() - request_start, response.headers)
+                    if response.status >= 400:
+                        logger.error(f"Databox push failed, status: {response.status}, "
+                                     f"response: {await response.text()}")
+                    return response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.limiter.record(NO_RESPONSE_STATUS, time.monotonic() - request_start)
+                raise
@@ -0,0 +1,77 @@
+import logging
+from collections.abc import Iterable
+
+from response.response_init import ResponseUnit
+
+logger = logging.getLogger(__name__)
+
+
+class DeltaTracker:
+    """
+    Change detection between parsed metrics and databox push. Keeps a fingerprint (metric key, attributes, date,
+    value) of every data point that was successfully pushed and forwards only new or changed data points.
+    """
+
+    def __init__(self, full_resync_cycles: int = 0) -> None:
+        """
+        :param full_resync_cycles: force full resync of a metric every N cycles it is pushed in, 0 disables periodic
+        full resync
+        """
+        self.full_resync_cycles = full_resync_cycles
+        # fingerprints by metric key: (attributes, date) -> value
+        self.pushed: dict[str, dict[tuple[tuple, int], float]] = dict()
+        # number of cycles by metric key, sources scheduled on their own are counted on their own
+        self.cycles: dict[str, int] = dict()
+
+    def resync(self, metric_keys: Iterable[str] | None = None) -> None:
+        """
+        Forget pushed data points, next cycle pushes full history
+        :param metric_keys: metrics to resync, all when not set
+        """
+        if metric_keys is None:
+            logger.info(f"Full resync requested, dropping pushed data points of {len(self.pushed)} metrics")
+            self.pushed.clear()
+            return
+        for metric_key in metric_keys:
+            logger.info(f"Full resync of {metric_key}")
+            self.pushed.pop(metric_key, None)
+
+    def next_cycle(self, metric_keys: Iterable[str]) -> None:
+        """
+        Mark start of a new cycle of given metrics, triggers full resync of a metric when configured
+        :param metric_keys: metrics pushed in this cycle
+        """
+        for metric_key in set(metric_keys):
+            cycles = self.cycles.get(metric_key, 0)
+            if self.full_resync_cycles > 0 and cycles > 0 and cycles % self.full_resync_cycles == 0:
+                self.resync([metric_key])
+            self.cycles[metric_key] = cycles + 1
+
+    @classmethod
+    def _series_keys(cls, response_unit: ResponseUnit) -> list[tuple]:
+        return [tuple(sorted(attributes.items())) for attributes in response_unit.attributes]
+
+    def changed(self, response_unit: ResponseUnit) -> ResponseUnit:
+        """
+        Get only data points that were not pushed yet or changed value since last successful push
+        :param response_unit: all data for one metric
+        :return: response unit with new or changed data points, same unit when everything changed
+        """
+        pushed = self.pushed.get(response_unit.metric_key, dict())
+        series_keys = self._series_keys(response_unit)
+        indexes = [idx for idx, (date, value, series_idx) in
+                   enumerate(zip(response_unit.dates, response_unit.values, response_unit.series))
+                   if pushed.get((series_keys[series_idx], date)) != value]
+        if len(indexes) == len(response_unit):
+            return response_unit
+        return response_unit.take(indexes)
+
+    def commit(self, response_unit: ResponseUnit) -> None:
+        """
+        Store fingerprint of successfully pushed data points
+        :param response_unit: pushed data
+        """
+        pushed = self.pushed.setdefault(response_unit.metric_key, dict())
+        series_keys = self._series_keys(response_unit)
+        for date, value, series_idx in zip(response_unit.dates, response_unit.values, response_unit.series):
+            pushed[(series_keys[series_idx], date)] = value
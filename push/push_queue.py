@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+ACK_FILE = "ack.json"
+
+
+class PushQueue:
+    """
+    Durable databox push queue. Encoded data points are appended to a write-ahead log on local disk, split into
+    segment files (one data point per line). Flusher reads batches from the acknowledged position and acknowledges
+    them after successful push, fully acknowledged segments are deleted. Data points that were not flushed are
+    read again after restart. When queue is full, new data points are rejected (load shedding): they stay unpushed
+    in the delta tracker and are offered again next cycle, without delta push they are dropped.
+    """
+
+    def __init__(self, directory: str, capacity: int, flush_every: int,
+                 segment_max_bytes: int = 1024 * 1024, fsync: bool = False) -> None:
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_every = flush_every
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync = fsync
+        self.flush_requested = asyncio.Event()
+        self.inserted_since_flush = 0
+        os.makedirs(directory, exist_ok=True)
+        self.ack_position = self._load_ack()
+        self.segments = self._list_segments()
+        self._delete_acked_segments()
+        if not self.segments:
+            self.segments.append(self.ack_position[0])
+        self._recover_last_segment()
+        self.writer = open(self._segment_path(self.segments[-1]), "ab")
+        self.size = self._count_pending()
+        logger.info(f"Push queue opened in {directory}, pending data points: {self.size}")
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _list_segments(self) -> list[int]:
+        return sorted(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+
+    def _load_ack(self) -> tuple[int, int]:
+        ack_path = os.path.join(self.directory, ACK_FILE)
+        if not os.path.exists(ack_path):
+            return 0, 0
+        with open(ack_path, "r") as ack_file:
+            ack = json.load(ack_file)
+        return int(ack["segment"]), int(ack["offset"])
+
+    def _store_ack(self, position: tuple[int, int]) -> None:
+        ack_path = os.path.join(self.directory, ACK_FILE)
+        with open(f"{ack_path}.tmp", "w") as ack_file:
+            json.dump({"segment": position[0], "offset": position[1]}, ack_file)
+            if self.fsync:
+                ack_file.flush()
+                os.fsync(ack_file.fileno())
+        os.replace(f"{ack_path}.tmp", ack_path)
+
+    def _delete_acked_segments(self) -> None:
+        while len(self.segments) > 1 and self.segments[0] < self.ack_position[0]:
+            os.remove(self._segment_path(self.segments.pop(0)))
+
+    def _recover_last_segment(self) -> None:
+        """
+        Drop partially written last data point (process stopped in the middle of write)
+        """
+        path = self._segment_path(self.segments[-1])
+        if not os.path.exists(path):
+            return
+        with open(path, "rb+") as segment:
+            data = segment.read()
+            if data and not data.endswith(b"\n"):
+                logger.warning(f"Dropping partially written data point in {path}")
+                segment.truncate(data.rfind(b"\n") + 1)
+
+    def _count_pending(self) -> int:
+        count = 0
+        for seq in self.segments:
+            if seq < self.ack_position[0]:
+                continue
+            with open(self._segment_path(seq), "rb") as segment:
+                if seq == self.ack_position[0]:
+                    segment.seek(self.ack_position[1])
+                count += sum(chunk.count(b"\n") for chunk in iter(lambda: segment.read(64 * 1024), b""))
+        return count
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _write(self, items: list[bytes]) -> bool:
+        if not items:
+            return True
+        if self.size + len(items) > self.capacity:
+            logger.warning(f"Push queue full ({self.size}/{self.capacity}), shedding {len(items)} data points")
+            return False
+        data = b"".join(item + b"\n" for item in items)
+        if self.writer.tell() > 0 and self.writer.tell() + len(data) > self.segment_max_bytes:
+            self._roll_segment()
+        # buffered write to page cache, it doesn't wait for disk
+        self.writer.write(data)
+        self.writer.flush()
+        self.size += len(items)
+        self.inserted_since_flush += len(items)
+        if self.inserted_since_flush >= self.flush_every:
+            self.flush_requested.set()
+        return True
+
+    def put(self, items: list[bytes]) -> bool:
+        """
+        Append encoded data points to the queue, doesn't wait for flush. With `fsync` the calling thread waits
+        for disk, use `append` on event loop
+        :param items: JSON encoded data points (without new lines)
+        :return: false when queue is full and data points were rejected
+        """
+        written = self._write(items)
+        if written and items and self.fsync:
+            os.fsync(self.writer.fileno())
+        return written
+
+    async def append(self, items: list[bytes]) -> bool:
+        """
+        Append encoded data points to the queue without blocking event loop: with `fsync` the segment is synced
+        in default executor and data points are durable when this returns
+        :param items: JSON encoded data points (without new lines)
+        :return: false when queue is full and data points were rejected
+        """
+        written = self._write(items)
+        if written and items and self.fsync:
+            # duplicated descriptor stays valid when segment is rolled while fsync runs
+            descriptor = os.dup(self.writer.fileno())
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, os.fsync, descriptor)
+            finally:
+                os.close(descriptor)
+        return written
+
+    def _roll_segment(self) -> None:
+        self.writer.close()
+        self.segments.append(self.segments[-1] + 1)
+        self.writer = open(self._segment_path(self.segments[-1]), "ab")
+
+    def read(self, max_items: int, max_bytes: int) -> tuple[list[bytes], tuple[int, int]]:
+        """
+        Read data points from acknowledged position, data points stay in queue until acknowledged
+        :param max_items: max number of data points
+        :param max_bytes: max size of data points
+        :return: data points and position to acknowledge them
+        """
+        items: list[bytes] = list()
+        # JSON array brackets, every data point is followed by separator
+        size_bytes = 2
+        position = self.ack_position
+        for seq in self.segments:
+            if seq < position[0]:
+                continue
+            offset = position[1] if seq == position[0] else 0
+            with open(self._segment_path(seq), "rb") as segment:
+                segment.seek(offset)
+                for line in segment:
+                    if len(items) >= max_items or (items and size_bytes + len(line) + 1 > max_bytes):
+                        return items, (seq, offset)
+                    items.append(line[:-1])
+                    size_bytes += len(line) + 1
+                    offset += len(line)
+            position = (seq, offset)
+        return items, position
+
+    def ack(self, position: tuple[int, int], count: int) -> None:
+        """
+        Acknowledge flushed data points. With `fsync` the calling thread waits for disk, use `acknowledge` on event
+        loop
+        :param position: position returned by read
+        :param count: number of flushed data points
+        """
+        self.ack_position = position
+        self.size -= count
+        self._store_ack(position)
+        self._delete_acked_segments()
+
+    async def acknowledge(self, position: tuple[int, int], count: int) -> None:
+        """
+        Acknowledge flushed data points without blocking event loop: with `fsync` the acknowledged position is stored
+        in default executor
+        :param position: position returned by read
+        :param count: number of flushed data points
+        """
+        self.ack_position = position
+        self.size -= count
+        if self.fsync:
+            await asyncio.get_running_loop().run_in_executor(None, self._store_ack, position)
+        else:
+            self._store_ack(position)
+        self._delete_acked_segments()
+
+    def flushed(self) -> None:
+        self.inserted_since_flush = 0
+        self.flush_requested.clear()
+
+    def close(self) -> None:
+        self.writer.close()
@@ -0,0 +1,63 @@
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from push.databox_client import DataboxClient
+from push.delta import DeltaTracker
+from push.push_queue import PushQueue
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TargetStatus:
+    pushed_points: int = 0
+    failed_batches: int = 0
+    consecutive_failures: int = 0
+    last_status: int | None = None
+    # wall clock time of last successful push
+    last_success: float | None = None
+
+    def record(self, status: int, points: int) -> None:
+        self.last_status = status
+        if 200 <= status < 300:
+            self.pushed_points += points
+            self.consecutive_failures = 0
+            self.last_success = time.time()
+        else:
+            self.failed_batches += 1
+            self.consecutive_failures += 1
+
+
+class PushTarget:
+    """
+    Databox account metrics are pushed to. Every target has its own client (limiter), metric key mapping,
+    delta tracker, push queue and status, so slow or failing account doesn't hold back pushes to other accounts.
+    Data points are encoded once and shared by all targets
+    """
+
+    def __init__(self, name: str, metric_keys: dict[str, str], create_client: Callable[[], DataboxClient],
+                 delta_tracker: DeltaTracker | None = None, push_queue: PushQueue | None = None) -> None:
+        self.name = name
+        self.metric_keys = metric_keys
+        self.create_client = create_client
+        self.delta_tracker = delta_tracker
+        self.push_queue = push_queue
+        self.status = TargetStatus()
+        self._client: DataboxClient | None = None
+
+    @property
+    def client(self) -> DataboxClient:
+        """
+        Client is built on first push, runs with nothing to push don't need it (nor databox SDK)
+        :return: databox client of the account
+        """
+        if self._client is None:
+            self._client = self.create_client()
+        return self._client
+
+    def close(self) -> None:
+        if self.push_queue is not None:
+            self.push_queue.close()
+            self.push_queue = None
@@ -1,7 +1,6 @@
-from response.response_init import ResponseInit, ResponseUnit
+from response.response_init import ResponseInit
 
 
 class DeathRate(ResponseInit):
-
-    def parse(self) -> ResponseUnit:
-        return super()._get_birth_death_response_unit("D")
+    time_dimension = "LETO"
+    unit = "D"
@@ -0,0 +1,194 @@
+import logging
+import time
+from array import array
+from collections.abc import Callable
+from datetime import datetime
+
+from config.configs import DerivedMetric
+from response.response_init import ResponseUnit
+from telemetry.metrics import MetricsRegistry
+from util.helper import date_to_epoch, epoch_to_date
+
+logger = logging.getLogger(__name__)
+# histogram of derived metric calculation time by metric
+DERIVED_SECONDS = "derived_seconds"
+
+
+def _series_keys(response_unit: ResponseUnit) -> list[tuple]:
+    return [tuple(sorted(attributes.items())) for attributes in response_unit.attributes]
+
+
+def _index(response_unit: ResponseUnit) -> dict[tuple[tuple, int], float]:
+    """
+    Hash index of data points by (series attributes, date)
+    """
+    series_keys = _series_keys(response_unit)
+    return {(series_keys[series_idx], date): value
+            for date, value, series_idx in zip(response_unit.dates, response_unit.values, response_unit.series)}
+
+
+def _join(left: ResponseUnit, right_index: dict[tuple[tuple, int], float],
+          date_key: Callable[[int], int], operation: Callable[[float, float], float | None]) -> tuple:
+    """
+    Hash join of left data points with right index on (series attributes, date)
+    """
+    series_keys = _series_keys(left)
+    dates = array("q")
+    values = array("d")
+    series = array("I")
+    for date, value, series_idx in zip(left.dates, left.values, left.series):
+        right_value = right_index.get((series_keys[series_idx], date_key(date)))
+        if right_value is None:
+            continue
+        result = operation(value, right_value)
+        if result is None:
+            continue
+        dates.append(date)
+        values.append(result)
+        series.append(series_idx)
+    return dates, values, series
+
+
+def _year_before(epoch: int) -> int:
+    date = datetime.fromisoformat(epoch_to_date(epoch))
+    try:
+        year_before = date.replace(year=date.year - 1)
+    except ValueError:
+        # 29th of February
+        year_before = date.replace(year=date.year - 1, day=28)
+    return date_to_epoch(year_before.isoformat())
+
+
+def difference(inputs: list[ResponseUnit], derived_metric: DerivedMetric) -> tuple:
+    return _join(inputs[0], _index(inputs[1]), lambda date: date, lambda left, right: left - right)
+
+
+def ratio(inputs: list[ResponseUnit], derived_metric: DerivedMetric) -> tuple:
+    return _join(inputs[0], _index(inputs[1]), lambda date: date,
+                 lambda left, right: left / right if right != 0 else None)
+
+
+def yoy_change(inputs: list[ResponseUnit], derived_metric: DerivedMetric) -> tuple:
+    """
+    Change in percent against the same period one year before
+    """
+    return _join(inputs[0], _index(inputs[0]), _year_before,
+                 lambda left, right: (left - right) / right * 100 if right != 0 else None)
+
+
+def rolling_average(inputs: list[ResponseUnit], derived_metric: DerivedMetric) -> tuple:
+    """
+    Average of last `window` data points of every series, data points are ordered by date
+    """
+    response_unit = inputs[0]
+    window = derived_metric.window
+    dates = array("q")
+    values = array("d")
+    series = array("I")
+    window_sums: dict[int, float] = dict()
+    window_values: dict[int, list[float]] = dict()
+    for date, value, series_idx in zip(response_unit.dates, response_unit.values, response_unit.series):
+        series_values = window_values.setdefault(series_idx, list())
+        series_values.append(value)
+        window_sums[series_idx] = window_sums.get(series_idx, 0.0) + value
+        if len(series_values) > window:
+            window_sums[series_idx] -= series_values.pop(0)
+        if len(series_values) == window:
+            dates.append(date)
+            values.append(window_sums[series_idx] / window)
+            series.append(series_idx)
+    return dates, values, series
+
+
+FORMULAS: dict[str, tuple[int, Callable[[list[ResponseUnit], DerivedMetric], tuple]]] = {
+    # formula: (number of inputs, calculation)
+    "difference": (2, difference),
+    "ratio": (2, ratio),
+    "rolling_average": (1, rolling_average),
+    "yoy_change": (1, yoy_change),
+}
+
+
+class DerivedEngine:
+    """
+    Derived metrics calculated from sources or other derived metrics. Metrics are evaluated in dependency order
+    (DAG), inputs are joined on series attributes and date. Derived metric is recalculated only when one of its
+    inputs changed, otherwise previous result is reused
+    """
+
+    def __init__(self, derived_metrics: list[DerivedMetric], metrics: MetricsRegistry | None = None) -> None:
+        for derived_metric in derived_metrics:
+            if derived_metric.formula not in FORMULAS:
+                raise ValueError(f"Unknown formula {derived_metric.formula} for {derived_metric.name}, "
+                                 f"available: {list(FORMULAS)}")
+            if len(derived_metric.inputs) != FORMULAS[derived_metric.formula][0]:
+                raise ValueError(f"Formula {derived_metric.formula} for {derived_metric.name} needs "
+                                 f"{FORMULAS[derived_metric.formula][0]} inputs, got: {derived_metric.inputs}")
+        self.derived_metrics = self._dependency_order(derived_metrics)
+        self.fingerprints: dict[str, tuple] = dict()
+        self.results: dict[str, ResponseUnit] = dict()
+        self.metrics = metrics
+
+    @classmethod
+    def _dependency_order(cls, derived_metrics: list[DerivedMetric]) -> list[DerivedMetric]:
+        by_name = {derived_metric.name: derived_metric for derived_metric in derived_metrics}
+        ordered: list[DerivedMetric] = list()
+        state: dict[str, int] = dict()
+
+        def visit(name: str) -> None:
+            if state.get(name) == 2 or name not in by_name:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"Derived metrics have circular dependency on: {name}")
+            state[name] = 1
+            for input_name in by_name[name].inputs:
+                visit(input_name)
+            state[name] = 2
+            ordered.append(by_name[name])
+
+        for derived_metric in derived_metrics:
+            visit(derived_metric.name)
+        return ordered
+
+    def dependents(self, names: set[str]) -> set[str]:
+        """
+        Derived metrics that depend (directly or through other derived metrics) on any of given metrics
+        :param names: source or derived metric names
+        :return: names of dependent derived metrics
+        """
+        affected = set(names)
+        for derived_metric in self.derived_metrics:
+            if affected.intersection(derived_metric.inputs):
+                affected.add(derived_metric.name)
+        return affected - set(names)
+
+    def evaluate(self, response_units: list[ResponseUnit]) -> list[ResponseUnit]:
+        """
+        Calculate derived metrics. Derived metric with missing or empty input is skipped, other metrics are still
+        calculated
+        :param response_units: source response units
+        :return: derived response units
+        """
+        available = {response_unit.data_type: response_unit for response_unit in response_units}
+        derived_units: list[ResponseUnit] = list()
+        for derived_metric in self.derived_metrics:
+            inputs = [available.get(input_name) for input_name in derived_metric.inputs]
+            if any(not input_unit for input_unit in inputs):
+                logger.warning(f"Derived metric {derived_metric.name} skipped, missing input data: "
+                               f"{[name for name, unit in zip(derived_metric.inputs, inputs) if not unit]}")
+                continue
+            fingerprint = tuple(input_unit.fingerprint() for input_unit in inputs)
+            derived_unit = self.results.get(derived_metric.name)
+            if derived_unit is None or self.fingerprints.get(derived_metric.name) != fingerprint:
+                start = time.perf_counter()
+                dates, values, series = FORMULAS[derived_metric.formula][1](inputs, derived_metric)
+                if self.metrics is not None:
+                    self.metrics.observe(DERIVED_SECONDS, time.perf_counter() - start, metric=derived_metric.name)
+                derived_unit = ResponseUnit(derived_metric.metric_key, derived_metric.unit, dates, values,
+                                            derived_metric.name, 200, series, inputs[0].attributes)
+                self.results[derived_metric.name] = derived_unit
+                self.fingerprints[derived_metric.name] = fingerprint
+                logger.info(f"Derived metric {derived_metric.name} calculated, size: {len(derived_unit)}")
+            available[derived_metric.name] = derived_unit
+            derived_units.append(derived_unit)
+        return derived_units
@@ -0,0 +1,112 @@
+import itertools
+import math
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from util.helper import assert_true, create_date_from_period, date_to_epoch
+
+
+@dataclass
+class JsonStatSeries:
+    attributes: dict[str, str]
+    dates: array
+    values: array
+
+
+@dataclass
+class JsonStatCube:
+    ids: list[str]
+    sizes: list[int]
+    strides: list[int]
+    categories: dict[str, list[str]]
+    labels: dict[str, list[str]]
+    time_dimension: str
+    values: array
+
+    def series(self) -> Iterator[JsonStatSeries]:
+        """
+        Iterate over all time series in the cube - one series per combination of non-time categories.
+        Values of single series are addressed with time dimension stride, no copying per data point
+        :return: time series with attributes (labels of non-time dimensions with more than one category) and dates
+        as seconds since epoch
+        """
+        time_pos = self.ids.index(self.time_dimension)
+        time_stride = self.strides[time_pos]
+        time_size = self.sizes[time_pos]
+        dates = array("q", [date_to_epoch(create_date_from_period(period))
+                            for period in self.categories[self.time_dimension]])
+        other_pos = [pos for pos in range(len(self.ids)) if pos != time_pos]
+        for indexes in itertools.product(*[range(self.sizes[pos]) for pos in other_pos]):
+            offset = sum(idx * self.strides[pos] for idx, pos in zip(indexes, other_pos))
+            attributes = {self.ids[pos]: self.labels[self.ids[pos]][idx]
+                          for idx, pos in zip(indexes, other_pos) if self.sizes[pos] > 1}
+            yield JsonStatSeries(attributes, dates,
+                                 self.values[offset:offset + time_size * time_stride:time_stride])
+
+
+def _category_codes(dimension: dict) -> list[str]:
+    """
+    Category codes ordered by position. Index can be an object (code: position), an array of codes or missing
+    (single category, only label is present)
+    """
+    category = dimension["category"]
+    index = category.get("index")
+    if index is None:
+        return list(category["label"].keys())
+    if isinstance(index, list):
+        return index
+    codes = [""] * len(index)
+    for code, position in index.items():
+        codes[position] = code
+    return codes
+
+
+def _decode_values(raw_values: list | dict, length: int) -> array:
+    """
+    Decode json-stat2 values into contiguous float array, missing values (null or sparse) are NaN
+    """
+    if isinstance(raw_values, array):
+        # already decoded while streaming
+        return raw_values
+    if isinstance(raw_values, dict):
+        values = array("d", [math.nan]) * length
+        for position, value in raw_values.items():
+            if value is not None:
+                values[int(position)] = value
+        return values
+    try:
+        return array("d", raw_values)
+    except TypeError:
+        return array("d", [math.nan if value is None else value for value in raw_values])
+
+
+def decode(raw_response: dict, time_dimension: str | None = None) -> JsonStatCube:
+    """
+    Decode json-stat2 dataset into cube of any number of dimensions. Dimensions are addressed with row-major
+    strides (last dimension changes fastest)
+    :param raw_response: json-stat2 dataset
+    :param time_dimension: time dimension id, `role.time` from dataset is used when not set
+    :return: decoded cube
+    """
+    ids: list[str] = raw_response["id"]
+    sizes: list[int] = raw_response["size"]
+    assert_true(len(ids), len(sizes))
+    strides = [math.prod(sizes[pos + 1:]) for pos in range(len(sizes))]
+    categories = dict()
+    labels = dict()
+    for dimension_id, size in zip(ids, sizes):
+        dimension = raw_response["dimension"][dimension_id]
+        codes = _category_codes(dimension)
+        assert_true(size, len(codes))
+        category_labels = dimension["category"].get("label", {})
+        categories[dimension_id] = codes
+        labels[dimension_id] = [category_labels.get(code, code) for code in codes]
+    if time_dimension is None:
+        time_dimension = raw_response["role"]["time"][0]
+    if time_dimension not in ids:
+        raise ValueError(f"Time dimension {time_dimension} is not in dataset dimensions: {ids}")
+    length = math.prod(sizes)
+    values = _decode_values(raw_response["value"], length)
+    assert_true(length, len(values))
+    return JsonStatCube(ids, sizes, strides, categories, labels, time_dimension, values)
@@ -0,0 +1,202 @@
+import json
+import re
+from array import array
+from collections.abc import Callable
+
+import aiohttp
+
+# response is read in chunks of this size
+CHUNK_SIZE = 64 * 1024
+# structural characters outside and inside of JSON strings
+STRUCTURAL = re.compile(rb'["\[\]{},]')
+STRING_END = re.compile(rb'["\\]')
+# closing quote of a key, not escaped
+KEY_END = re.compile(rb'(?<!\\)(?:\\\\)*"')
+WHITESPACE = b" \t\r\n"
+
+START, KEY, AFTER_KEY, VALUE_START, VALUES, RAW, END = range(7)
+
+
+class JsonStatStreamParser:
+    """
+    Incremental json-stat2 parser. Response is fed in chunks, dense `value` array is decoded chunk by chunk straight
+    into contiguous float array (null is NaN), so neither whole response text nor list of values is held in memory.
+    Other (small) top level members are buffered and decoded on their own, `status` is skipped.
+    With `stop_member` (key, value) parsing stops as soon as that member is read with that value
+    """
+
+    def __init__(self, stream_keys: tuple[str, ...] = ("value",), skip_keys: tuple[str, ...] = ("status",),
+                 stop_member: tuple[str, object] | None = None) -> None:
+        self.stream_keys = stream_keys
+        self.skip_keys = skip_keys
+        self.stop_member = stop_member
+        self.stopped = False
+        self.buffer = bytearray()
+        self.pos = 0
+        self.state = START
+        self.key: str | None = None
+        self.raw = bytearray()
+        self.raw_start = 0
+        self.depth = 0
+        self.in_string = False
+        self.values = array("d")
+        self.members: dict = dict()
+
+    def _skip_whitespace(self) -> bool:
+        buffer = self.buffer
+        while self.pos < len(buffer) and buffer[self.pos] in WHITESPACE:
+            self.pos += 1
+        return self.pos < len(buffer)
+
+    def _values(self) -> bool:
+        buffer = self.buffer
+        end = buffer.find(b"]", self.pos)
+        if end >= 0:
+            self._append_values(buffer[self.pos:end])
+            self.pos = end + 1
+            self.members[self.key] = self.values
+            return True
+        # keep last (maybe incomplete) number for next chunk
+        comma = buffer.rfind(b",", self.pos)
+        if comma >= 0:
+            self._append_values(buffer[self.pos:comma])
+            self.pos = comma + 1
+        return False
+
+    def _append_values(self, part: bytes) -> None:
+        if part.strip():
+            # json accepts NaN, missing values are decoded straight to NaN
+            self.values.extend(json.loads(b"[" + part.replace(b"null", b"NaN") + b"]"))
+
+    def _raw(self) -> bool:
+        buffer = self.buffer
+        while True:
+            if self.in_string:
+                match = STRING_END.search(buffer, self.pos)
+                if match is None:
+                    self.pos = len(buffer)
+                    return False
+                if match.group() == b"\\":
+                    if match.end() >= len(buffer):
+                        self.pos = match.start()
+                        return False
+                    self.pos = match.end() + 1
+                    continue
+                self.in_string = False
+                self.pos = match.end()
+                continue
+            match = STRUCTURAL.search(buffer, self.pos)
+            if match is None:
+                self.pos = len(buffer)
+                return False
+            char = match.group()
+            if char == b'"':
+                self.in_string = True
+            elif char in (b"[", b"{"):
+                self.depth += 1
+            elif char in (b"]", b"}"):
+                self.depth -= 1
+            if self.depth < 0 or (char == b"," and self.depth == 0):
+                # end of member value, separator or end of object is handled as next key
+                self.pos = match.start()
+                if self.key not in self.skip_keys:
+                    self.raw += buffer[self.raw_start:self.pos]
+                    self.members[self.key] = json.loads(self.raw)
+                return True
+            self.pos = match.end()
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Parse next chunk of response
+        :param chunk: response bytes
+        """
+        self.buffer += chunk
+        buffer = self.buffer
+        while self.state != END:
+            if self.state in (START, KEY, AFTER_KEY, VALUE_START) and not self._skip_whitespace():
+                break
+            if self.state == START:
+                if buffer[self.pos] != ord("{"):
+                    raise ValueError("json-stat2 response must be an object")
+                self.pos += 1
+                self.state = KEY
+            elif self.state == KEY:
+                char = buffer[self.pos]
+                if char == ord(","):
+                    self.pos += 1
+                elif char == ord("}"):
+                    self.pos += 1
+                    self.state = END
+                elif char == ord('"'):
+                    match = KEY_END.search(buffer, self.pos + 1)
+                    if match is None:
+                        break
+                    self.key = json.loads(buffer[self.pos:match.end()])
+                    self.pos = match.end()
+                    self.state = AFTER_KEY
+                else:
+                    raise ValueError(f"Unexpected character in json-stat2 response: {chr(char)}")
+            elif self.state == AFTER_KEY:
+                if buffer[self.pos] != ord(":"):
+                    raise ValueError(f"Missing value of {self.key} in json-stat2 response")
+                self.pos += 1
+                self.state = VALUE_START
+            elif self.state == VALUE_START:
+                if self.key in self.stream_keys and buffer[self.pos] == ord("["):
+                    self.pos += 1
+                    self.values = array("d")
+                    self.state = VALUES
+                else:
+                    self.raw = bytearray()
+                    self.raw_start = self.pos
+                    self.depth = 0
+                    self.in_string = False
+                    self.state = RAW
+            elif self.state == VALUES:
+                if not self._values():
+                    break
+                self.state = KEY
+            elif self.state == RAW:
+                if not self._raw():
+                    break
+                self.state = KEY
+                if self.stop_member is not None and self.key == self.stop_member[0] and \
+                        self.members.get(self.key) == self.stop_member[1]:
+                    self.stopped = True
+                    break
+        # drop parsed bytes, keep captured part of unfinished member
+        if self.state == RAW and self.key not in self.skip_keys:
+            self.raw += buffer[self.raw_start:self.pos]
+        del buffer[:self.pos]
+        self.pos = 0
+        self.raw_start = 0
+
+    def close(self) -> dict:
+        """
+        :return: json-stat2 dataset, streamed `value` is float array
+        """
+        if self.state != END:
+            raise ValueError("Incomplete json-stat2 response")
+        return self.members
+
+
+async def read_json_stat(content: aiohttp.StreamReader, chunk_size: int = CHUNK_SIZE,
+                         cached_updated: str | None = None,
+                         on_chunk: Callable[[int], None] | None = None) -> dict | None:
+    """
+    Read and parse json-stat2 response in chunks
+    :param content: response stream
+    :param chunk_size: chunk size
+    :param cached_updated: `updated` field of cached dataset, reading stops as soon as response has the same one
+    :param on_chunk: called with size of every read chunk (aiohttp chunk trace hooks are not called for streams)
+    :return: json-stat2 dataset, `value` is float array, None when dataset was not updated since cached one
+    (rest of the response is not read nor decoded)
+    """
+    parser = JsonStatStreamParser(stop_member=("updated", cached_updated) if cached_updated is not None else None)
+    async for chunk in content.iter_chunked(chunk_size):
+        if on_chunk is not None:
+            on_chunk(len(chunk))
+        parser.feed(chunk)
+        if parser.stopped:
+            return None
+    return parser.close()
@@ -0,0 +1,55 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from config.configs import RequestPost
+from response.registry import create_response
+from response.response_init import ResponseUnit
+
+logger = logging.getLogger(__name__)
+
+
+def parse_response(response_data: str, request_post: RequestPost, response_status: int) -> ResponseUnit:
+    """
+    Decode and parse json-stat2 response, runs in worker process
+    :param response_data: response body
+    :param request_post: source config
+    :param response_status: response status
+    :return: response unit, pickled as columnar buffers
+    """
+    return create_response(json.loads(response_data), request_post, response_status).parse()
+
+
+class ParsePool:
+    """
+    Process pool for decoding and parsing large responses, so event loop keeps handling I/O while parsing
+    scales across cores. Smaller responses are parsed on event loop, process round trip would cost more
+    """
+
+    def __init__(self, workers: int, min_bytes: int) -> None:
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self.executor: ProcessPoolExecutor | None = None
+
+    def offloads(self, response_data: str) -> bool:
+        return len(response_data) >= self.min_bytes
+
+    async def parse(self, response_data: str, request_post: RequestPost, response_status: int) -> ResponseUnit:
+        """
+        Parse response in worker process
+        :param response_data: response body
+        :param request_post: source config
+        :param response_status: response status
+        :return: response unit
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            logger.info(f"Parse pool started, workers: {self.workers}")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, parse_response, response_data,
+                                                                request_post, response_status)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,34 @@
+from config.configs import RequestPost
+from response.average_pay import AveragePay
+from response.birth_rate import BirthRate
+from response.death_rate import DeathRate
+from response.response_init import ResponseInit
+
+# parser by source name, sources that are not listed are parsed with generic json-stat2 parser
+RESPONSE_PARSERS: dict[str, type[ResponseInit]] = {
+    "average_pay": AveragePay,
+    "birth_rate": BirthRate,
+    "death_rate": DeathRate,
+}
+
+
+def create_response(raw_response: dict, request_post: RequestPost, response_status: int) -> ResponseInit:
+    """
+    Create response parser for the source, time dimension and unit from source config take precedence
+    :param raw_response: json-stat2 response
+    :param request_post: source config
+    :param response_status: response status
+    :return: response parser
+    """
+    response_parser = RESPONSE_PARSERS.get(request_post.name, ResponseInit)
+    return response_parser(raw_response, request_post.name, request_post.metric_key, response_status,
+                           request_post.time_dimension, request_post.unit)
+
+
+def time_dimension_of(request_post: RequestPost) -> str | None:
+    """
+    Time dimension of the source, from source config or its parser
+    :param request_post: source config
+    :return: json-stat2 time dimension id, None when it is taken from `role.time` of the response
+    """
+    return request_post.time_dimension or RESPONSE_PARSERS.get(request_post.name, ResponseInit).time_dimension
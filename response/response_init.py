@@ -1,47 +1,187 @@
-from dataclasses import dataclass
+import json
+import sys
+from array import array
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
-from databox import PushData
+from response.json_stat import decode
+from util.helper import epoch_to_date
 
-from config.configs import RequestType
-from util.helper import assert_true, create_date_from_year
+if TYPE_CHECKING:
+    from databox import PushData
 
 
-@dataclass
-class ResponseData:
-    date: str
-    value: float
-
-
-@dataclass
+@dataclass(repr=False)
 class ResponseUnit:
-    data_units: list[ResponseData]
-    databox_units: list[PushData]
-    data_type: RequestType
+    """
+    Columnar data of one metric: dates (seconds since epoch) and values are contiguous arrays, `series` holds
+    index into `attributes` for every data point. Databox push data is materialised only when serialised
+    """
+    metric_key: str
+    unit: str | None
+    dates: array
+    values: array
+    data_type: str
     response_status: int
+    series: array = field(default_factory=lambda: array("I"))
+    attributes: list[dict[str, str]] = field(default_factory=lambda: [{}])
+
+    def __post_init__(self):
+        self.metric_key = sys.intern(self.metric_key)
+        if self.unit is not None:
+            self.unit = sys.intern(self.unit)
+        if len(self.series) != len(self.values):
+            # single series
+            self.series = array("I", bytes(self.series.itemsize * len(self.values)))
+        self._encoded_items: list[bytes] | None = None
+        # encoded data points with metric key of another databox account
+        self._remapped_items: dict[str, list[bytes]] = dict()
+        self._fingerprint: int | None = None
+
+    @classmethod
+    def empty(cls, data_type: str, response_status: int, metric_key: str = "") -> "ResponseUnit":
+        return cls(metric_key, None, array("q"), array("d"), data_type, response_status)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __reduce__(self):
+        # pickled as columnar buffers (e.g. from parse worker process), cached encodings are not sent
+        return ResponseUnit, (self.metric_key, self.unit, self.dates, self.values, self.data_type,
+                              self.response_status, self.series, self.attributes)
+
+    def __repr__(self) -> str:
+        first_last = f", first: {epoch_to_date(self.dates[0])}, last: {epoch_to_date(self.dates[-1])}" if self else ""
+        return (f"ResponseUnit(metric_key: {self.metric_key}, data_type: {self.data_type}, "
+                f"status: {self.response_status}, points: {len(self)}{first_last})")
+
+    def fingerprint(self) -> int:
+        """
+        Hash of all data points, used to detect changed data
+        :return: fingerprint
+        """
+        if self._fingerprint is None:
+            self._fingerprint = hash((self.metric_key, self.dates.tobytes(), self.values.tobytes(),
+                                      self.series.tobytes(), repr(self.attributes)))
+        return self._fingerprint
+
+    def take(self, indexes: Iterable[int]) -> "ResponseUnit":
+        """
+        Get response unit with selected data points only
+        :param indexes: data point indexes
+        :return: new response unit
+        """
+        indexes = list(indexes)
+        response_unit = ResponseUnit(self.metric_key, self.unit,
+                                     array("q", [self.dates[idx] for idx in indexes]),
+                                     array("d", [self.values[idx] for idx in indexes]),
+                                     self.data_type, self.response_status,
+                                     array("I", [self.series[idx] for idx in indexes]), self.attributes)
+        if self._encoded_items is not None:
+            # already encoded data points are not encoded again
+            response_unit._encoded_items = [self._encoded_items[idx] for idx in indexes]
+        return response_unit
+
+    def _items(self) -> Iterable[tuple[str, float, dict[str, str]]]:
+        date_cache: dict[int, str] = dict()
+        for epoch, value, series_idx in zip(self.dates, self.values, self.series):
+            date = date_cache.get(epoch)
+            if date is None:
+                date = date_cache[epoch] = epoch_to_date(epoch)
+            yield date, value, self.attributes[series_idx]
+
+    def push_data(self) -> list["PushData"]:
+        """
+        Materialise databox push data models
+        :return: databox push data
+        """
+        # databox SDK (pydantic models) is slow to import, push itself uses `encoded_items`
+        from databox import PushData, PushDataAttribute
+        return [PushData(key=self.metric_key, value=value, unit=self.unit, var_date=date,
+                         attributes=[PushDataAttribute(key=key, value=attr)
+                                     for key, attr in attributes.items()] or None)
+                for date, value, attributes in self._items()]
+
+    def encoded_items(self, metric_key: str | None = None) -> list[bytes]:
+        """
+        JSON encoded data points, same JSON as serialised `PushData`. Encoded once and reused on every push
+        :param metric_key: metric key in another databox account, only key member of data points is replaced
+        :return: encoded data points
+        """
+        if metric_key is not None and metric_key != self.metric_key:
+            remapped_items = self._remapped_items.get(metric_key)
+            if remapped_items is None:
+                # key member follows the date, it is the first "key" member of every data point
+                key_member = b'"key": ' + json.dumps(self.metric_key, ensure_ascii=False).encode()
+                remapped_member = b'"key": ' + json.dumps(metric_key, ensure_ascii=False).encode()
+                remapped_items = self._remapped_items[metric_key] = [item.replace(key_member, remapped_member, 1)
+                                                                     for item in self.encoded_items()]
+            return remapped_items
+        if self._encoded_items is None:
+            encoded_items = list()
+            for date, value, attributes in self._items():
+                item = {"date": date, "key": self.metric_key, "value": value}
+                if self.unit is not None:
+                    item["unit"] = self.unit
+                if attributes:
+                    item["attributes"] = [{"key": key, "value": attr} for key, attr in attributes.items()]
+                encoded_items.append(json.dumps(item, ensure_ascii=False).encode())
+            self._encoded_items = encoded_items
+        return self._encoded_items
+
+    def payload(self) -> bytes:
+        """
+        Databox push request body with all data points
+        :return: JSON body
+        """
+        return b"[" + b", ".join(self.encoded_items()) + b"]"
 
 
 class ResponseInit:
+    # json-stat2 time dimension id, `role.time` from dataset when not set
+    time_dimension: str | None = None
+    # databox unit
+    unit: str | None = None
 
     def __init__(self, raw_response: dict,
-                 request_type: RequestType,
+                 data_type: str,
                  metric_key: str,
-                 response_status: int) -> None:
+                 response_status: int,
+                 time_dimension: str | None = None,
+                 unit: str | None = None) -> None:
         self.raw_response = raw_response
-        self.request_type = request_type
+        self.data_type = data_type
         self.response_status = response_status
         self.metric_key = metric_key
+        if time_dimension is not None:
+            self.time_dimension = time_dimension
+        if unit is not None:
+            self.unit = unit
+
+    def parse(self) -> ResponseUnit:
+        """
+        Decode json-stat2 response to columnar data. Each series of a multidimensional cube is pushed with
+        its non-time categories as databox attributes, missing values are skipped
+        :return: response unit with all the data
+        """
+        cube = decode(self.raw_response, self.time_dimension)
+        dates = array("q")
+        values = array("d")
+        series = array("I")
+        attributes: list[dict[str, str]] = list()
+        for series_idx, cube_series in enumerate(cube.series()):
+            attributes.append(cube_series.attributes)
+            series_values = cube_series.values
+            series_dates = cube_series.dates
+            if any(value != value for value in series_values):
+                # missing values (NaN)
+                valid = [idx for idx, value in enumerate(series_values) if value == value]
+                series_values = array("d", [series_values[idx] for idx in valid])
+                series_dates = array("q", [series_dates[idx] for idx in valid])
+            dates.extend(series_dates)
+            values.extend(series_values)
+            series.extend(array("I", [series_idx]) * len(series_values))
 
-    def _get_birth_death_response_unit(self, unit: str):
-        dates_raw = self.raw_response["dimension"]["LETO"]["category"]["label"]
-        values_raw = self.raw_response["value"]
-        assert_true(len(dates_raw), len(values_raw))
-        dates = [create_date_from_year(int(date)) for date in dates_raw.values()]
-        values = [float(val) for val in values_raw]
-        data_units: list[ResponseData] = list()
-        databox_units: list[PushData] = list()
-        for idx, date in enumerate(dates):
-            value_unit = values[idx]
-            data_units.append(ResponseData(date, value_unit))
-            databox_units.append(PushData(key=self.metric_key, value=value_unit, unit=unit, var_date=date))
-
-        return ResponseUnit(data_units, databox_units, self.request_type, self.response_status)
+        return ResponseUnit(self.metric_key, self.unit, dates, values, self.data_type, self.response_status,
+                            series, attributes or [{}])
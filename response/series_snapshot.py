@@ -0,0 +1,96 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from response.response_init import ResponseUnit
+
+logger = logging.getLogger(__name__)
+MAGIC = b"DBXSER01"
+# magic, index length
+PREAMBLE = struct.Struct("<8sI")
+ALIGNMENT = 8
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def store_series(path: str, response_units: dict[str, ResponseUnit], pushed: set[str]) -> None:
+    """
+    Store latest series of every source into binary snapshot atomically. File is a small JSON index by source name
+    (metric key, unit, attributes, offsets) followed by 8 byte aligned columns of every source: dates (int64 seconds
+    since epoch), values (float64) and series indexes (uint32), in native byte order.
+    Failure (e.g. read-only file system) is not an error
+    :param path: snapshot file path
+    :param response_units: latest response unit by source name
+    :param pushed: sources whose data points were all pushed
+    """
+    index = dict()
+    offset = 0
+    for name, response_unit in response_units.items():
+        columns = dict()
+        for column in ("dates", "values", "series"):
+            columns[column] = offset
+            offset = _aligned(offset + len(getattr(response_unit, column)) * getattr(response_unit, column).itemsize)
+        index[name] = {"metric_key": response_unit.metric_key, "unit": response_unit.unit,
+                       "status": response_unit.response_status, "points": len(response_unit),
+                       "attributes": response_unit.attributes, "pushed": name in pushed, **columns}
+    index_bytes = json.dumps({"byteorder": sys.byteorder, "sources": index}, ensure_ascii=False).encode()
+    data_start = _aligned(PREAMBLE.size + len(index_bytes))
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(PREAMBLE.pack(MAGIC, len(index_bytes)))
+            snapshot_file.write(index_bytes)
+            for name, response_unit in response_units.items():
+                for column in ("dates", "values", "series"):
+                    snapshot_file.seek(data_start + index[name][column])
+                    snapshot_file.write(memoryview(getattr(response_unit, column)).cast("B"))
+            snapshot_file.truncate(data_start + offset)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.warning(f"Series snapshot not stored: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_series(path: str) -> tuple[dict[str, ResponseUnit], set[str]]:
+    """
+    Load series snapshot with mmap. Columns of response units are read-only memoryviews of the mapped file,
+    data points are not decoded or copied
+    :param path: snapshot file path
+    :return: response unit by source name and sources whose data points were all pushed, nothing when snapshot
+    doesn't exist or is not valid
+    """
+    try:
+        with open(path, "rb") as snapshot_file:
+            mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return dict(), set()
+    try:
+        magic, index_length = PREAMBLE.unpack_from(mapped)
+        if magic != MAGIC:
+            raise ValueError(f"unknown format {magic!r}")
+        index = json.loads(mapped[PREAMBLE.size:PREAMBLE.size + index_length])
+        if index["byteorder"] != sys.byteorder:
+            raise ValueError(f"byte order {index['byteorder']}")
+        data = memoryview(mapped)[_aligned(PREAMBLE.size + index_length):]
+        response_units = dict()
+        pushed = set()
+        for name, entry in index["sources"].items():
+            points = entry["points"]
+            columns = [data[entry[column]:entry[column] + points * array(typecode).itemsize].cast(typecode)
+                       for column, typecode in (("dates", "q"), ("values", "d"), ("series", "I"))]
+            response_units[name] = ResponseUnit(entry["metric_key"], entry["unit"], *columns[:2], name,
+                                                entry["status"], columns[2], entry["attributes"])
+            if entry["pushed"]:
+                pushed.add(name)
+    except (ValueError, KeyError, TypeError, struct.error) as e:
+        logger.warning(f"Series snapshot {path} ignored: {e}")
+        return dict(), set()
+    logger.info(f"Series snapshot loaded, sources: {list(response_units)}")
+    return response_units, pushed
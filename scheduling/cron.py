@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+# (min, max) of cron fields: minute, hour, day of month, month, day of week (0 or 7 is Sunday)
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+# limit search for next time: steps skip a month, a day, an hour or a minute, this allows about 5 years of hourly steps
+MAX_SEARCH_STEPS = 5 * 366 * 24
+
+
+class CronExpression:
+    """
+    Standard 5 field cron expression: minute hour day-of-month month day-of-week.
+    Fields support `*`, numbers, lists (`1,15`), ranges (`1-5`) and steps (`*/15`, `0-30/5`)
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, is: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            self._parse_field(cron_field, minimum, maximum)
+            for cron_field, (minimum, maximum) in zip(fields, FIELD_RANGES)]
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        self.days_restricted = fields[2] != "*"
+        self.weekdays_restricted = fields[4] != "*"
+
+    @classmethod
+    def _parse_field(cls, cron_field: str, minimum: int, maximum: int) -> set[int]:
+        values = set()
+        for part in cron_field.split(","):
+            part_range, _, step = part.partition("/")
+            if part_range == "*":
+                start, end = minimum, maximum
+            elif "-" in part_range:
+                start, end = (int(value) for value in part_range.split("-", 1))
+            else:
+                start = end = int(part_range)
+            if step:
+                end = maximum if "-" not in part_range else end
+            if not (minimum <= start <= end <= maximum):
+                raise ValueError(f"Cron field {cron_field} must be in range ({minimum} - {maximum})")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, date: datetime) -> bool:
+        day = date.day in self.days
+        weekday = (date.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return day or weekday
+        return day and weekday
+
+    def next_after(self, date: datetime) -> datetime:
+        """
+        Next time matching the expression, strictly after given time
+        :param date: time to start from
+        :return: next matching time
+        """
+        next_date = (date + timedelta(minutes=1)).replace(second=0, microsecond=0)
+        for _ in range(MAX_SEARCH_STEPS):
+            if next_date.month not in self.months:
+                next_date = (next_date.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(next_date):
+                next_date = next_date.replace(hour=0, minute=0) + timedelta(days=1)
+            elif next_date.hour not in self.hours:
+                next_date = next_date.replace(minute=0) + timedelta(hours=1)
+            elif next_date.minute not in self.minutes:
+                next_date += timedelta(minutes=1)
+            else:
+                return next_date
+        raise ValueError(f"Cron expression {self.expression} doesn't match any time")
@@ -0,0 +1,93 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from scheduling.cron import CronExpression
+from telemetry.logs import log_type
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Schedule:
+    name: str
+    interval: float | None = None
+    cron: CronExpression | None = None
+    jitter: float = 0.0
+
+    def next_due(self, previous_due: float, now: float) -> float:
+        """
+        Next due time on monotonic clock. Interval is added to previous due time (not to the end of previous run),
+        so runs don't drift. Missed runs (run took longer than interval) are skipped
+        :param previous_due: previous due time
+        :param now: current monotonic time
+        :return: next due time
+        """
+        if self.cron is not None:
+            wall_now = datetime.now()
+            return now + (self.cron.next_after(wall_now) - wall_now).total_seconds()
+        next_due = previous_due + self.interval
+        if next_due <= now:
+            next_due += self.interval * ((now - next_due) // self.interval + 1)
+        return next_due
+
+
+@dataclass(order=True)
+class ScheduledRun:
+    due: float
+    seq: int
+    schedule: Schedule = field(compare=False)
+
+
+class Scheduler:
+    """
+    Runs every schedule independently. Next due time of every schedule is kept in a heap, scheduler sleeps until
+    the earliest one and starts its run without waiting for runs of other schedules. Run of a schedule that is still
+    running is skipped
+    """
+
+    def __init__(self, schedules: list[Schedule], run: Callable[[str], Awaitable[None]],
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.schedules = schedules
+        self.run = run
+        self.clock = clock
+        self.running: dict[str, asyncio.Task] = dict()
+        self.seq = itertools.count()
+
+    async def _run(self, schedule: Schedule, delay: float) -> None:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await self.run(schedule.name)
+        except Exception as e:
+            logger.error(f"Scheduled run {schedule.name} failed! {e}")
+
+    async def run_forever(self) -> None:
+        now = self.clock()
+        heap = [ScheduledRun(now, next(self.seq), schedule) for schedule in self.schedules]
+        heapq.heapify(heap)
+        try:
+            while heap:
+                scheduled_run = heapq.heappop(heap)
+                schedule = scheduled_run.schedule
+                await asyncio.sleep(max(0.0, scheduled_run.due - self.clock()))
+                running = self.running.get(schedule.name)
+                if running is not None and not running.done():
+                    logger.warning(f"Scheduled run {schedule.name} still running, skipping this run")
+                else:
+                    # jitter only delays this run, next due time is not affected
+                    jitter = random.uniform(0, schedule.jitter) if schedule.jitter > 0 else 0.0
+                    self.running[schedule.name] = asyncio.create_task(self._run(schedule, jitter))
+                next_due = schedule.next_due(scheduled_run.due, self.clock())
+                logger.info("Next run of %s in %.2f seconds", schedule.name, next_due - self.clock(),
+                            extra=log_type("schedule"))
+                heapq.heappush(heap, ScheduledRun(next_due, next(self.seq), schedule))
+        finally:
+            for task in self.running.values():
+                task.cancel()
@@ -0,0 +1,127 @@
+import logging
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from config.configs import AppConfig
+from fetch.limiter import TokenBucket
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(threadName)s - %(message)s"
+# how often number of suppressed messages is logged
+SUPPRESSED_REPORT_SEC = 60
+logger = logging.getLogger(__name__)
+
+
+def log_type(name: str) -> dict:
+    """
+    Mark log message with its type, types can be sampled and rate limited in `logging` configuration
+    :param name: message type
+    :return: `extra` argument of logging call
+    """
+    return {"log_type": name}
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Sample and rate limit log messages by type (`log_type` extra). Warnings and errors are always logged.
+    Sample rate 0 or rate limit 0 mutes the type. Decision is stored on the record, so a record seen by several
+    handlers is sampled once. Number of suppressed messages by type is logged every `report_interval` seconds
+    """
+
+    def __init__(self, sample_rates: dict[str, float], rate_limits: dict[str, float],
+                 report_interval: float = SUPPRESSED_REPORT_SEC) -> None:
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.muted = {name for name, rate in rate_limits.items() if rate <= 0}
+        self.buckets = {name: TokenBucket(rate, max(1.0, rate)) for name, rate in rate_limits.items() if rate > 0}
+        self.report_interval = report_interval
+        self.reported_at = time.monotonic()
+        self.suppressed: dict[str, int] = dict()
+
+    def _sampled(self, name: str) -> bool:
+        if name in self.muted:
+            return False
+        sample_rate = self.sample_rates.get(name, 1.0)
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            return False
+        bucket = self.buckets.get(name)
+        return bucket is None or bucket.wait_time() == 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        name = getattr(record, "log_type", None)
+        if name is None or record.levelno >= logging.WARNING:
+            return True
+        sampled = getattr(record, "sampled", None)
+        if sampled is None:
+            sampled = record.sampled = self._sampled(name)
+            if not sampled:
+                self.suppressed[name] = self.suppressed.get(name, 0) + 1
+            self.report()
+        return sampled
+
+    def report(self) -> None:
+        """
+        Log and reset number of suppressed messages, when report interval elapsed
+        """
+        now = time.monotonic()
+        if self.suppressed and now - self.reported_at >= self.report_interval:
+            suppressed = self.suppressed
+            self.suppressed = dict()
+            self.reported_at = now
+            logger.warning(f"Log messages suppressed by sampling and rate limits: {suppressed}")
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that doesn't format the message on calling thread, formatting is done by the listener thread
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class TruncatingFormatter(logging.Formatter):
+    """
+    Formatter with size-capped messages
+    """
+
+    def __init__(self, fmt: str, max_length: int) -> None:
+        super().__init__(fmt)
+        self.max_length = max_length
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = record.message
+        if self.max_length > 0 and len(message) > self.max_length:
+            record.message = f"{message[:self.max_length]}... ({len(message)} characters)"
+        return super().formatMessage(record)
+
+
+def setup_logging(app_config: AppConfig) -> QueueListener | None:
+    """
+    Configure root logger. With `logging.queue` records are put to in-memory queue on the calling thread
+    and formatted and written to file and console by background listener thread, so event loop never waits
+    for disk or console
+    :param app_config: application config
+    :return: started listener (stop it on exit), None when logging is synchronous
+    """
+    formatter = TruncatingFormatter(LOG_FORMAT, app_config.logging_max_message_length)
+    handlers: list[logging.Handler] = [logging.FileHandler(app_config.logging_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    sampling_filter = SamplingFilter(app_config.logging_sampling, app_config.logging_rate_limits)
+    root = logging.getLogger()
+    root.setLevel(app_config.logging_level)
+    if not app_config.logging_queue:
+        for handler in handlers:
+            # same decision for both handlers, it is stored on the record
+            handler.addFilter(sampling_filter)
+            root.addHandler(handler)
+        return None
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(sampling_filter)
+    root.addHandler(queue_handler)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
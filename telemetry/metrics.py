@@ -0,0 +1,110 @@
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+# latency histogram buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _escape(label_value: str) -> str:
+    return label_value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    In-memory latency histograms and counters, labeled by source, stage,... Rendered in Prometheus text format
+    """
+
+    def __init__(self, prefix: str = "databox", buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: dict[str, dict[Labels, Histogram]] = dict()
+        self.counters: dict[str, dict[Labels, float]] = dict()
+
+    @classmethod
+    def _labels(cls, labels: dict[str, str]) -> Labels:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Add value to histogram
+        :param name: metric name (without prefix)
+        :param value: observed value, usually seconds
+        :param labels: metric labels
+        """
+        series = self.histograms.setdefault(name, dict())
+        key = self._labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Increment counter
+        :param name: metric name (without prefix)
+        :param value: increment
+        :param labels: metric labels
+        """
+        series = self.counters.setdefault(name, dict())
+        key = self._labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str):
+        """
+        Observe time of the block in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @classmethod
+    def _format_labels(cls, labels: Labels, extra: tuple[str, str] | None = None) -> str:
+        pairs = labels + (extra,) if extra is not None else labels
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> str:
+        """
+        :return: all metrics in Prometheus text exposition format
+        """
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full_name} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{full_name}{self._format_labels(labels)} {value:g}")
+        for name, series in sorted(self.histograms.items()):
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full_name} histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{full_name}_bucket{self._format_labels(labels, ('le', le))} {cumulative}")
+                lines.append(f"{full_name}_sum{self._format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{full_name}_count{self._format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,224 @@
+import asyncio
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+# allocation tracker of the profiled cycle, stages of the cycle record their allocations into it
+_allocation_tracker: "AllocationTracker | None" = None
+
+
+class StackSampler:
+    """
+    Sampling profiler: stack of one thread is sampled by background thread every `interval` seconds and counted
+    in collapsed format (`root;caller;function count`), which is flame graph input
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            functions = []
+            while frame is not None:
+                code = frame.f_code
+                functions.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if functions:
+                self.stacks[";".join(reversed(functions))] += 1
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as collapsed_file:
+            for stack, count in self.stacks.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+class AllocationTracker:
+    """
+    Allocation hot spots by stage: memory allocated (and not freed) by every source line while stage runs
+    """
+
+    def __init__(self, top: int) -> None:
+        self.top = top
+        self.stages: dict[str, Counter[str]] = dict()
+        self.counts: dict[str, Counter[str]] = dict()
+
+    @contextmanager
+    def track(self, stage: str) -> Iterator[None]:
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            stage_sizes = self.stages.setdefault(stage, Counter())
+            stage_counts = self.counts.setdefault(stage, Counter())
+            for statistic in after.compare_to(before, "lineno"):
+                if statistic.size_diff > 0:
+                    frame = statistic.traceback[0]
+                    line = f"{frame.filename}:{frame.lineno}"
+                    stage_sizes[line] += statistic.size_diff
+                    stage_counts[line] += statistic.count_diff
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as report_file:
+            for stage, stage_sizes in self.stages.items():
+                report_file.write(f"{stage}: {sum(stage_sizes.values()) / 1024:.1f} KiB\n")
+                for line, size in stage_sizes.most_common(self.top):
+                    report_file.write(f"  {size / 1024:10.1f} KiB {self.counts[stage][line]:8d} blocks  {line}\n")
+
+
+@contextmanager
+def track_allocations(stage: str) -> Iterator[None]:
+    """
+    Record allocations of synchronous stage (parse, derived metrics, push payload) while a cycle is profiled,
+    does nothing otherwise
+    :param stage: stage name
+    """
+    tracker = _allocation_tracker
+    if tracker is None:
+        yield
+    else:
+        with tracker.track(stage):
+            yield
+
+
+@dataclass
+class ProfiledCycle:
+    path_prefix: str
+    profile: cProfile.Profile | None = None
+    sampler: StackSampler | None = None
+    allocations: AllocationTracker | None = None
+    loop_debug: bool = False
+    slow_callback_duration: float = 0.1
+    start: float = field(default_factory=time.perf_counter)
+
+
+class Profiler:
+    """
+    Opt-in profiling of the next cycles (from config at start or on signal). Profiled cycle is recorded with cProfile
+    (`.pstats`), stack sampler of event loop thread (`.collapsed`) and tracemalloc allocations of parse, derived
+    metrics and push payload stages (`.allocations.txt`). Callbacks blocking the event loop longer than
+    `slow_callback` are logged by asyncio while cycle is profiled. Profilers are process wide, so one cycle is
+    profiled at a time and work of cycles running at the same time is included in it
+    """
+
+    def __init__(self, directory: str, cprofile: bool = True, sampling_interval: float = 0.005,
+                 trace_allocations: bool = True, slow_callback: float = 0.1, top_allocations: int = 25) -> None:
+        """
+        :param directory: output directory
+        :param cprofile: deterministic profile of all function calls
+        :param sampling_interval: stack sampling interval in seconds, 0 disables sampling
+        :param trace_allocations: record allocation hot spots
+        :param slow_callback: log event loop callbacks slower than this (seconds)
+        :param top_allocations: number of reported source lines per stage
+        """
+        self.directory = directory
+        self.cprofile = cprofile
+        self.sampling_interval = sampling_interval
+        self.trace_allocations = trace_allocations
+        self.slow_callback = slow_callback
+        self.top_allocations = top_allocations
+        self.remaining = 0
+        self.profiled = 0
+        self.active: ProfiledCycle | None = None
+
+    def request(self, cycles: int) -> None:
+        """
+        Profile next cycles
+        :param cycles: number of cycles
+        """
+        self.remaining = max(self.remaining, cycles)
+        logger.info(f"Profiling of next {self.remaining} cycles requested, output: {self.directory}")
+
+    @contextmanager
+    def cycle(self, name: str) -> Iterator[None]:
+        """
+        Profile the cycle when profiling was requested
+        :param name: cycle name (sources)
+        """
+        if self.remaining <= 0 or self.active is not None:
+            yield
+            return
+        self.remaining -= 1
+        self.active = self._start(name)
+        try:
+            yield
+        finally:
+            self._stop(self.active)
+            self.active = None
+
+    def _start(self, name: str) -> ProfiledCycle:
+        global _allocation_tracker
+        os.makedirs(self.directory, exist_ok=True)
+        self.profiled += 1
+        file_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.profiled}-{re.sub(r'[^A-Za-z0-9_.-]', '_', name)}"
+        profiled_cycle = ProfiledCycle(os.path.join(self.directory, file_name))
+        try:
+            loop = asyncio.get_running_loop()
+            profiled_cycle.loop_debug = loop.get_debug()
+            profiled_cycle.slow_callback_duration = loop.slow_callback_duration
+            loop.slow_callback_duration = self.slow_callback
+            loop.set_debug(True)
+        except RuntimeError:
+            pass
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            profiled_cycle.allocations = _allocation_tracker = AllocationTracker(self.top_allocations)
+        if self.sampling_interval > 0:
+            profiled_cycle.sampler = StackSampler(threading.get_ident(), self.sampling_interval)
+            profiled_cycle.sampler.start()
+        if self.cprofile:
+            profiled_cycle.profile = cProfile.Profile()
+            profiled_cycle.profile.enable()
+        return profiled_cycle
+
+    def _stop(self, profiled_cycle: ProfiledCycle) -> None:
+        global _allocation_tracker
+        if profiled_cycle.profile is not None:
+            profiled_cycle.profile.disable()
+        if profiled_cycle.sampler is not None:
+            profiled_cycle.sampler.stop()
+        if profiled_cycle.allocations is not None:
+            _allocation_tracker = None
+            tracemalloc.stop()
+        try:
+            loop = asyncio.get_running_loop()
+            loop.set_debug(profiled_cycle.loop_debug)
+            loop.slow_callback_duration = profiled_cycle.slow_callback_duration
+        except RuntimeError:
+            pass
+        path_prefix = profiled_cycle.path_prefix
+        try:
+            if profiled_cycle.profile is not None:
+                profiled_cycle.profile.dump_stats(f"{path_prefix}.pstats")
+            if profiled_cycle.sampler is not None:
+                profiled_cycle.sampler.write(f"{path_prefix}.collapsed")
+            if profiled_cycle.allocations is not None:
+                profiled_cycle.allocations.write(f"{path_prefix}.allocations.txt")
+        except OSError as e:
+            logger.error(f"Profile not written: {e}")
+            return
+        logger.info(f"Profile of cycle written to {path_prefix}.*, "
+                    f"cycle time: {time.perf_counter() - profiled_cycle.start:.3f} s")
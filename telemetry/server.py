@@ -0,0 +1,36 @@
+import logging
+
+from aiohttp import web
+
+from telemetry.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint exposing metrics registry in Prometheus text format on `/metrics`
+    """
+
+    def __init__(self, metrics: MetricsRegistry, host: str, port: int) -> None:
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.runner: web.AppRunner | None = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.metrics.render().encode(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Metrics endpoint started on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
@@ -0,0 +1,61 @@
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+from telemetry.metrics import MetricsRegistry
+
+# histogram of HTTP request stages (dns, connect, ttfb, body, json_loads, parse) by source
+FETCH_STAGE_SECONDS = "fetch_stage_seconds"
+# received response body bytes by source, after decompression (aiohttp passes decoded body to chunk hooks)
+FETCH_RECEIVED_BYTES = "fetch_received_bytes_total"
+
+
+def _source(trace_config_ctx: SimpleNamespace) -> str:
+    trace_request_ctx = trace_config_ctx.trace_request_ctx
+    return trace_request_ctx.get("source", "unknown") if trace_request_ctx else "unknown"
+
+
+def create_trace_config(metrics: MetricsRegistry) -> aiohttp.TraceConfig:
+    """
+    aiohttp trace hooks that record DNS, connect and time to first byte of every request of the session.
+    Request is labeled by `source` from `trace_request_ctx`
+    :param metrics: metrics registry
+    :return: trace config for client session
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, trace_config_ctx, params) -> None:
+        trace_config_ctx.request_start = time.perf_counter()
+
+    async def on_dns_resolvehost_start(session, trace_config_ctx, params) -> None:
+        trace_config_ctx.dns_start = time.perf_counter()
+
+    async def on_dns_resolvehost_end(session, trace_config_ctx, params) -> None:
+        metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - trace_config_ctx.dns_start,
+                        source=_source(trace_config_ctx), stage="dns")
+
+    async def on_connection_create_start(session, trace_config_ctx, params) -> None:
+        trace_config_ctx.connect_start = time.perf_counter()
+
+    async def on_connection_create_end(session, trace_config_ctx, params) -> None:
+        metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - trace_config_ctx.connect_start,
+                        source=_source(trace_config_ctx), stage="connect")
+
+    async def on_request_end(session, trace_config_ctx, params) -> None:
+        # response headers received
+        metrics.observe(FETCH_STAGE_SECONDS, time.perf_counter() - trace_config_ctx.request_start,
+                        source=_source(trace_config_ctx), stage="ttfb")
+
+    async def on_response_chunk_received(session, trace_config_ctx, params) -> None:
+        # called from `read()` only, streamed bodies are counted while they are read
+        metrics.increment(FETCH_RECEIVED_BYTES, len(params.chunk), source=_source(trace_config_ctx))
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_response_chunk_received.append(on_response_chunk_received)
+    return trace_config
@@ -0,0 +1,47 @@
+from collections.abc import Awaitable, Callable
+from unittest import IsolatedAsyncioTestCase
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from config.configs import RequestPost
+
+SISTAT_DATA_PATH = "/Data/{table}"
+DATABOX_DATA_PATH = "/data"
+
+
+class StubServerTestCase(IsolatedAsyncioTestCase):
+    """
+    Test case with local aiohttp server imitating SiStat `Data/{table}` or databox `/data` endpoint, test handles
+    requests with its own handler. Server is closed on cleanup
+    """
+
+    server: TestServer
+
+    async def start_server(self, handle_data: Callable[[web.Request], Awaitable[web.StreamResponse]],
+                           path: str = SISTAT_DATA_PATH) -> None:
+        """
+        Start server in `asyncSetUp`
+        :param handle_data: POST request handler
+        :param path: route of the handler
+        """
+        app = web.Application()
+        app.router.add_post(path, handle_data)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.addAsyncCleanup(self.server.close)
+
+    def url(self, path: str = "") -> str:
+        return str(self.server.make_url(path))
+
+    def table_url(self, table: str = "T") -> str:
+        return self.url(f"/Data/{table}.px")
+
+    def table_request(self, name: str = "table", table: str = "T", data: dict | None = None) -> RequestPost:
+        """
+        :param name: request and metric name
+        :param table: SiStat table
+        :param data: request body
+        :return: request of the table on the server
+        """
+        return RequestPost(name, self.table_url(table), data if data is not None else {}, name)
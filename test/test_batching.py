@@ -0,0 +1,82 @@
+import json
+import unittest
+from array import array
+from unittest import TestCase
+
+from aiohttp import web
+
+from config.configs import get_local_config
+from databox_main import push_to_databox
+from fetch.transport import Transport
+from push.databox_client import DataboxClient
+from push.batching import create_batches
+from response.response_init import ResponseUnit
+from test.stub_server import DATABOX_DATA_PATH, StubServerTestCase
+
+
+def create_response_unit(metric_key: str, length: int) -> ResponseUnit:
+    return ResponseUnit(metric_key, "B", array("q", [idx * 86400 for idx in range(length)]),
+                        array("d", [float(idx) for idx in range(length)]), "birth_rate", 200)
+
+
+class TestBatching(TestCase):
+
+    def test_max_points(self):
+        batches = create_batches([create_response_unit("a", 5), create_response_unit("b", 1),
+                                  create_response_unit("c", 0), create_response_unit("d", 3)], 4, 1024 * 1024)
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 1])
+        self.assertEqual(batches[1].metric_keys(), ["a", "b", "d"])
+        self.assertEqual([(s.response_unit.metric_key, s.start, s.end) for s in batches[1].slices],
+                         [("a", 4, 5), ("b", 0, 1), ("d", 0, 2)])
+        payload = json.loads(batches[1].payload())
+        self.assertEqual([item["key"] for item in payload], ["a", "b", "d", "d"])
+
+    def test_max_bytes(self):
+        response_unit = create_response_unit("a", 10)
+        item_size = len(response_unit.encoded_items()[0])
+        batches = create_batches([response_unit], 1000, 2 + 3 * (item_size + 2))
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 3, 1])
+        for batch in batches:
+            self.assertLessEqual(len(batch.payload()), 2 + 3 * (item_size + 2))
+        # data point bigger than max bytes gets its own batch
+        self.assertEqual([len(batch) for batch in create_batches([response_unit], 1000, 1)], [1] * 10)
+
+    def test_to_response_unit(self):
+        response_unit = create_response_unit("a", 5)
+        batches = create_batches([response_unit], 3, 1024 * 1024)
+        self.assertIs(create_batches([response_unit], 5, 1024 * 1024)[0].slices[0].to_response_unit(),
+                      response_unit)
+        self.assertEqual(list(batches[1].slices[0].to_response_unit().values), [3.0, 4.0])
+
+
+class TestPushBatches(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.pushed_keys = []
+
+        async def handle_data(request: web.Request) -> web.Response:
+            keys = [item["key"] for item in await request.json()]
+            self.pushed_keys.append(keys)
+            if "fail" in keys and len(self.pushed_keys) < 3:
+                return web.json_response({"status": "error"}, status=500)
+            return web.json_response({"status": "OK"})
+
+        await self.start_server(handle_data, DATABOX_DATA_PATH)
+        self.app_config = get_local_config()
+        self.app_config.databox_configuration.host = self.url()
+        self.app_config.databox_push_parallel = False
+        self.app_config.databox_retry.backoff_base_sec = 0.01
+
+    async def test_retry_failed_batch(self):
+        self.app_config.databox_batch_max_points = 2
+        async with Transport(self.app_config) as transport:
+            batches = await push_to_databox([create_response_unit("ok", 2), create_response_unit("fail", 2)],
+                                            DataboxClient(self.app_config, transport.session), self.app_config)
+        self.assertEqual([batch.status for batch in batches], [200, 200])
+        self.assertEqual([batch.attempts for batch in batches], [1, 2])
+        # successful batch is not pushed again
+        self.assertEqual(self.pushed_keys, [["ok", "ok"], ["fail", "fail"], ["fail", "fail"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import json
+import unittest
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from app_context import AppContext
+from benchmark.generator import encode, generate_cells, generate_dataset
+from benchmark.run import benchmark_config
+from benchmark.stubs import DataboxStub, SiStatStub, StubBehaviour
+from databox_main import one_time_send
+from response.response_init import ResponseInit
+
+
+class TestGenerator(TestCase):
+
+    def test_dataset(self):
+        dataset = generate_dataset([2, 3], 4, monthly=True, missing_ratio=0.5, seed=1)
+        self.assertEqual(dataset["size"], [2, 3, 4])
+        self.assertEqual(len(dataset["value"]), 24)
+        self.assertEqual(dataset, generate_dataset([2, 3], 4, monthly=True, missing_ratio=0.5, seed=1))
+        parsed = ResponseInit(json.loads(encode(dataset)), "bench", "bench", 200).parse()
+        self.assertEqual(len(parsed), len([value for value in dataset["value"] if value is not None]))
+        self.assertEqual(len(parsed.attributes), 6)
+
+    def test_cells(self):
+        dataset = generate_cells(10_000)
+        self.assertEqual(dataset["size"], [10, 10, 100])
+
+
+class TestEndToEnd(IsolatedAsyncioTestCase):
+
+    async def test_one_time_send(self):
+        tables = {f"T{idx}": encode(generate_cells(200, monthly=True, seed=idx)) for idx in range(3)}
+        async with SiStatStub(tables, StubBehaviour(throttle_rate=0.5), seed=3) as sistat, \
+                DataboxStub() as databox:
+            app_config = benchmark_config(sistat, databox, list(tables), unlimited=True)
+            app_config.fetch_retry.retries = 10
+            app_config.fetch_retry.backoff_base_sec = 0.001
+            app_config.fetch_circuit_failure_threshold = 0
+            async with AppContext(app_config) as app_context:
+                await one_time_send(app_context)
+        # throttled requests are retried and all data points are pushed
+        self.assertGreater(sistat.counters.throttled, 0)
+        self.assertEqual(databox.counters.points, 3 * 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
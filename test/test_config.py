@@ -1,7 +1,10 @@
+import os
+import shutil
+import tempfile
 import unittest
 from unittest import TestCase
 
-from config.configs import get_local_config
+from config.configs import get_local_config, load_snapshot, store_snapshot
 
 
 class TestConfig(TestCase):
@@ -9,13 +12,46 @@ class TestConfig(TestCase):
     def test_load_config(self):
         app_config = get_local_config()
         self.assertEqual(len(app_config.requests), 3)
-        self.assertTrue(bool(app_config.birth_death_ratio_metric_key))
+        self.assertTrue(all(derived_metric.metric_key for derived_metric in app_config.derived_metrics))
         self.assertTrue(app_config.request_timeout.connection_timeout > 0)
         self.assertTrue(app_config.request_timeout.request_timeout > 0)
         self.assertTrue(app_config.request_timeout.request_databox_total > 0)
         self.assertTrue(bool(app_config.databox_configuration.username))
         self.assertTrue(bool(app_config.databox_configuration.host))
 
+    def test_sources(self):
+        app_config = get_local_config()
+        self.assertEqual([request.name for request in app_config.requests], ["average_pay", "birth_rate", "death_rate"])
+        self.assertEqual(app_config.requests[0].time_dimension, "MESEC")
+        self.assertEqual(app_config.requests[0].unit, "EUR")
+        self.assertTrue(app_config.fetch_max_concurrency > 0)
+
+    def test_snapshot(self):
+        app_config = get_local_config()
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.yml")
+            shutil.copy(os.path.join(os.path.dirname(__file__), "..", "config", "config.yml"), config_path)
+            self.assertIsNone(load_snapshot(config_path))
+            store_snapshot(config_path, app_config)
+            snapshot = load_snapshot(config_path)
+            self.assertEqual(snapshot.requests, app_config.requests)
+            self.assertEqual(snapshot.fetch_limit, app_config.fetch_limit)
+            snapshot_path = config_path + ".snapshot"
+            self.assertEqual(os.stat(snapshot_path).st_mode & 0o777, 0o600)
+            # snapshot writable by others could run code when unpickled
+            os.chmod(snapshot_path, 0o666)
+            self.assertIsNone(load_snapshot(config_path))
+            os.chmod(snapshot_path, 0o600)
+            # changed config file invalidates snapshot
+            stat = os.stat(config_path)
+            os.utime(config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            self.assertIsNone(load_snapshot(config_path))
+
+    def test_lazy_databox_configuration(self):
+        app_config = get_local_config()
+        self.assertIsNone(app_config._databox_configuration)
+        self.assertIs(app_config.databox_configuration, app_config.databox_configuration)
+
 
 if __name__ == '__main__':
     unittest.main()
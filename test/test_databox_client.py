@@ -0,0 +1,74 @@
+import asyncio
+import time
+import unittest
+from array import array
+
+from aiohttp import web
+from config.configs import EndpointLimit, RetryPolicy, get_local_config
+from databox_main import push_to_databox
+from fetch.transport import Transport
+from push.databox_client import DataboxClient, DATABOX_ACCEPT
+from response.response_init import ResponseUnit
+from test.stub_server import DATABOX_DATA_PATH, StubServerTestCase
+
+PUSH_DELAY_SEC = 0.2
+
+
+class TestDataboxClient(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.requests.append((dict(request.headers), await request.json()))
+            value = self.requests[-1][1][0]["value"]
+            if value == -1:
+                return web.json_response({"status": "invalid"}, status=422)
+            if value == -2 and sum(body[0]["value"] == -2 for _, body in self.requests) == 1:
+                return web.json_response({"status": "busy"}, status=503, headers={"Retry-After": "0.3"})
+            await asyncio.sleep(PUSH_DELAY_SEC)
+            return web.json_response({"status": "OK"})
+
+        await self.start_server(handle_data, DATABOX_DATA_PATH)
+        self.app_config = get_local_config()
+        self.app_config.databox_configuration.host = self.url()
+        self.app_config.databox_limit = EndpointLimit(0, 1, 4, 4, 10)
+
+    async def test_data_post(self):
+        payload = b'[{"key": "metric_key", "value": 1.5, "unit": "EUR", "date": "2024-01-01T00:00:00"}]'
+        async with Transport(self.app_config) as transport:
+            databox_client = DataboxClient(self.app_config, transport.session)
+            self.assertEqual(await databox_client.data_post(payload), 200)
+        headers, body = self.requests[0]
+        self.assertEqual(headers["Accept"], DATABOX_ACCEPT)
+        self.assertTrue(headers["Authorization"].startswith("Basic "))
+        self.assertEqual(body, [{"key": "metric_key", "value": 1.5, "unit": "EUR", "date": "2024-01-01T00:00:00"}])
+
+    async def test_data_post_overlaps(self):
+        payload = b'[{"key": "metric_key", "value": 1.0}]'
+        start_time = time.monotonic()
+        async with Transport(self.app_config) as transport:
+            databox_client = DataboxClient(self.app_config, transport.session)
+            statuses = await asyncio.gather(*[databox_client.data_post(payload) for _ in range(4)])
+        self.assertEqual(statuses, [200] * 4)
+        # all four pushes run at once, so it takes about as long as a single push
+        self.assertLess(time.monotonic() - start_time, PUSH_DELAY_SEC * 2)
+
+    async def test_push_retries(self):
+        self.app_config.databox_retry = RetryPolicy(2, 0.01, 0.01, 60)
+        self.app_config.databox_batch_max_points = 1
+        response_unit = ResponseUnit("metric_key", None, array("q", [0, 0]), array("d", [-1.0, -2.0]), "metric_key",
+                                     200, array("I", [0, 1]), [{}, {"x": "1"}])
+        async with Transport(self.app_config) as transport:
+            databox_client = DataboxClient(self.app_config, transport.session)
+            start_time = time.monotonic()
+            batches = await push_to_databox([response_unit], databox_client, self.app_config)
+        self.assertEqual([batch.status for batch in batches], [422, 200])
+        # invalid batch is not pushed again, throttled one after Retry-After (rate is not limited)
+        self.assertEqual([body[0]["value"] for _, body in self.requests].count(-1), 1)
+        self.assertEqual(len(self.requests), 3)
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
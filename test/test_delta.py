@@ -0,0 +1,68 @@
+import unittest
+from array import array
+from unittest import TestCase
+
+from push.delta import DeltaTracker
+from response.response_init import ResponseUnit
+from util.helper import create_date_from_year, date_to_epoch
+
+
+def create_response_unit(values: list[float]) -> ResponseUnit:
+    dates = array("q", [date_to_epoch(create_date_from_year(2000 + idx)) for idx in range(len(values))])
+    return ResponseUnit("metric_key", "B", dates, array("d", values), "birth_rate", 200)
+
+
+class TestDelta(TestCase):
+
+    def test_changed_only(self):
+        delta_tracker = DeltaTracker()
+        first = delta_tracker.changed(create_response_unit([1.0, 2.0, 3.0]))
+        self.assertEqual(len(first), 3)
+        delta_tracker.commit(first)
+        # one value changed, one new year
+        second = delta_tracker.changed(create_response_unit([1.0, 2.5, 3.0, 4.0]))
+        self.assertEqual(list(second.values), [2.5, 4.0])
+        self.assertEqual([unit.var_date for unit in second.push_data()], ["2001-01-01T00:00:00", "2003-01-01T00:00:00"])
+        self.assertEqual(second.data_type, "birth_rate")
+
+    def test_attributes(self):
+        delta_tracker = DeltaTracker()
+        response_unit = create_response_unit([1.0, 1.0])
+        response_unit.series = array("I", [0, 1])
+        response_unit.attributes = [{"REGIJA": "Pomurska"}, {"REGIJA": "Podravska"}]
+        delta_tracker.commit(response_unit.take([0]))
+        # same date and value, but different series
+        self.assertEqual(len(delta_tracker.changed(response_unit)), 1)
+
+    def test_not_committed_is_pushed_again(self):
+        delta_tracker = DeltaTracker()
+        delta_tracker.changed(create_response_unit([1.0, 2.0]))
+        self.assertEqual(len(delta_tracker.changed(create_response_unit([1.0, 2.0]))), 2)
+
+    def test_resync(self):
+        delta_tracker = DeltaTracker(full_resync_cycles=2)
+        delta_tracker.next_cycle(["metric_key"])
+        delta_tracker.commit(create_response_unit([1.0, 2.0]))
+        delta_tracker.next_cycle(["metric_key"])
+        self.assertEqual(len(delta_tracker.changed(create_response_unit([1.0, 2.0]))), 0)
+        # third cycle forces full resync
+        delta_tracker.next_cycle(["metric_key"])
+        self.assertEqual(len(delta_tracker.changed(create_response_unit([1.0, 2.0]))), 2)
+        delta_tracker.commit(create_response_unit([1.0, 2.0]))
+        delta_tracker.resync()
+        self.assertEqual(len(delta_tracker.changed(create_response_unit([1.0, 2.0]))), 2)
+
+    def test_resync_per_metric(self):
+        delta_tracker = DeltaTracker(full_resync_cycles=2)
+        other = create_response_unit([5.0])
+        other.metric_key = "other"
+        delta_tracker.commit(create_response_unit([1.0, 2.0]))
+        delta_tracker.commit(other)
+        # cycles of other metric (scheduled on its own) don't count for metric_key
+        for _ in range(3):
+            delta_tracker.next_cycle(["other"])
+        self.assertEqual(len(delta_tracker.changed(create_response_unit([1.0, 2.0]))), 0)
+        self.assertEqual(len(delta_tracker.changed(other)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from array import array
+from unittest import TestCase
+
+from config.configs import DerivedMetric, get_local_config
+from response.derived import DerivedEngine
+from response.response_init import ResponseUnit
+from util.helper import create_date_from_year, create_date_from_month_year, date_to_epoch
+
+
+def create_yearly(data_type: str, first_year: int, values: list[float]) -> ResponseUnit:
+    dates = array("q", [date_to_epoch(create_date_from_year(first_year + idx)) for idx in range(len(values))])
+    return ResponseUnit(data_type, None, dates, array("d", values), data_type, 200)
+
+
+class TestDerived(TestCase):
+
+    def test_difference_misaligned(self):
+        engine = DerivedEngine([DerivedMetric("ratio", "ratio_key", "difference", ["birth", "death"], "Rt")])
+        # birth rate has one more year and death rate one year earlier
+        births = create_yearly("birth", 2000, [10.0, 20.0, 30.0])
+        deaths = create_yearly("death", 1999, [1.0, 2.0, 3.0])
+        result = engine.evaluate([births, deaths])[0]
+        self.assertEqual(result.metric_key, "ratio_key")
+        self.assertEqual(result.data_type, "ratio")
+        self.assertEqual(result.unit, "Rt")
+        self.assertEqual(list(result.values), [8.0, 17.0])
+        self.assertEqual(list(result.dates), list(births.dates[:2]))
+
+    def test_ratio(self):
+        engine = DerivedEngine([DerivedMetric("r", "r", "ratio", ["a", "b"])])
+        result = engine.evaluate([create_yearly("a", 2000, [10.0, 20.0]), create_yearly("b", 2000, [2.0, 0.0])])[0]
+        self.assertEqual(list(result.values), [5.0])
+
+    def test_rolling_average(self):
+        engine = DerivedEngine([DerivedMetric("avg", "avg", "rolling_average", ["a"], window=3)])
+        result = engine.evaluate([create_yearly("a", 2000, [1.0, 2.0, 3.0, 4.0, 8.0])])[0]
+        self.assertEqual(list(result.values), [2.0, 3.0, 5.0])
+
+    def test_yoy_change(self):
+        engine = DerivedEngine([DerivedMetric("yoy", "yoy", "yoy_change", ["pay"])])
+        dates = array("q", [date_to_epoch(create_date_from_month_year(year, month))
+                            for year, month in [(2023, 1), (2023, 2), (2024, 1), (2024, 2)]])
+        pay = ResponseUnit("pay", "EUR", dates, array("d", [100.0, 200.0, 110.0, 150.0]), "pay", 200)
+        result = engine.evaluate([pay])[0]
+        self.assertEqual([round(value, 6) for value in result.values], [10.0, -25.0])
+
+    def test_dependency_order(self):
+        # derived metric of derived metric, declared before its input
+        engine = DerivedEngine([DerivedMetric("avg", "avg", "rolling_average", ["diff"], window=2),
+                                DerivedMetric("diff", "diff", "difference", ["a", "b"])])
+        results = engine.evaluate([create_yearly("a", 2000, [3.0, 5.0]), create_yearly("b", 2000, [1.0, 1.0])])
+        self.assertEqual([result.data_type for result in results], ["diff", "avg"])
+        self.assertEqual(list(results[1].values), [3.0])
+
+    def test_dependents(self):
+        engine = DerivedEngine([DerivedMetric("avg", "avg", "rolling_average", ["diff"], window=2),
+                                DerivedMetric("diff", "diff", "difference", ["a", "b"]),
+                                DerivedMetric("c_avg", "c_avg", "rolling_average", ["c"])])
+        self.assertEqual(engine.dependents({"a"}), {"diff", "avg"})
+        self.assertEqual(engine.dependents({"c"}), {"c_avg"})
+        self.assertEqual(engine.dependents({"d"}), set())
+
+    def test_circular_dependency(self):
+        with self.assertRaises(ValueError):
+            DerivedEngine([DerivedMetric("a", "a", "rolling_average", ["b"]),
+                           DerivedMetric("b", "b", "rolling_average", ["a"])])
+        with self.assertRaises(ValueError):
+            DerivedEngine([DerivedMetric("a", "a", "median", ["b"])])
+
+    def test_recalculate_on_change(self):
+        engine = DerivedEngine([DerivedMetric("diff", "diff", "difference", ["a", "b"])])
+        first = engine.evaluate([create_yearly("a", 2000, [3.0]), create_yearly("b", 2000, [1.0])])[0]
+        second = engine.evaluate([create_yearly("a", 2000, [3.0]), create_yearly("b", 2000, [1.0])])[0]
+        self.assertIs(first, second)
+        third = engine.evaluate([create_yearly("a", 2000, [4.0]), create_yearly("b", 2000, [1.0])])[0]
+        self.assertEqual(list(third.values), [3.0])
+
+    def test_missing_input(self):
+        engine = DerivedEngine([DerivedMetric("diff", "diff", "difference", ["a", "b"])])
+        self.assertEqual(engine.evaluate([create_yearly("a", 2000, [3.0]), create_yearly("b", 2000, [])]), [])
+
+    def test_config(self):
+        app_config = get_local_config()
+        self.assertEqual(len(DerivedEngine(app_config.derived_metrics).derived_metrics), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,7 @@
 import unittest
 from unittest import TestCase
 
-from config.configs import RequestType
-from util.helper import create_date_from_year, create_date_from_month_year, from_str_to_enum
+from util.helper import create_date_from_year, create_date_from_month_year, create_date_from_period
 
 
 class TestHelper(TestCase):
@@ -31,18 +30,19 @@ class TestHelper(TestCase):
             self.assertEqual(create_date_from_month_year(2000, 13), "2000-02-01T00:00:00")
             self.assertEqual(create_date_from_month_year(2055, -1), "2055-03-01T00:00:00")
 
-    def test_from_str_to_enum(self):
-        self.assertEqual(from_str_to_enum(RequestType, "average_PAY"), RequestType.AVERAGE_PAY)
-        self.assertEqual(from_str_to_enum(RequestType, "    birth_rate"), RequestType.BIRTH_RATE)
-        self.assertEqual(from_str_to_enum(RequestType, "DEATH_rate "), RequestType.DEATH_RATE)
-        self.assertEqual(from_str_to_enum(RequestType, "  BIRTH_death_rATIO "), RequestType.BIRTH_DEATH_RATIO)
-
-    def test_from_str_to_enum_fail(self):
-        with self.assertRaises(NotImplementedError):
-            from_str_to_enum(RequestType, "average_PAY_")
-            from_str_to_enum(RequestType, "    birth_rate1")
-            from_str_to_enum(RequestType, " ")
-            from_str_to_enum(RequestType, "  BIRTH_death_rATeO ")
+    def test_create_date_from_period(self):
+        self.assertEqual(create_date_from_period("1954"), "1954-01-01T00:00:00")
+        self.assertEqual(create_date_from_period("2006M01"), "2006-01-01T00:00:00")
+        self.assertEqual(create_date_from_period("2024M12"), "2024-12-01T00:00:00")
+        self.assertEqual(create_date_from_period("2024Q3"), "2024-07-01T00:00:00")
+
+    def test_create_date_from_period_fail(self):
+        with self.assertRaises(ValueError):
+            create_date_from_period("2024M13")
+        with self.assertRaises(ValueError):
+            create_date_from_period("2024Q5")
+        with self.assertRaises(ValueError):
+            create_date_from_period("24M1")
 
 
 if __name__ == '__main__':
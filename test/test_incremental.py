@@ -0,0 +1,127 @@
+import json
+import unittest
+from datetime import date
+from unittest import TestCase
+
+from aiohttp import web
+
+from config.configs import RequestPost, get_local_config
+from databox_main import get_all_metrics
+from fetch.incremental import IncrementalFetch
+from fetch.transport import Transport
+from response.registry import create_response
+from response.response_init import ResponseUnit
+from test.stub_server import StubServerTestCase
+
+REQUEST_POST = RequestPost("region_births", "url", {"query": [{"code": "MERITVE", "selection": {
+    "filter": "item", "values": [0]}}]}, "region_births", "LETO", "N")
+
+
+def region_births(values: dict[str, list[float]]) -> dict:
+    """
+    json-stat2 dataset of two regions, values by year
+    """
+    years = list(values.keys())
+    return {"class": "dataset", "id": ["REGIJA", "LETO"], "size": [2, len(years)],
+            "dimension": {"REGIJA": {"category": {"index": {"1": 0, "2": 1},
+                                                  "label": {"1": "Pomurska", "2": "Podravska"}}},
+                          "LETO": {"category": {"index": {year: idx for idx, year in enumerate(years)}}}},
+            "value": [values[year][region] for region in range(2) for year in years],
+            "role": {"time": ["LETO"]}, "version": "2.0"}
+
+
+def parse(values: dict[str, list[float]]) -> ResponseUnit:
+    return create_response(region_births(values), REQUEST_POST, 200).parse()
+
+
+class TestIncrementalFetch(TestCase):
+
+    def test_query(self):
+        incremental = IncrementalFetch(overlap=1, today=lambda: date(2025, 10, 18))
+        # full history on first fetch
+        self.assertIs(incremental.query(REQUEST_POST, "LETO"), REQUEST_POST)
+        incremental.merge(REQUEST_POST, parse({"2022": [1, 2], "2023": [3, 4]}))
+        query_post = incremental.query(REQUEST_POST, "LETO")
+        # 2024 and 2025 are new, 2023 is fetched again
+        self.assertEqual(query_post.data["query"][-1],
+                         {"code": "LETO", "selection": {"filter": "top", "values": ["3"]}})
+        self.assertEqual(len(REQUEST_POST.data["query"]), 1)
+        # source without known time dimension is always fetched in full
+        self.assertIs(incremental.query(REQUEST_POST, None), REQUEST_POST)
+        incremental.backfill()
+        self.assertIs(incremental.query(REQUEST_POST, "LETO"), REQUEST_POST)
+
+    def test_monthly_periods(self):
+        incremental = IncrementalFetch(overlap=2, today=lambda: date(2024, 3, 5))
+        request_post = RequestPost("pay", "url", {"query": []}, "pay", "MESEC")
+        dataset = {"id": ["MESEC"], "size": [3],
+                   "dimension": {"MESEC": {"category": {"index": ["2023M10", "2023M11", "2023M12"]}}},
+                   "value": [1, 2, 3]}
+        incremental.merge(request_post, create_response(dataset, request_post, 200).parse())
+        selection = incremental.query(request_post, "MESEC").data["query"][-1]["selection"]
+        self.assertEqual(selection["values"], ["5"])
+
+    def test_merge(self):
+        incremental = IncrementalFetch()
+        stored = incremental.merge(REQUEST_POST, parse({"2021": [1, 2], "2022": [3, 4], "2023": [5, 6]}))
+        # unchanged overlap keeps stored unit
+        self.assertIs(incremental.merge(REQUEST_POST, parse({"2022": [3, 4], "2023": [5, 6]})), stored)
+        # revised 2023 and new 2024
+        merged = incremental.merge(REQUEST_POST, parse({"2023": [7, 6], "2024": [8, 9]}))
+        self.assertEqual(list(merged.values), [1, 3, 7, 8, 2, 4, 6, 9])
+        self.assertEqual([merged.attributes[idx]["REGIJA"] for idx in merged.series],
+                         ["Pomurska"] * 4 + ["Podravska"] * 4)
+        self.assertEqual(list(merged.dates[:4]), list(merged.dates[4:]))
+        self.assertIs(incremental.latest("region_births"), merged)
+
+    def test_backfill_cycles(self):
+        incremental = IncrementalFetch(backfill_cycles=2, today=lambda: date(2024, 1, 1))
+        incremental.merge(REQUEST_POST, parse({"2022": [1, 2], "2023": [3, 4]}))
+        for _ in range(2):
+            self.assertIsNot(incremental.query(REQUEST_POST, "LETO"), REQUEST_POST)
+            incremental.merge(REQUEST_POST, parse({"2023": [3, 4]}))
+        self.assertIs(incremental.query(REQUEST_POST, "LETO"), REQUEST_POST)
+
+    def test_rejected_query(self):
+        incremental = IncrementalFetch()
+        incremental.merge(REQUEST_POST, parse({"2022": [1, 2], "2023": [3, 4]}))
+        failed = ResponseUnit.empty("region_births", 400)
+        self.assertIs(incremental.merge(REQUEST_POST, failed), failed)
+        self.assertIsNone(incremental.latest("region_births"))
+
+
+class TestIncrementalRequests(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.table = {"2021": [1, 2], "2022": [3, 4], "2023": [5, 6]}
+        self.queries = []
+
+        async def handle_data(request: web.Request) -> web.Response:
+            query = (await request.json())["query"]
+            self.queries.append(query)
+            years = list(self.table.keys())
+            for selection in query:
+                if selection["code"] == "LETO" and selection["selection"]["filter"] == "top":
+                    years = years[-int(selection["selection"]["values"][0]):]
+            dataset = region_births({year: self.table[year] for year in years})
+            return web.Response(text=json.dumps(dataset), content_type="application/json")
+
+        await self.start_server(handle_data)
+        self.app_config = get_local_config()
+        self.app_config.requests = [RequestPost("region_births", self.table_url(),
+                                                REQUEST_POST.data, "region_births", "LETO", "N")]
+
+    async def test_incremental_fetch(self):
+        incremental = IncrementalFetch(overlap=1, today=lambda: date(2024, 6, 1))
+        async with Transport(self.app_config) as transport:
+            results = await get_all_metrics(self.app_config, transport.session, incremental=incremental)
+            self.assertEqual(len(results[0]), 6)
+            self.table["2024"] = [7, 8]
+            results = await get_all_metrics(self.app_config, transport.session, incremental=incremental)
+        self.assertEqual(list(results[0].values), [1, 3, 5, 7, 2, 4, 6, 8])
+        self.assertEqual(len(self.queries[0]), 1)
+        self.assertEqual(self.queries[1][-1], {"code": "LETO", "selection": {"filter": "top", "values": ["2"]}})
+
+
+if __name__ == '__main__':
+    unittest.main()
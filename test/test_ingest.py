@@ -0,0 +1,183 @@
+import asyncio
+import json
+import unittest
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+import aiohttp
+
+from app_context import AppContext
+from benchmark.stubs import DataboxStub
+from config.configs import get_local_config
+from databox_main import ingest_events
+from ingest.batcher import MicroBatcher
+from ingest.events import DataPoint, parse_points, to_response_units
+from ingest.sources import EventSource, MemoryBroker, PubSubSource, WebhookSource, create_event_source
+from util.helper import date_to_epoch
+
+
+class TestEvents(TestCase):
+
+    def test_parse_points(self):
+        points = parse_points(json.dumps([
+            {"key": "pay", "value": 10, "date": "2024-01-01T00:00:00", "unit": "EUR"},
+            {"key": "pay", "value": 11.5, "date": "2024-01-01T01:00:00+01:00",
+             "attributes": [{"key": "REGIJA", "value": "Pomurska"}]}]))
+        self.assertEqual(points[0], DataPoint("pay", 10.0, date_to_epoch("2024-01-01T00:00:00"), "EUR"))
+        # timezone aware dates are converted to UTC
+        self.assertEqual(points[1].date, points[0].date)
+        self.assertEqual(points[1].attributes, {"REGIJA": "Pomurska"})
+        self.assertEqual(len(parse_points('{"key": "pay", "value": 1}')), 1)
+        invalid = ["not json", '{"value": 1}', '{"key": "pay", "value": "1"}', "1", '{"key": "pay", "value": NaN}',
+                   '{"key": "pay", "value": Infinity}', '{"key": "pay", "value": 1e400}',
+                   '{"key": "pay", "value": 1, "unit": 5}', '{"key": "pay", "value": 1, "attributes": [{"k": 1}]}',
+                   '{"key": "pay", "value": 1, "attributes": "REGIJA"}', '{"key": "pay", "value": 1, "date": 5}']
+        for message in invalid:
+            with self.assertRaises(ValueError):
+                parse_points(message)
+
+    def test_response_units(self):
+        units = to_response_units([DataPoint("a", 1.0, 0), DataPoint("b", 2.0, 0, "N"),
+                                   DataPoint("a", 3.0, 60, attributes={"x": "1"}), DataPoint("a", 4.0, 120)])
+        self.assertEqual([(unit.metric_key, list(unit.values)) for unit in units], [("a", [1.0, 3.0, 4.0]),
+                                                                                   ("b", [2.0])])
+        self.assertEqual(list(units[0].series), [0, 1, 0])
+        self.assertEqual(units[0].attributes, [{}, {"x": "1"}])
+        self.assertEqual(units[1].unit, "N")
+
+
+class TestMicroBatcher(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.batches = []
+
+        async def forward(points: list[DataPoint]) -> None:
+            self.batches.append([point.value for point in points])
+
+        self.forward = forward
+
+    async def test_size_and_window(self):
+        batcher = MicroBatcher(self.forward, 2, 0.05, 10)
+        task = asyncio.create_task(batcher.run())
+        batcher.add([DataPoint("a", 1.0, 0), DataPoint("a", 2.0, 0), DataPoint("a", 3.0, 0)])
+        await asyncio.sleep(0.01)
+        # full batch is forwarded at once
+        self.assertEqual(self.batches, [[1.0, 2.0]])
+        await asyncio.sleep(0.1)
+        # rest after window
+        self.assertEqual(self.batches, [[1.0, 2.0], [3.0]])
+        batcher.stop()
+        await task
+
+    async def test_full_and_stop(self):
+        batcher = MicroBatcher(self.forward, 100, 60, 2)
+        task = asyncio.create_task(batcher.run())
+        self.assertTrue(batcher.add([DataPoint("a", 1.0, 0)]))
+        self.assertFalse(batcher.add([DataPoint("a", 2.0, 0), DataPoint("a", 3.0, 0)]))
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.batches, [])
+        # pending data points are forwarded on stop
+        batcher.stop()
+        await task
+        self.assertEqual(self.batches, [[1.0]])
+
+
+class TestSources(IsolatedAsyncioTestCase):
+
+    async def test_webhook(self):
+        accepted = []
+
+        def accept(points: list[DataPoint]) -> bool:
+            if len(accepted) >= 3:
+                return False
+            accepted.extend(points)
+            return True
+
+        source = WebhookSource("127.0.0.1", 0, "/events")
+        await source.start(accept)
+        url = f"http://127.0.0.1:{source.port}/events"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, data='[{"key": "a", "value": 1}, {"key": "a", "value": 2}]') as response:
+                    self.assertEqual(response.status, 202)
+                    self.assertEqual(await response.json(), {"accepted": 2})
+                async with session.post(url, data="{") as response:
+                    self.assertEqual(response.status, 400)
+                async with session.ws_connect(f"{url}/ws") as websocket:
+                    await websocket.send_str('{"key": "b", "value": 3}')
+                    await websocket.send_str("[1]")
+                    self.assertIn("error", json.loads(await websocket.receive_str()))
+                async with session.post(url, data='{"key": "a", "value": 4}') as response:
+                    # batcher full
+                    self.assertEqual(response.status, 503)
+        finally:
+            await source.stop()
+        self.assertEqual([point.key for point in accepted], ["a", "a", "b"])
+
+    async def test_event_larger_than_batcher(self):
+        batcher = MicroBatcher(lambda points: asyncio.sleep(0), 10, 0.05, 2)
+        event = json.dumps([{"key": "a", "value": value} for value in range(3)])
+        source = WebhookSource("127.0.0.1", 0, "/events")
+        await source.start(batcher.add)
+        url = f"http://127.0.0.1:{source.port}/events"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, data=event) as response:
+                    # not 503, retry would never succeed
+                    self.assertEqual(response.status, 413)
+                async with session.ws_connect(f"{url}/ws") as websocket:
+                    await websocket.send_str(event)
+                    self.assertIn("error", json.loads(await asyncio.wait_for(websocket.receive_str(), 1)))
+        finally:
+            await source.stop()
+        # pub/sub subscription skips the event and goes on
+        broker = MemoryBroker()
+        source = PubSubSource(broker.subscribe)
+        await source.start(batcher.add)
+        await asyncio.sleep(0)
+        broker.publish(event)
+        broker.publish('{"key": "b", "value": 1}')
+        await asyncio.sleep(0.01)
+        await source.stop()
+        self.assertEqual([point.key for point in batcher.pending], ["b"])
+
+    async def test_create_event_source(self):
+        with self.assertRaises(TypeError):
+            EventSource()
+        app_config = get_local_config()
+        app_config.ingest_adapter = "memory"
+        # memory adapter without broker would never receive anything
+        with self.assertRaises(ValueError):
+            create_event_source(app_config)
+        self.assertIsInstance(create_event_source(app_config, MemoryBroker()), EventSource)
+
+
+class TestIngestEvents(IsolatedAsyncioTestCase):
+
+    async def test_memory_adapter(self):
+        broker = MemoryBroker()
+        async with DataboxStub() as databox:
+            app_config = get_local_config()
+            app_config.databox_configuration.host = databox.url("")
+            app_config.push_queue_enabled = False
+            app_config.series_snapshot_enabled = False
+            app_config.ingest_adapter = "memory"
+            app_config.ingest_batch_max_points = 3
+            app_config.ingest_batch_window = 0.02
+            async with AppContext(app_config) as app_context:
+                task = asyncio.create_task(ingest_events(app_context, broker))
+                await asyncio.sleep(0.01)
+                broker.publish('[{"key": "a", "value": 1}, {"key": "a", "value": 2}, {"key": "b", "value": 3}]')
+                broker.publish('{"key": "a", "value": 4, "date": "2024-01-01T00:00:00"}')
+                for _ in range(100):
+                    if databox.counters.points == 4:
+                        break
+                    await asyncio.sleep(0.01)
+                task.cancel()
+                await task
+        # one full batch and one after batch window
+        self.assertEqual(databox.counters.points, 4)
+        self.assertEqual(databox.counters.requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
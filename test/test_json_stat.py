@@ -0,0 +1,68 @@
+import math
+import unittest
+from unittest import TestCase
+
+from response.average_pay import AveragePay
+from response.json_stat import decode
+from util.helper import epoch_to_date
+
+# 2 regions x 3 months x 1 measure
+REGION_PAY = {"class": "dataset", "id": ["REGIJA", "MESEC", "PLAČE"], "size": [2, 3, 1],
+              "dimension": {"REGIJA": {"category": {"index": {"1": 0, "2": 1},
+                                                    "label": {"1": "Pomurska", "2": "Podravska"}}},
+                            "MESEC": {"category": {"index": ["2024M01", "2024M02", "2024M03"]}},
+                            "PLAČE": {"category": {"label": {"2": "Neto plača"}}}},
+              "value": [1.0, 2.0, None, 4.0, 5.0, 6.0], "role": {"time": ["MESEC"]}, "version": "2.0"}
+
+
+class TestJsonStat(TestCase):
+
+    def test_decode(self):
+        cube = decode(REGION_PAY)
+        self.assertEqual(cube.time_dimension, "MESEC")
+        self.assertEqual(cube.strides, [3, 1, 1])
+        self.assertEqual(cube.categories["MESEC"], ["2024M01", "2024M02", "2024M03"])
+        self.assertEqual(cube.labels["REGIJA"], ["Pomurska", "Podravska"])
+        self.assertTrue(math.isnan(cube.values[2]))
+
+    def test_series(self):
+        series = list(decode(REGION_PAY).series())
+        self.assertEqual(len(series), 2)
+        self.assertEqual(series[1].attributes, {"REGIJA": "Podravska"})
+        self.assertEqual([epoch_to_date(date) for date in series[1].dates],
+                         ["2024-01-01T00:00:00", "2024-02-01T00:00:00", "2024-03-01T00:00:00"])
+        self.assertEqual(list(series[1].values), [4.0, 5.0, 6.0])
+
+    def test_time_dimension_not_last(self):
+        # time dimension changes slowest
+        raw_response = dict(REGION_PAY, id=["MESEC", "REGIJA", "PLAČE"], size=[3, 2, 1])
+        series = list(decode(raw_response).series())
+        self.assertEqual(series[0].values[0], 1.0)
+        self.assertEqual(series[0].values[2], 5.0)
+        self.assertEqual(list(series[1].values), [2.0, 4.0, 6.0])
+
+    def test_sparse_values(self):
+        raw_response = dict(REGION_PAY, value={"0": 1.0, "5": 6.0})
+        values = decode(raw_response).values
+        self.assertEqual(values[0], 1.0)
+        self.assertEqual(values[5], 6.0)
+        self.assertTrue(math.isnan(values[3]))
+
+    def test_wrong_size(self):
+        with self.assertRaises(AssertionError):
+            decode(dict(REGION_PAY, value=[1.0]))
+
+    def test_parse_attributes(self):
+        result = AveragePay(REGION_PAY, "average_pay", "metric_key", 200).parse()
+        # missing value is skipped
+        push_data = result.push_data()
+        self.assertEqual(len(push_data), 5)
+        self.assertEqual(push_data[0].attributes[0].key, "REGIJA")
+        self.assertEqual(push_data[0].attributes[0].value, "Pomurska")
+        self.assertEqual(push_data[0].unit, "EUR")
+        self.assertEqual(push_data[2].var_date, "2024-01-01T00:00:00")
+        self.assertEqual(push_data[2].attributes[0].value, "Podravska")
+
+
+if __name__ == '__main__':
+    unittest.main()
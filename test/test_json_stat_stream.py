@@ -0,0 +1,105 @@
+import json
+import math
+import unittest
+from array import array
+from unittest import TestCase, mock
+
+from aiohttp import web
+
+from benchmark.generator import encode, generate_dataset
+from config.configs import get_local_config
+from databox_main import get_all_metrics
+from fetch.response_cache import ResponseCache
+from fetch.transport import Transport
+from response.json_stat_stream import JsonStatStreamParser
+from test.stub_server import StubServerTestCase
+
+
+def parse_in_chunks(body: bytes, chunk_size: int) -> dict:
+    parser = JsonStatStreamParser()
+    for start in range(0, len(body), chunk_size):
+        parser.feed(body[start:start + chunk_size])
+    return parser.close()
+
+
+class TestJsonStatStream(TestCase):
+
+    def test_chunks(self):
+        dataset = generate_dataset([2, 3], 5, monthly=True, missing_ratio=0.3, seed=4)
+        dataset["status"] = {"3": "z"}
+        dataset["extension"] = {"note": 'escaped \\" quote ]}, brackets', "nested": [1, {"a": "š"}]}
+        body = encode(dataset)
+        expected = json.loads(body)
+        del expected["status"]
+        for chunk_size in [1, 2, 3, 7, 64, len(body)]:
+            result = parse_in_chunks(body, chunk_size)
+            self.assertIsInstance(result["value"], array)
+            self.assertEqual([None if math.isnan(value) else value for value in result.pop("value")],
+                             expected["value"])
+            self.assertEqual(result, {key: value for key, value in expected.items() if key != "value"})
+
+    def test_sparse_values(self):
+        body = b'{"id": ["LETO"], "size": [3], "value": {"0": 1.5, "2": -3e2}, "role": {"time": ["LETO"]}}'
+        self.assertEqual(parse_in_chunks(body, 4)["value"], {"0": 1.5, "2": -300.0})
+
+    def test_stop_member(self):
+        parser = JsonStatStreamParser(stop_member=("updated", "2024-01-01"))
+        parser.feed(b'{"updated": "2024-01-01", "value": [1, 2')
+        self.assertTrue(parser.stopped)
+        self.assertEqual(len(parser.values), 0)
+        parser = JsonStatStreamParser(stop_member=("updated", "2023-01-01"))
+        parser.feed(b'{"updated": "2024-01-01", "value": [1, 2]}')
+        self.assertFalse(parser.stopped)
+        self.assertEqual(list(parser.close()["value"]), [1.0, 2.0])
+
+    def test_incomplete(self):
+        parser = JsonStatStreamParser()
+        parser.feed(b'{"value": [1, 2')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+
+class TestStreamingFetch(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.body = encode(generate_dataset([3, 4], 30, missing_ratio=0.1, seed=5))
+
+        async def handle_data(request: web.Request) -> web.StreamResponse:
+            # body sent in small chunks
+            response = web.StreamResponse(headers={"Content-Type": "application/json"})
+            await response.prepare(request)
+            for start in range(0, len(self.body), 1000):
+                await response.write(self.body[start:start + 1000])
+            await response.write_eof()
+            return response
+
+        await self.start_server(handle_data)
+
+    async def test_streaming_equals_buffered(self):
+        app_config = get_local_config()
+        app_config.requests = [self.table_request()]
+        async with Transport(app_config) as transport:
+            app_config.fetch_streaming = True
+            streamed = await get_all_metrics(app_config, transport.session)
+            app_config.fetch_streaming = False
+            buffered = await get_all_metrics(app_config, transport.session)
+        self.assertGreater(len(streamed[0]), 0)
+        self.assertEqual(streamed[0].fingerprint(), buffered[0].fingerprint())
+
+    async def test_unchanged_not_decoded(self):
+        app_config = get_local_config()
+        app_config.requests = [self.table_request()]
+        app_config.fetch_streaming = True
+        # expired entries are revalidated with dataset updated field
+        response_cache = ResponseCache(0, 10)
+        async with Transport(app_config) as transport:
+            first = await get_all_metrics(app_config, transport.session, response_cache)
+            with mock.patch.object(JsonStatStreamParser, "_append_values") as append_values:
+                second = await get_all_metrics(app_config, transport.session, response_cache)
+        self.assertIs(second[0], first[0])
+        # reading stopped at updated field, values were not decoded
+        append_values.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import time
+import unittest
+from unittest import TestCase
+
+from aiohttp import web
+
+from config.configs import EndpointLimit, RetryPolicy, get_local_config
+from databox_main import get_all_metrics
+from fetch.limiter import AimdWindow, EndpointLimiter, Limiters, TokenBucket, backoff_delay, parse_retry_after
+from fetch.transport import Transport
+from test.stub_server import StubServerTestCase
+from test.test_registry import REGION_BIRTHS
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLimiter(TestCase):
+
+    def test_token_bucket(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, 2, clock)
+        self.assertEqual([bucket.wait_time(), bucket.wait_time()], [0.0, 0.0])
+        self.assertEqual(bucket.wait_time(), 0.5)
+        clock.now = 0.5
+        self.assertEqual(bucket.wait_time(), 0.0)
+        bucket.pause(3)
+        self.assertEqual(bucket.wait_time(), 3)
+        # Retry-After pause is honoured without rate limit too
+        unlimited = TokenBucket(0, 1, clock)
+        self.assertEqual([unlimited.wait_time(), unlimited.wait_time()], [0.0, 0.0])
+        unlimited.pause(2)
+        self.assertEqual(unlimited.wait_time(), 2)
+
+    def test_aimd_window(self):
+        clock = FakeClock()
+        window = AimdWindow(2, 8, 1.0, clock=clock)
+        # window grows by about one request per window of healthy responses
+        for _ in range(3):
+            window.record(False, 0.1)
+        self.assertEqual(int(window.limit), 3)
+        window.record(True, 0.1)
+        self.assertEqual(int(window.limit), 1)
+        # one burst of failures decreases window only once
+        limit = window.limit
+        window.record(True, 0.1)
+        self.assertEqual(window.limit, limit)
+        clock.now = 2
+        window.record(False, 5.0)
+        self.assertEqual(window.limit, 1.0)
+        for _ in range(100):
+            window.record(False, 0.1)
+        self.assertEqual(window.limit, 8)
+
+    def test_retry_after(self):
+        self.assertEqual(parse_retry_after("2"), 2.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+        limiter = EndpointLimiter("host", EndpointLimit(10, 10, 2, 4, 1), FakeClock())
+        self.assertEqual(limiter.record(429, 0.1, {"Retry-After": "3"}), 3.0)
+        self.assertEqual(limiter.retry_after(), 3.0)
+        self.assertEqual(int(limiter.window.limit), 1)
+
+    def test_backoff(self):
+        retry_policy = RetryPolicy(3, 1, 4, 60)
+        for attempt in range(1, 6):
+            self.assertLessEqual(backoff_delay(attempt, retry_policy), min(4, 2 ** (attempt - 1)))
+        self.assertEqual(backoff_delay(1, retry_policy, 10), 10)
+
+    def test_limiters_by_host(self):
+        limiters = Limiters(EndpointLimit(0, 1, 2, 4, 1))
+        self.assertIs(limiters.get("https://host/a"), limiters.get("https://host/b"))
+        self.assertIsNot(limiters.get("https://host/a"), limiters.get("https://other/a"))
+
+
+class TestFetchRetry(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = 0
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.requests += 1
+            if self.requests == 1:
+                return web.Response(status=429, headers={"Retry-After": "0.1"})
+            return web.Response(text=json.dumps(REGION_BIRTHS), content_type="application/json")
+
+        await self.start_server(handle_data)
+        self.app_config = get_local_config()
+        self.app_config.requests = [self.table_request()]
+        self.app_config.fetch_retry = RetryPolicy(2, 0.01, 0.01, 60)
+        self.limiters = Limiters(EndpointLimit(0, 1, 2, 4, 5))
+
+    async def test_retry_after_throttling(self):
+        start_time = time.monotonic()
+        async with Transport(self.app_config) as transport:
+            results = await get_all_metrics(self.app_config, transport.session, limiters=self.limiters,
+                                            deadline=time.monotonic() + 60)
+        self.assertEqual(len(results[0]), 4)
+        self.assertEqual(self.requests, 2)
+        self.assertGreaterEqual(time.monotonic() - start_time, 0.1)
+
+    async def test_deadline(self):
+        async with Transport(self.app_config) as transport:
+            results = await get_all_metrics(self.app_config, transport.session, limiters=self.limiters,
+                                            deadline=time.monotonic())
+        # no retry when it can't finish before deadline
+        self.assertEqual(results[0].response_status, 429)
+        self.assertEqual(self.requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import logging
+import queue
+import unittest
+from logging.handlers import QueueListener
+from unittest import TestCase
+
+from telemetry.logs import LazyQueueHandler, SamplingFilter, TruncatingFormatter, log_type
+
+
+def create_record(level: int, message: str, *args, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("test", level, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class CountingRepr:
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __repr__(self) -> str:
+        self.calls += 1
+        return "counted"
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+
+
+class TestLogs(TestCase):
+
+    def test_sampling(self):
+        sampling_filter = SamplingFilter({"metric": 0.0}, {"push": 2})
+        self.assertFalse(sampling_filter.filter(create_record(logging.INFO, "m", **log_type("metric"))))
+        # warnings and messages without type are not sampled
+        self.assertTrue(sampling_filter.filter(create_record(logging.WARNING, "m", **log_type("metric"))))
+        self.assertTrue(sampling_filter.filter(create_record(logging.INFO, "m")))
+        # rate limit allows burst of 2 messages
+        results = [sampling_filter.filter(create_record(logging.INFO, "p", **log_type("push"))) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(sampling_filter.suppressed, {"metric": 1, "push": 1})
+
+    def test_muted_and_sampled_once(self):
+        sampling_filter = SamplingFilter({"request": 0.5}, {"metric": 0}, report_interval=0)
+        with self.assertLogs("telemetry.logs", "WARNING") as logs:
+            self.assertFalse(sampling_filter.filter(create_record(logging.INFO, "m", **log_type("metric"))))
+        self.assertIn("{'metric': 1}", logs.output[0])
+        self.assertEqual(sampling_filter.suppressed, dict())
+        # record passed to several handlers gets the same decision and is counted once
+        sampling_filter.report_interval = 60
+        for _ in range(20):
+            record = create_record(logging.INFO, "r", **log_type("request"))
+            self.assertEqual(len({sampling_filter.filter(record) for _ in range(5)}), 1)
+        self.assertLessEqual(sampling_filter.suppressed.get("request", 0), 20)
+
+    def test_truncate(self):
+        formatter = TruncatingFormatter("%(message)s", 10)
+        self.assertEqual(formatter.format(create_record(logging.INFO, "%s", "x" * 20)),
+                         "xxxxxxxxxx... (20 characters)")
+        self.assertEqual(formatter.format(create_record(logging.INFO, "short")), "short")
+
+    def test_lazy_formatting(self):
+        log_queue = queue.SimpleQueue()
+        handler = ListHandler()
+        logger = logging.getLogger("test_lazy_formatting")
+        logger.propagate = False
+        logger.addHandler(LazyQueueHandler(log_queue))
+        argument = CountingRepr()
+        logger.warning("value: %r", argument)
+        # message is not formatted on calling thread
+        self.assertEqual(argument.calls, 0)
+        listener = QueueListener(log_queue, handler)
+        listener.start()
+        listener.stop()
+        self.assertEqual(handler.messages, ["value: counted"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import unittest
+from unittest import TestCase
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import unused_port
+
+from config.configs import get_local_config
+from databox_main import get_all_metrics
+from fetch.transport import Transport
+from telemetry.metrics import MetricsRegistry
+from telemetry.server import MetricsServer
+from test.stub_server import StubServerTestCase
+from test.test_registry import REGION_BIRTHS
+
+
+class TestMetricsRegistry(TestCase):
+
+    def test_render(self):
+        metrics = MetricsRegistry(buckets=(0.1, 1.0))
+        metrics.observe("stage_seconds", 0.05, source="a", stage="parse")
+        metrics.observe("stage_seconds", 0.5, source="a", stage="parse")
+        metrics.observe("stage_seconds", 5, source="a", stage="parse")
+        metrics.increment("points_total", 3, source='b"c')
+        text = metrics.render()
+        self.assertIn('# TYPE databox_points_total counter\ndatabox_points_total{source="b\\"c"} 3\n', text)
+        self.assertIn('databox_stage_seconds_bucket{source="a",stage="parse",le="0.1"} 1\n', text)
+        self.assertIn('databox_stage_seconds_bucket{source="a",stage="parse",le="1"} 2\n', text)
+        self.assertIn('databox_stage_seconds_bucket{source="a",stage="parse",le="+Inf"} 3\n', text)
+        self.assertIn('databox_stage_seconds_sum{source="a",stage="parse"} 5.55\n', text)
+        self.assertIn('databox_stage_seconds_count{source="a",stage="parse"} 3\n', text)
+
+
+class TestStageMetrics(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        async def handle_data(request: web.Request) -> web.Response:
+            return web.Response(text=json.dumps(REGION_BIRTHS), content_type="application/json")
+
+        await self.start_server(handle_data)
+
+    async def test_fetch_stages(self):
+        app_config = get_local_config()
+        app_config.requests = [self.table_request()]
+        received_bytes = []
+        for streaming, expected_stages in [(False, {"connect", "ttfb", "body", "json_loads", "parse"}),
+                                           (True, {"connect", "ttfb", "stream_body", "parse"})]:
+            app_config.fetch_streaming = streaming
+            metrics = MetricsRegistry()
+            async with Transport(app_config, metrics) as transport:
+                await get_all_metrics(app_config, transport.session, metrics=metrics)
+            stages = {dict(labels)["stage"] for labels in metrics.histograms["fetch_stage_seconds"]}
+            # no dns stage, test server url is IP address
+            self.assertEqual(stages, expected_stages)
+            self.assertEqual(metrics.counters["fetch_points_total"][(("source", "table"),)], 4)
+            received_bytes.append(metrics.counters["fetch_received_bytes_total"][(("source", "table"),)])
+        # streamed body is counted as well, same bytes as buffered one
+        self.assertGreater(received_bytes[0], 0)
+        self.assertEqual(received_bytes[1], received_bytes[0])
+
+    async def test_endpoint(self):
+        metrics = MetricsRegistry()
+        metrics.increment("points_total", 1, source="a")
+        metrics_server = MetricsServer(metrics, "127.0.0.1", unused_port())
+        await metrics_server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{metrics_server.port}/metrics") as response:
+                    self.assertEqual(response.status, 200)
+                    self.assertIn('databox_points_total{source="a"} 1', await response.text())
+        finally:
+            await metrics_server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
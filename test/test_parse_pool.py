@@ -0,0 +1,62 @@
+import json
+import pickle
+import unittest
+from unittest import TestCase
+
+from aiohttp import web
+
+from benchmark.generator import encode, generate_dataset
+from config.configs import RequestPost, get_local_config
+from databox_main import get_all_metrics
+from fetch.transport import Transport
+from response.parse_pool import ParsePool, parse_response
+from test.stub_server import StubServerTestCase
+
+
+class TestPickle(TestCase):
+
+    def test_columnar_pickle(self):
+        response_unit = parse_response(encode(generate_dataset([2, 3], 5, seed=1)).decode(),
+                                       RequestPost("table", "url", {}, "table", unit="N"), 200)
+        response_unit.encoded_items()
+        restored = pickle.loads(pickle.dumps(response_unit))
+        self.assertEqual(restored.fingerprint(), response_unit.fingerprint())
+        self.assertEqual(restored.attributes, response_unit.attributes)
+        self.assertEqual(restored.unit, "N")
+        # cached encodings are not pickled
+        self.assertIsNone(restored._encoded_items)
+        self.assertEqual(restored.payload(), response_unit.payload())
+
+
+class TestParsePool(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.body = encode(generate_dataset([3, 4], 12, monthly=True, seed=2))
+
+        async def handle_data(request: web.Request) -> web.Response:
+            return web.Response(body=self.body, content_type="application/json")
+
+        await self.start_server(handle_data)
+        self.app_config = get_local_config()
+        self.app_config.requests = [self.table_request()]
+        self.app_config.fetch_streaming = False
+        self.parse_pool = ParsePool(1, 1024)
+
+    async def asyncTearDown(self):
+        self.parse_pool.close()
+
+    async def test_offloaded_parse(self):
+        async with Transport(self.app_config) as transport:
+            offloaded = await get_all_metrics(self.app_config, transport.session, parse_pool=self.parse_pool)
+            inline = await get_all_metrics(self.app_config, transport.session)
+        self.assertIsNotNone(self.parse_pool.executor)
+        self.assertEqual(len(offloaded[0]), 3 * 4 * 12)
+        self.assertEqual(offloaded[0].fingerprint(), inline[0].fingerprint())
+
+    def test_threshold(self):
+        self.assertTrue(self.parse_pool.offloads(self.body.decode()))
+        self.assertFalse(self.parse_pool.offloads(json.dumps({"small": 1})))
+
+
+if __name__ == '__main__':
+    unittest.main()
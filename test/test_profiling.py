@@ -0,0 +1,112 @@
+import asyncio
+import os
+import pstats
+import tempfile
+import time
+import unittest
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from app_context import AppContext
+from benchmark.generator import encode, generate_cells
+from benchmark.run import benchmark_config
+from benchmark.stubs import DataboxStub, SiStatStub
+from databox_main import one_time_send
+from telemetry.profiling import Profiler, track_allocations
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiler(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def files(self) -> list[str]:
+        return sorted(os.listdir(self.directory.name))
+
+    def test_requested_cycles(self):
+        profiler = Profiler(self.directory.name, sampling_interval=0.001)
+        with profiler.cycle("a"):
+            pass
+        # not requested
+        self.assertEqual(self.files(), [])
+        profiler.request(1)
+        with profiler.cycle("a/b"):
+            with track_allocations("parse"):
+                allocated = [str(idx) for idx in range(10000)]
+            busy(0.05)
+        with profiler.cycle("c"):
+            pass
+        self.assertEqual(len(allocated), 10000)
+        file_name = self.files()[-1][:-len(".pstats")]
+        self.assertTrue(file_name.endswith("-1-a_b"))
+        self.assertEqual(self.files(), [f"{file_name}.allocations.txt", f"{file_name}.collapsed",
+                                        f"{file_name}.pstats"])
+        prefix = os.path.join(self.directory.name, file_name)
+        stats = pstats.Stats(f"{prefix}.pstats")
+        self.assertTrue(any(function == "busy" for _, _, function in stats.stats))
+        with open(f"{prefix}.collapsed") as collapsed_file:
+            stacks = [line.rsplit(" ", 1) for line in collapsed_file.read().splitlines()]
+        self.assertTrue(stacks)
+        self.assertTrue(any(stack.endswith("test_profiling.py:busy") and int(count) > 0 for stack, count in stacks))
+        with open(f"{prefix}.allocations.txt") as report_file:
+            report = report_file.read()
+        self.assertTrue(report.startswith("parse: "))
+        self.assertIn("test_profiling.py", report)
+
+    def test_disabled_parts(self):
+        profiler = Profiler(self.directory.name, cprofile=False, sampling_interval=0, trace_allocations=False)
+        profiler.request(2)
+        with profiler.cycle("a"):
+            with track_allocations("parse"):
+                pass
+        self.assertEqual(self.files(), [])
+        self.assertEqual(profiler.remaining, 1)
+
+
+class TestSlowCallbacks(IsolatedAsyncioTestCase):
+
+    async def test_slow_callback_logged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = Profiler(directory, cprofile=False, sampling_interval=0, trace_allocations=False,
+                                slow_callback=0.01)
+            profiler.request(1)
+            loop = asyncio.get_running_loop()
+            debug = loop.get_debug()
+            with self.assertLogs("asyncio", "WARNING") as logs:
+                with profiler.cycle("a"):
+                    loop.call_soon(busy, 0.05)
+                    await asyncio.sleep(0.01)
+            self.assertTrue(any("took" in message for message in logs.output))
+            # loop is restored after the cycle
+            self.assertEqual(loop.get_debug(), debug)
+
+
+class TestProfiledSend(IsolatedAsyncioTestCase):
+
+    async def test_one_time_send(self):
+        tables = {f"T{idx}": encode(generate_cells(50, monthly=True, seed=idx)) for idx in range(2)}
+        with tempfile.TemporaryDirectory() as directory:
+            async with SiStatStub(tables) as sistat, DataboxStub() as databox:
+                app_config = benchmark_config(sistat, databox, list(tables), unlimited=True)
+                app_config.profiling_cycles = 1
+                app_config.profiling_directory = directory
+                async with AppContext(app_config) as app_context:
+                    await one_time_send(app_context)
+                    await one_time_send(app_context)
+            files = os.listdir(directory)
+            self.assertEqual(len(files), 3)
+            report = [file for file in files if file.endswith(".allocations.txt")][0]
+            with open(os.path.join(directory, report)) as report_file:
+                stages = [line.split(":")[0] for line in report_file if not line.startswith(" ")]
+        self.assertEqual(databox.counters.points, 2 * 100)
+        self.assertEqual(sorted(stages), ["derived", "parse", "push_payload"])
+
+
+if __name__ == '__main__':
+    unittest.main()
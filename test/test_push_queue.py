@@ -0,0 +1,146 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import TestCase, IsolatedAsyncioTestCase, mock
+
+from aiohttp import web
+
+from config.configs import get_local_config
+from databox_main import drain_push_queue
+from fetch.transport import Transport
+from push.databox_client import DataboxClient
+from push.push_queue import PushQueue
+from test.stub_server import DATABOX_DATA_PATH, StubServerTestCase
+
+
+def create_items(start: int, end: int) -> list[bytes]:
+    return [f'{{"key": "metric_key", "value": {idx}}}'.encode() for idx in range(start, end)]
+
+
+class TestPushQueue(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_queue(self, capacity: int = 100, segment_max_bytes: int = 1024 * 1024) -> PushQueue:
+        return PushQueue(self.directory.name, capacity, 10, segment_max_bytes)
+
+    def test_read_ack(self):
+        push_queue = self.create_queue()
+        self.assertTrue(push_queue.put(create_items(0, 5)))
+        items, position = push_queue.read(3, 1024)
+        self.assertEqual(items, create_items(0, 3))
+        # not acknowledged data is read again
+        self.assertEqual(push_queue.read(3, 1024)[0], create_items(0, 3))
+        push_queue.ack(position, len(items))
+        self.assertEqual(len(push_queue), 2)
+        self.assertEqual(push_queue.read(3, 1024)[0], create_items(3, 5))
+        push_queue.close()
+
+    def test_max_bytes(self):
+        push_queue = self.create_queue()
+        push_queue.put(create_items(0, 5))
+        items, _ = push_queue.read(100, 2 + 2 * (len(create_items(0, 1)[0]) + 2))
+        self.assertEqual(len(items), 2)
+        push_queue.close()
+
+    def test_restart(self):
+        push_queue = self.create_queue()
+        push_queue.put(create_items(0, 5))
+        items, position = push_queue.read(2, 1024)
+        push_queue.ack(position, len(items))
+        push_queue.close()
+        # partially written data point is dropped on restart
+        with open(push_queue._segment_path(push_queue.segments[-1]), "ab") as segment:
+            segment.write(b'{"key": "metr')
+        push_queue = self.create_queue()
+        self.assertEqual(len(push_queue), 3)
+        self.assertEqual(push_queue.read(10, 1024)[0], create_items(2, 5))
+        push_queue.put(create_items(5, 6))
+        self.assertEqual(push_queue.read(10, 1024)[0], create_items(2, 6))
+        push_queue.close()
+
+    def test_capacity(self):
+        push_queue = self.create_queue(capacity=4)
+        self.assertTrue(push_queue.put(create_items(0, 3)))
+        self.assertFalse(push_queue.put(create_items(3, 5)))
+        self.assertEqual(len(push_queue), 3)
+        push_queue.close()
+
+    def test_segments(self):
+        push_queue = self.create_queue(segment_max_bytes=64)
+        for idx in range(6):
+            push_queue.put(create_items(idx, idx + 1))
+        self.assertGreater(len(push_queue.segments), 2)
+        items, position = push_queue.read(100, 1024 * 1024)
+        self.assertEqual(items, create_items(0, 6))
+        push_queue.ack(position, len(items))
+        # only active segment is left
+        self.assertEqual(len([name for name in os.listdir(self.directory.name) if name.endswith(".log")]), 1)
+        self.assertEqual(len(push_queue), 0)
+        push_queue.close()
+
+
+class TestAppend(IsolatedAsyncioTestCase):
+
+    async def test_fsync_off_event_loop(self):
+        threads = []
+
+        def fsync(descriptor: int) -> None:
+            threads.append(threading.get_ident())
+            os.fstat(descriptor)
+
+        with tempfile.TemporaryDirectory() as directory:
+            push_queue = PushQueue(directory, 4, 10, 64, fsync=True)
+            with mock.patch("push.push_queue.os.fsync", side_effect=fsync):
+                self.assertTrue(await push_queue.append(create_items(0, 3)))
+                self.assertFalse(await push_queue.append(create_items(3, 5)))
+                items, position = push_queue.read(2, 1024)
+                await push_queue.acknowledge(position, len(items))
+            push_queue.close()
+            self.assertEqual(len(push_queue), 1)
+            self.assertEqual(PushQueue(directory, 4, 10, 64).read(10, 1024)[0], create_items(2, 3))
+        # durable write and acknowledge waited for executor thread, not on event loop
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(thread != threading.get_ident() for thread in threads))
+
+
+class TestDrainPushQueue(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pushed = []
+        self.fail = True
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.pushed.append(await request.json())
+            return web.json_response({}, status=500 if self.fail else 200)
+
+        await self.start_server(handle_data, DATABOX_DATA_PATH)
+        self.app_config = get_local_config()
+        self.app_config.databox_configuration.host = self.url()
+        self.app_config.push_queue_batch_size = 2
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_drain(self):
+        push_queue = PushQueue(self.directory.name, 100, 10)
+        push_queue.put(create_items(0, 5))
+        async with Transport(self.app_config) as transport:
+            databox_client = DataboxClient(self.app_config, transport.session)
+            await drain_push_queue(push_queue, databox_client, self.app_config)
+            self.assertEqual(len(push_queue), 5)
+            self.fail = False
+            await drain_push_queue(push_queue, databox_client, self.app_config)
+        self.assertEqual(len(push_queue), 0)
+        self.assertEqual([len(body) for body in self.pushed], [2, 2, 2, 1])
+        push_queue.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import unittest
+from unittest import TestCase
+
+from aiohttp import web
+
+from config.configs import RequestPost, get_local_config
+from databox_main import get_all_metrics
+from fetch.transport import Transport
+from response.birth_rate import BirthRate
+from response.registry import create_response
+from response.response_init import ResponseInit
+from test.stub_server import StubServerTestCase
+
+REGION_BIRTHS = {"class": "dataset", "id": ["REGIJA", "LETO"], "size": [2, 2],
+                 "dimension": {"REGIJA": {"category": {"index": {"1": 0, "2": 1},
+                                                       "label": {"1": "Pomurska", "2": "Podravska"}}},
+                               "LETO": {"category": {"index": {"2022": 0, "2023": 1}}}},
+                 "value": [1, 2, 3, 4], "role": {"time": ["LETO"]}, "version": "2.0"}
+
+
+class TestRegistry(TestCase):
+
+    def test_builtin_parser(self):
+        request_post = RequestPost("birth_rate", "url", {}, "birth_rate")
+        response = create_response(REGION_BIRTHS, request_post, 200)
+        self.assertIsInstance(response, BirthRate)
+        self.assertEqual(response.parse().unit, "B")
+
+    def test_generic_parser(self):
+        request_post = RequestPost("region_births", "url", {}, "region_births", "LETO", "N")
+        response = create_response(REGION_BIRTHS, request_post, 200)
+        self.assertIs(type(response), ResponseInit)
+        result = response.parse()
+        self.assertEqual(result.data_type, "region_births")
+        self.assertEqual(result.unit, "N")
+        self.assertEqual(len(result), 4)
+
+
+class TestFetchConcurrency(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.05)
+            self.in_flight -= 1
+            return web.Response(text=json.dumps(REGION_BIRTHS), content_type="application/json")
+
+        await self.start_server(handle_data)
+
+    async def test_bounded_concurrency(self):
+        app_config = get_local_config()
+        app_config.requests = [self.table_request(f"table_{idx}", f"T{idx}") for idx in range(10)]
+        app_config.fetch_max_concurrency = 3
+        async with Transport(app_config) as transport:
+            results = await get_all_metrics(app_config, transport.session)
+        self.assertEqual([len(result) for result in results], [4] * 10)
+        self.assertEqual(results[9].data_type, "table_9")
+        self.assertEqual(self.max_in_flight, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
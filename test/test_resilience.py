@@ -0,0 +1,149 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from aiohttp import web
+
+from config.configs import RetryPolicy, get_local_config
+from databox_main import get_all_metrics
+from fetch.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitState
+from fetch.hedging import Hedging, LatencyWindow
+from fetch.response_cache import ResponseCache
+from fetch.transport import Transport
+from test.stub_server import StubServerTestCase
+from test.test_registry import REGION_BIRTHS
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker(TestCase):
+
+    def test_open_and_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker("url", 2, 10, clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        self.assertFalse(breaker.allow())
+        # failed probe opens circuit again
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitState.OPEN)
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitState.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_percentile(self):
+        window = LatencyWindow(4)
+        self.assertIsNone(window.percentile(95))
+        for latency in [5.0, 1.0, 2.0, 3.0, 4.0]:
+            window.add(latency)
+        self.assertEqual(window.percentile(50), 2.0)
+        # oldest latency is dropped from window
+        self.assertEqual(window.percentile(95), 4.0)
+
+
+class TestHedging(IsolatedAsyncioTestCase):
+
+    async def test_hedged_request(self):
+        hedging = Hedging(50, 0.05, 10, 1)
+        hedging.window("url").add(0.01)
+        delays = [1.0, 0.0]
+        cancelled = []
+
+        async def request() -> float:
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        start_time = time.monotonic()
+        self.assertEqual(await hedging.run("url", request), 0.0)
+        self.assertLess(time.monotonic() - start_time, 0.5)
+        await asyncio.sleep(0)
+        # slow request is cancelled
+        self.assertEqual(cancelled, [1.0])
+
+    async def test_failed_hedge_does_not_win(self):
+        hedging = Hedging(50, 0.05, 10, 1)
+        hedging.window("url").add(0.01)
+        # original succeeds after 0.2 s, hedged request fails at once
+        attempts = [(0.2, 200), (0.0, 503)]
+
+        async def request() -> int:
+            delay, status = attempts.pop(0)
+            await asyncio.sleep(delay)
+            return status
+
+        self.assertEqual(await hedging.run("url", request, lambda status: status == 200), 200)
+        # both failed, first failure is returned
+        attempts.extend([(0.1, 500), (0.0, 503)])
+        self.assertEqual(await hedging.run("url", request, lambda status: status == 200), 503)
+
+    async def test_no_samples(self):
+        hedging = Hedging(50, 0.0, 10, 1)
+
+        async def request() -> int:
+            return 1
+
+        self.assertEqual(await hedging.run("url", request), 1)
+
+
+class TestCircuitFallback(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = 0
+        self.failing = False
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.requests += 1
+            if self.failing:
+                return web.Response(status=500)
+            return web.Response(text=json.dumps(REGION_BIRTHS), content_type="application/json")
+
+        await self.start_server(handle_data)
+        self.app_config = get_local_config()
+        self.app_config.requests = [self.table_request()]
+        self.app_config.fetch_retry = RetryPolicy(0, 0.01, 0.01, 60)
+
+    async def test_last_cached_response(self):
+        response_cache = ResponseCache(0, 10)
+        circuit_breakers = CircuitBreakers(2, 60)
+        async with Transport(self.app_config) as transport:
+            results = await get_all_metrics(self.app_config, transport.session, response_cache,
+                                            circuit_breakers=circuit_breakers)
+            self.assertEqual(len(results[0]), 4)
+            self.failing = True
+            results = await get_all_metrics(self.app_config, transport.session, response_cache,
+                                            circuit_breakers=circuit_breakers)
+            self.assertEqual(results[0].response_status, 500)
+            # circuit opens, last cached response is used
+            results = await get_all_metrics(self.app_config, transport.session, response_cache,
+                                            circuit_breakers=circuit_breakers)
+            self.assertEqual(len(results[0]), 4)
+            # url is skipped while circuit is open
+            results = await get_all_metrics(self.app_config, transport.session, response_cache,
+                                            circuit_breakers=circuit_breakers)
+            self.assertEqual(len(results[0]), 4)
+        self.assertEqual(self.requests, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
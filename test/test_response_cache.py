@@ -0,0 +1,76 @@
+import json
+import unittest
+
+import aiohttp
+from aiohttp import web
+
+from config.configs import RequestTimeout
+from databox_main import make_post_request
+from fetch.response_cache import ResponseCache
+from test.stub_server import StubServerTestCase
+
+BIRTH_RATE = {"class": "dataset", "updated": "2006-12-12T09:30:00Z", "id": ["LETO", "MERITVE"], "size": [2, 1],
+              "dimension": {"LETO": {"category": {"index": {"2022": 0, "2023": 1},
+                                                  "label": {"2022": "2022", "2023": "2023"}}},
+                            "MERITVE": {"category": {"index": {"0": 0}, "label": {"0": "Živorojeni - SKUPAJ"}}}},
+              "value": [17627, 16989], "role": {"time": ["LETO"]}, "version": "2.0"}
+
+
+class TestResponseCache(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.request_headers = []
+        self.etag = None
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.request_headers.append(dict(request.headers))
+            if self.etag is not None and request.headers.get("If-None-Match") == self.etag:
+                return web.Response(status=304)
+            headers = {"ETag": self.etag} if self.etag is not None else {}
+            return web.Response(text=json.dumps(BIRTH_RATE), content_type="application/json", headers=headers)
+
+        await self.start_server(handle_data)
+        self.request_post = self.table_request("birth_rate", "05J1002S", {"query": []})
+        self.request_timeout = RequestTimeout(5, 5, 5)
+
+    async def fetch(self, response_cache: ResponseCache):
+        async with aiohttp.ClientSession() as session:
+            return await make_post_request(self.request_post, self.request_timeout, session, response_cache)
+
+    async def test_etag(self):
+        self.etag = '"v1"'
+        response_cache = ResponseCache(ttl_sec=0, max_entries=8)
+        first = await self.fetch(response_cache)
+        second = await self.fetch(response_cache)
+        self.assertEqual(len(first), 2)
+        self.assertIs(first, second)
+        self.assertEqual(self.request_headers[1]["If-None-Match"], '"v1"')
+
+    async def test_updated(self):
+        response_cache = ResponseCache(ttl_sec=0, max_entries=8)
+        first = await self.fetch(response_cache)
+        second = await self.fetch(response_cache)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.request_headers), 2)
+
+    async def test_ttl(self):
+        response_cache = ResponseCache(ttl_sec=60, max_entries=8)
+        first = await self.fetch(response_cache)
+        second = await self.fetch(response_cache)
+        self.assertIs(first, second)
+        self.assertEqual(len(self.request_headers), 1)
+
+    def test_find_updated(self):
+        self.assertEqual(ResponseCache.find_updated(json.dumps(BIRTH_RATE)), "2006-12-12T09:30:00Z")
+        self.assertIsNone(ResponseCache.find_updated('{"value": []}'))
+
+    def test_eviction(self):
+        response_cache = ResponseCache(ttl_sec=60, max_entries=2)
+        for key in ["a", "b", "c"]:
+            response_cache.put(key, None, {}, None)
+        self.assertIsNone(response_cache.get("a"))
+        self.assertIsNotNone(response_cache.get("c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import time
+import unittest
+from datetime import datetime
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from config.configs import get_local_config
+from databox_main import create_schedules
+from scheduling.cron import CronExpression
+from scheduling.scheduler import Schedule, Scheduler
+
+
+class TestCron(TestCase):
+
+    def test_every_minute(self):
+        cron = CronExpression("* * * * *")
+        self.assertEqual(cron.next_after(datetime(2024, 1, 1, 10, 15, 30)), datetime(2024, 1, 1, 10, 16))
+
+    def test_steps_and_ranges(self):
+        cron = CronExpression("*/15 9-17 * * *")
+        self.assertEqual(cron.next_after(datetime(2024, 1, 1, 10, 15)), datetime(2024, 1, 1, 10, 30))
+        self.assertEqual(cron.next_after(datetime(2024, 1, 1, 17, 45)), datetime(2024, 1, 2, 9, 0))
+
+    def test_month_and_weekday(self):
+        # 2024-01-01 is monday, first sunday is 2024-01-07
+        self.assertEqual(CronExpression("0 6 * * 0").next_after(datetime(2024, 1, 1)), datetime(2024, 1, 7, 6, 0))
+        self.assertEqual(CronExpression("0 6 * * 7").next_after(datetime(2024, 1, 1)), datetime(2024, 1, 7, 6, 0))
+        self.assertEqual(CronExpression("0 0 1 3,6 *").next_after(datetime(2024, 3, 1)), datetime(2024, 6, 1))
+        # day of month or day of week when both are set
+        self.assertEqual(CronExpression("0 0 15 * 1").next_after(datetime(2024, 1, 2)), datetime(2024, 1, 8))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            CronExpression("* * * *")
+        with self.assertRaises(ValueError):
+            CronExpression("60 * * * *")
+        with self.assertRaises(ValueError):
+            CronExpression("0 0 31 2 *").next_after(datetime(2024, 1, 1))
+
+
+class TestSchedule(TestCase):
+
+    def test_next_due(self):
+        schedule = Schedule("source", 10)
+        self.assertEqual(schedule.next_due(100, 101), 110)
+        # run took longer than interval, missed runs are skipped and alignment is kept
+        self.assertEqual(schedule.next_due(100, 125), 130)
+
+    def test_config(self):
+        schedules = {schedule.name: schedule for schedule in create_schedules(get_local_config())}
+        self.assertEqual(schedules["average_pay"].interval, 300)
+        self.assertIsNotNone(schedules["death_rate"].cron)
+
+
+class TestScheduler(IsolatedAsyncioTestCase):
+
+    async def test_slow_source(self):
+        runs = {"fast": [], "slow": []}
+
+        async def run(name: str) -> None:
+            runs[name].append(time.monotonic())
+            if name == "slow":
+                await asyncio.sleep(0.25)
+
+        scheduler = Scheduler([Schedule("fast", 0.05), Schedule("slow", 0.05)], run)
+        task = asyncio.create_task(scheduler.run_forever())
+        await asyncio.sleep(0.42)
+        task.cancel()
+        # slow source doesn't delay fast one, runs of slow source that is still running are skipped
+        self.assertGreaterEqual(len(runs["fast"]), 7)
+        self.assertEqual(len(runs["slow"]), 2)
+        # runs don't drift with execution time
+        start = runs["fast"][0]
+        for idx, run_time in enumerate(runs["fast"]):
+            self.assertAlmostEqual(run_time - start, idx * 0.05, delta=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from array import array
+from unittest import TestCase, IsolatedAsyncioTestCase
+
+from app_context import AppContext
+from benchmark.generator import encode, generate_cells
+from benchmark.run import benchmark_config
+from benchmark.stubs import DataboxStub, SiStatStub
+from databox_main import one_time_send
+from response.response_init import ResponseUnit
+from response.series_snapshot import load_series, store_series
+
+
+def create_unit(name: str, values: list[float]) -> ResponseUnit:
+    return ResponseUnit(name, "N", array("q", [idx * 86400 for idx in range(len(values))]), array("d", values),
+                        name, 200, array("I", [idx % 2 for idx in range(len(values))]), [{"x": "1"}, {"x": "2"}])
+
+
+class TestSeriesSnapshot(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "series.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        units = {"a": create_unit("a", [1.0, 2.0, 3.0]), "b": create_unit("b", []), "c": create_unit("c", [4.5])}
+        store_series(self.path, units, {"a"})
+        loaded, pushed = load_series(self.path)
+        self.assertEqual(pushed, {"a"})
+        self.assertEqual(list(loaded), ["a", "b", "c"])
+        for name, unit in units.items():
+            self.assertEqual(list(loaded[name].dates), list(unit.dates))
+            self.assertEqual(list(loaded[name].values), list(unit.values))
+            self.assertEqual(list(loaded[name].series), list(unit.series))
+            self.assertEqual(loaded[name].attributes, unit.attributes)
+            self.assertEqual(loaded[name].unit, "N")
+        # columns are views of mapped file, nothing is decoded
+        self.assertIsInstance(loaded["a"].values, memoryview)
+        self.assertEqual(loaded["a"].encoded_items(), units["a"].encoded_items())
+        # snapshot of loaded units is stored again while the file is mapped
+        store_series(self.path, loaded, set())
+        self.assertEqual(list(load_series(self.path)[0]["c"].values), [4.5])
+
+    def test_missing_or_invalid(self):
+        self.assertEqual(load_series(self.path), (dict(), set()))
+        with open(self.path, "wb") as snapshot_file:
+            snapshot_file.write(b"not a snapshot")
+        self.assertEqual(load_series(self.path), (dict(), set()))
+
+
+class TestWarmRestart(IsolatedAsyncioTestCase):
+
+    async def test_restart(self):
+        tables = {f"T{idx}": encode(generate_cells(100, monthly=True, seed=idx)) for idx in range(2)}
+        with tempfile.TemporaryDirectory() as directory:
+            async with SiStatStub(tables) as sistat, DataboxStub() as databox:
+                app_config = benchmark_config(sistat, databox, list(tables), unlimited=True)
+                app_config.series_snapshot_enabled = True
+                app_config.series_snapshot_file = os.path.join(directory, "series.snapshot")
+                app_config.databox_delta_push = True
+                async with AppContext(app_config) as app_context:
+                    await one_time_send(app_context)
+                self.assertEqual(databox.counters.points, 2 * 100)
+                # restarted application knows latest series and what was pushed
+                async with AppContext(app_config) as app_context:
+                    self.assertEqual(sorted(app_context.latest_units), ["T0", "T1"])
+                    self.assertIsNotNone(app_context.incremental.latest("T0"))
+                    await one_time_send(app_context)
+                self.assertEqual(databox.counters.points, 2 * 100)
+                self.assertEqual(sistat.counters.requests, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import json
+import tempfile
+import unittest
+from array import array
+from types import SimpleNamespace
+from unittest import TestCase, IsolatedAsyncioTestCase, mock
+
+from aiohttp import web
+
+from app_context import AppContext
+from benchmark.generator import encode, generate_cells
+from benchmark.run import benchmark_config
+from benchmark.stubs import DataboxStub, SiStatStub, StubBehaviour
+from config.configs import DataboxTarget
+from databox_main import forward, one_time_send
+from push.batching import create_batches
+from push.delta import DeltaTracker
+from push.push_queue import PushQueue
+from push.targets import PushTarget
+from response.response_init import ResponseUnit
+
+
+class KeysDataboxStub(DataboxStub):
+    """
+    Databox stub that keeps metric keys of received data points
+    """
+
+    def __init__(self, behaviour: StubBehaviour | None = None) -> None:
+        super().__init__(behaviour)
+        self.keys: set[str] = set()
+
+    async def handle_data(self, request: web.Request) -> web.Response:
+        response = await super().handle_data(request)
+        if response.status == 200:
+            self.keys.update(item["key"] for item in json.loads(await request.read()))
+        return response
+
+
+class TestRemappedItems(TestCase):
+
+    def test_encoded_once(self):
+        response_unit = ResponseUnit("pay", "EUR", array("q", [0, 86400]), array("d", [1.0, 2.0]), "pay", 200,
+                                     array("I", [0, 1]), [{"key": "pay"}, {"key": "other"}])
+        items = response_unit.encoded_items()
+        remapped = response_unit.encoded_items("customer_pay")
+        self.assertIs(response_unit.encoded_items("customer_pay"), remapped)
+        self.assertIs(response_unit.encoded_items("pay"), items)
+        decoded = [json.loads(item) for item in remapped]
+        self.assertEqual([item["key"] for item in decoded], ["customer_pay", "customer_pay"])
+        # attributes with the same key are not changed
+        self.assertEqual(decoded[0]["attributes"], [{"key": "key", "value": "pay"}])
+        # subset keeps already encoded data points
+        self.assertIs(response_unit.take([1]).encoded_items()[0], items[1])
+        batches = create_batches([response_unit], 10, 1000, {"pay": "customer_pay"})
+        self.assertEqual(batches[0].items, remapped)
+
+
+class TestFanOut(IsolatedAsyncioTestCase):
+
+    async def test_targets(self):
+        tables = {f"T{idx}": encode(generate_cells(50, monthly=True, seed=idx)) for idx in range(2)}
+        async with SiStatStub(tables) as sistat, KeysDataboxStub() as default, KeysDataboxStub() as customer, \
+                KeysDataboxStub(StubBehaviour(error_rate=1.0)) as failing:
+            app_config = benchmark_config(sistat, default, list(tables), unlimited=True)
+            app_config.databox_delta_push = True
+            app_config.databox_retry.retries = 0
+            app_config.databox_targets = [DataboxTarget("customer", "token", customer.url(""), {"T0": "customer_T0"}),
+                                          DataboxTarget("failing", "token", failing.url(""))]
+            async with AppContext(app_config) as app_context:
+                await one_time_send(app_context)
+                statuses = {target.name: target.status for target in app_context.targets}
+                await one_time_send(app_context)
+        # tables are fetched once for all targets
+        self.assertEqual(sistat.counters.requests, 2 * 2)
+        self.assertEqual(default.keys, {"T0", "T1"})
+        self.assertEqual(customer.keys, {"customer_T0", "T1"})
+        self.assertEqual((default.counters.points, customer.counters.points), (100, 100))
+        # failing target doesn't affect others and its data points are pushed again
+        self.assertEqual(statuses["default"].pushed_points, 100)
+        self.assertEqual(statuses["failing"].pushed_points, 0)
+        self.assertEqual(statuses["failing"].last_status, 500)
+        self.assertEqual(failing.counters.requests, 2)
+
+    async def test_encoded_once_with_delta(self):
+        response_unit = ResponseUnit("pay", "EUR", array("q", [0, 86400, 172800]), array("d", [1.0, 2.0, 3.0]),
+                                     "pay", 200, array("I", [0, 0, 0]), [{}])
+        with tempfile.TemporaryDirectory() as directory:
+            targets = []
+            for name in ("a", "b", "c"):
+                delta_tracker = DeltaTracker(0)
+                # first data point was already pushed, two changed
+                delta_tracker.commit(response_unit.take([0]))
+                targets.append(PushTarget(name, dict(), None, delta_tracker,
+                                          PushQueue(f"{directory}/{name}", 100, 100, 1 << 20, False)))
+            app_context = SimpleNamespace(app_config=None, targets=targets)
+            with mock.patch("response.response_init.json.dumps", side_effect=json.dumps) as dumps:
+                await forward(app_context, [response_unit])
+            for target in targets:
+                self.assertEqual(len(target.push_queue), 2)
+                target.close()
+        # every data point is encoded once, not once per target
+        self.assertEqual(dumps.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
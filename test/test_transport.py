@@ -0,0 +1,36 @@
+import unittest
+
+from aiohttp import web
+
+from config.configs import get_local_config
+from fetch.transport import Transport
+from test.stub_server import DATABOX_DATA_PATH, StubServerTestCase
+
+
+class TestTransport(StubServerTestCase):
+
+    async def asyncSetUp(self):
+        self.peers = []
+        self.headers = []
+
+        async def handle_data(request: web.Request) -> web.Response:
+            self.peers.append(request.transport.get_extra_info("peername"))
+            self.headers.append(dict(request.headers))
+            return web.json_response({"value": [1] * 1000})
+
+        await self.start_server(handle_data, DATABOX_DATA_PATH)
+        self.app_config = get_local_config()
+
+    async def test_connection_reused(self):
+        async with Transport(self.app_config) as transport:
+            for _ in range(3):
+                async with transport.session.post(self.url(DATABOX_DATA_PATH), json={}) as response:
+                    self.assertEqual(len((await response.json())["value"]), 1000)
+        # all requests on the same keep-alive connection
+        self.assertEqual(len(set(self.peers)), 1)
+        self.assertIn("gzip", self.headers[0]["Accept-Encoding"])
+        self.assertIsNone(transport.session)
+
+
+if __name__ == '__main__':
+    unittest.main()
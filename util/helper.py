@@ -1,7 +1,8 @@
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
+EPOCH = datetime(1970, 1, 1)
 
 
 def create_date_from_month_year(year: int, month: int) -> str:
@@ -22,6 +23,36 @@ def create_date_from_year(year: int) -> str:
     return datetime(year, 1, 1).isoformat()
 
 
+def create_date_from_period(period: str) -> str:
+    """
+    Creates an ISO 8601 string representing the first day of the PX time period.
+    Supported periods: year "2006", month "2006M01", quarter "2006Q1"
+    Format: YYYY-MM-DDT00:00:00
+    """
+    if len(period) == 4:
+        return create_date_from_year(int(period))
+    if len(period) == 7 and period[4] == "M":
+        return create_date_from_month_year(int(period[:4]), int(period[5:]))
+    if len(period) == 6 and period[4] == "Q" and "1" <= period[5] <= "4":
+        return create_date_from_month_year(int(period[:4]), (int(period[5]) - 1) * 3 + 1)
+    raise ValueError(f"Can't parse time period from: {period}")
+
+
+def date_to_epoch(date: str) -> int:
+    """
+    Converts ISO 8601 string (without timezone) to seconds since epoch
+    """
+    return int((datetime.fromisoformat(date) - EPOCH).total_seconds())
+
+
+def epoch_to_date(epoch: int) -> str:
+    """
+    Converts seconds since epoch to ISO 8601 string
+    Format: YYYY-MM-DDT00:00:00
+    """
+    return (EPOCH + timedelta(seconds=epoch)).isoformat()
+
+
 def assert_true(expected, actual) -> None:
     """
     Custom assertion function that raises a specific exception when `expected` is not equal to `actual`
@@ -32,11 +63,3 @@ def assert_true(expected, actual) -> None:
     """
     if not (expected == actual):
         raise AssertionError(f"Assertion failed on condition: {expected} != {actual}")
-
-
-def from_str_to_enum(enum_class, label: str):
-    label_upper = label.strip().upper()
-    if label_upper in enum_class.__members__:
-        return enum_class[label_upper]
-    else:
-        raise NotImplementedError(f"{label_upper} text is not in valid enums: {enum_class.__members__}!")